@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多筆預約吞吐量基準測試：執行緒版 BusBookingSystem 與 asyncio 版 AsyncBookingSystem
+在本機啟動 mock_rayman 模擬伺服器，兩種方式各完成 N 筆「登入 → 存檔」，
+回報總耗時（含瀏覽器啟動）、每分鐘完成筆數與單筆延遲，不會對真實網站送出任何預約
+
+用法:
+    python benchmarks/bench_async_throughput.py --bookings 8 --concurrency 4 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_booking import disable_captcha_storage, make_booking_data, percentile
+from mock_rayman import MockRaymanServer
+
+
+def make_riders(count):
+    base = make_booking_data()
+    return [dataclasses.replace(base, name=f"{base.name}{i}") for i in range(count)]
+
+
+def run_threaded(base_url, riders, concurrency):
+    """每位乘客一條執行緒、一個瀏覽器（MultiBookingOrchestrator + BusBookingSystem）"""
+    from multi_booking import MultiBookingOrchestrator
+
+    orchestrator = MultiBookingOrchestrator(riders, engine="selenium", max_concurrency=concurrency,
+                                            base_url=base_url, submit=True)
+    return [(r.success, r.elapsed) for r in orchestrator.run()]
+
+
+def run_async(base_url, riders, concurrency):
+    """單一事件迴圈、單一瀏覽器，多個 BrowserContext 交錯進行"""
+    from ycbus_async import book_many
+
+    return asyncio.run(book_many(riders, base_url=base_url, max_concurrency=concurrency, submit=True))
+
+
+MODES = {"threaded": run_threaded, "async": run_async}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="執行緒版與 asyncio 版預約吞吐量比較")
+    parser.add_argument("--modes", default="threaded,async", help="以逗號分隔: threaded,async")
+    parser.add_argument("--bookings", type=int, default=8, help="每種方式完成的預約筆數")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時進行的預約數量")
+    parser.add_argument("--latency-ms", type=float, default=50, help="模擬伺服器每個請求的延遲")
+    parser.add_argument("--captcha-mode", default="strict", help="模擬伺服器驗證碼模式")
+    args = parser.parse_args()
+
+    disable_captcha_storage()
+    riders = make_riders(args.bookings)
+    server = MockRaymanServer(latency_ms=args.latency_ms, captcha_mode=args.captcha_mode)
+    with server:
+        print(f"模擬伺服器: {server.base_url}，{args.bookings} 筆預約，同時 {args.concurrency} 筆")
+        print(f"{'mode':<10}{'ok':>6}{'total s':>10}{'per min':>10}{'p50 s':>10}{'p90 s':>10}{'mean s':>10}")
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            start = time.perf_counter()
+            try:
+                results = MODES[mode](server.base_url, riders, args.concurrency)
+            except Exception as e:
+                print(f"{mode:<10}執行失敗: {str(e)}")
+                continue
+            total = time.perf_counter() - start
+            latencies = [elapsed for success, elapsed in results if success]
+            if not latencies:
+                print(f"{mode:<10}{0:>6}{total:>10.1f}  全部失敗")
+                continue
+            print(f"{mode:<10}{len(latencies):>6}{total:>10.1f}{len(latencies) / total * 60:>10.1f}"
+                  f"{percentile(latencies, 50):>10.2f}{percentile(latencies, 90):>10.2f}"
+                  f"{statistics.mean(latencies):>10.2f}")
+        print(f"伺服器統計: {server.state.stats}")
+
+
+if __name__ == "__main__":
+    main()
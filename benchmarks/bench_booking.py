@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+端到端預約延遲基準測試
+在本機啟動 mock_rayman 模擬伺服器，分別以各個引擎與瀏覽器完成「登入 → 存檔」，
+回報每種組合的延遲百分位數，不會對真實網站送出任何預約
+
+用法:
+    python benchmarks/bench_booking.py --engines http,selenium --browsers firefox,chrome \\
+        --runs 10 --latency-ms 50 --captcha-mode strict
+"""
+
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_rayman import MockRaymanServer, MockRaymanState
+from ycbus_v2 import BookingData
+
+
+def disable_captcha_storage():
+    """
+    關閉驗證碼快取與資料集
+
+    模擬伺服器的驗證碼與「登入成功」標記若寫進 captcha_data，之後會被當成真實樣本
+    命中快取或拿來訓練數字分類器
+    """
+    import utils.captcha_handler as captcha_handler
+
+    captcha_handler.CAPTCHA_CACHE_ENABLED = False
+    captcha_handler.CAPTCHA_DATASET_ENABLED = False
+
+
+def make_booking_data() -> BookingData:
+    """產生符合模擬伺服器頁面的預約資料"""
+    ride_date = (datetime.date.today() + datetime.timedelta(days=2)).strftime("%m/%d")
+    return BookingData(
+        name="徐明",
+        num="A12345",
+        date=ride_date,
+        go_time="07:30",
+        back_time="13:30",
+        goto_pickup_area="a_萬里",
+        goto_dropoff_area="b_信義",
+        goto_pickup_address="萬里地址",
+        goto_dropoff_address="信義地址",
+        return_pickup_area="c_龜山",
+        return_dropoff_area="b_大安",
+        return_pickup_address="龜山地址",
+        return_dropoff_address="大安地址",
+        Message="留言訊息",
+    )
+
+
+def run_http(base_url, booking_data, browser):
+    """HTTP 引擎：登入到存檔的耗時（毫秒）"""
+    from ycbus_http import HttpBookingSystem
+
+    system = HttpBookingSystem(booking_data, base_url=base_url, submit=True)
+    try:
+        start = time.perf_counter()
+        if not system.login():
+            return None
+        success, _ = system.book_journey()
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed if success else None
+    finally:
+        system.close()
+
+
+def browser_options(browser):
+    """建立無頭模式的瀏覽器選項"""
+    if browser == "chrome":
+        from selenium.webdriver import ChromeOptions
+        options = ChromeOptions()
+        options.add_argument("--headless")
+    else:
+        from selenium.webdriver.firefox.options import Options
+        options = Options()
+        options.add_argument("--headless")
+    return options
+
+
+def run_selenium(base_url, booking_data, browser):
+    """Selenium 引擎（BusBookingSystem + handle_login_process）：登入到存檔的耗時（毫秒）"""
+    from main import handle_login_process
+    from ycbus_v2 import BusBookingSystem
+
+    system = BusBookingSystem(booking_data, browser_type=browser,
+                              options=browser_options(browser), base_url=base_url, submit=True)
+    try:
+        start = time.perf_counter()
+        if not handle_login_process(system):
+            return None
+        success, _ = system.book_journey()
+        if not success:
+            return None
+        return (time.perf_counter() - start) * 1000
+    finally:
+        system.driver.quit()
+
+
+ENGINES = {"http": run_http, "selenium": run_selenium}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端預約延遲基準測試")
+    parser.add_argument("--engines", default="http,selenium", help="以逗號分隔: http,selenium")
+    parser.add_argument("--browsers", default="firefox", help="Selenium 使用的瀏覽器，以逗號分隔")
+    parser.add_argument("--runs", type=int, default=5, help="每種組合執行次數")
+    parser.add_argument("--latency-ms", type=float, default=0, help="模擬伺服器每個請求的延遲")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="模擬伺服器延遲的抖動上限")
+    parser.add_argument("--captcha-mode", choices=MockRaymanState.CAPTCHA_MODES, default="strict")
+    parser.add_argument("--captcha-fail-first", type=int, default=0, help="每個 session 前 N 次登入一律失敗")
+    parser.add_argument("--full-slots", default="", help="額滿時段，以逗號分隔")
+    args = parser.parse_args()
+
+    disable_captcha_storage()
+    booking_data = make_booking_data()
+    combos = []
+    for engine in [e.strip() for e in args.engines.split(",") if e.strip()]:
+        if engine == "http":
+            combos.append((engine, "-"))
+        else:
+            combos += [(engine, b.strip()) for b in args.browsers.split(",") if b.strip()]
+
+    server = MockRaymanServer(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        captcha_mode=args.captcha_mode,
+        captcha_fail_first=args.captcha_fail_first,
+        full_slots=[s.strip() for s in args.full_slots.split(",") if s.strip()],
+    )
+    with server:
+        print(f"模擬伺服器: {server.base_url}")
+        print(f"{'engine':<10}{'browser':<10}{'ok':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'mean':>10}")
+        for engine, browser in combos:
+            samples, failures = [], 0
+            for _ in range(args.runs):
+                try:
+                    elapsed = ENGINES[engine](server.base_url, booking_data, browser)
+                except Exception as e:
+                    print(f"{engine}/{browser} 執行失敗: {str(e)}")
+                    elapsed = None
+                if elapsed is None:
+                    failures += 1
+                else:
+                    samples.append(elapsed)
+            if not samples:
+                print(f"{engine:<10}{browser:<10}{0:>6}  全部失敗")
+                continue
+            print(f"{engine:<10}{browser:<10}{len(samples):>6}"
+                  f"{percentile(samples, 50):>10.1f}{percentile(samples, 90):>10.1f}"
+                  f"{percentile(samples, 99):>10.1f}{statistics.mean(samples):>10.1f}")
+        print(f"伺服器統計: {server.state.stats}")
+
+
+if __name__ == "__main__":
+    main()
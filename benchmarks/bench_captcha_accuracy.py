@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+驗證碼辨識準確率與延遲基準測試
+以一組已標註答案的驗證碼圖片執行每一種辨識策略，回報準確率、p50/p95 延遲與 CPU 時間，
+調整 OCR 流程的速度時可以同時確認準確率沒有退步
+
+標註方式（擇一）:
+    1. 目錄中的 labels.csv，每行為「檔名,答案」
+    2. 檔名以答案開頭，例如 123.png、123_0001.png
+    3. --dataset：登入流程自動收集的資料集（只使用登入成功的驗證碼）
+    4. --synthetic N：以 mock_rayman 產生 N 張已知答案的驗證碼
+
+用法:
+    python benchmarks/bench_captcha_accuracy.py captchas/ --rounds 3
+    python benchmarks/bench_captcha_accuracy.py --dataset captcha_data/captcha_dataset.sqlite3
+    python benchmarks/bench_captcha_accuracy.py --synthetic 50 --strategies image_ocr,variant:binary
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_booking import percentile
+from utils import ocr_registry
+from utils.image_ocr import ImageOCR
+from utils.preprocess import preprocess
+
+LABEL_PATTERN = re.compile(r"^(\d{3})(?:[_\-.].*)?\.png$", re.IGNORECASE)
+
+
+def load_corpus(target):
+    """
+    讀取已標註的驗證碼
+
+    Returns:
+        [(名稱, 圖片 bytes, 答案)]
+    """
+    labels = {}
+    labels_path = os.path.join(target, "labels.csv")
+    if os.path.isfile(labels_path):
+        with open(labels_path, "r", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) >= 2 and row[1].strip().isdigit():
+                    labels[row[0].strip()] = row[1].strip()
+
+    corpus = []
+    for name in sorted(os.listdir(target)):
+        if not name.lower().endswith(".png"):
+            continue
+        label = labels.get(name)
+        if label is None:
+            match = LABEL_PATTERN.match(name)
+            if not match:
+                continue
+            label = match.group(1)
+        with open(os.path.join(target, name), "rb") as f:
+            corpus.append((name, f.read(), label))
+    return corpus
+
+
+def dataset_corpus(path, limit=None):
+    """讀取登入流程收集的資料集中答案已確認正確的驗證碼"""
+    from utils.captcha_dataset import iter_samples
+
+    return [(f"dataset_{row_id}", image, label) for row_id, image, label, _ in iter_samples(path, limit=limit)]
+
+
+def synthetic_corpus(count, seed=0):
+    """以 mock_rayman 的驗證碼產生器建立已知答案的驗證碼"""
+    from mock_rayman import render_captcha
+
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        label = f"{rng.randint(0, 999):03d}"
+        corpus.append((f"synthetic_{i:04d}.png", render_captcha(label), label))
+    return corpus
+
+
+def build_strategies(ocr):
+    """
+    建立所有辨識策略
+
+    Returns:
+        {策略名稱: (準備函式, 辨識函式)}；準備函式的結果不計入延遲，辨識函式接收準備結果並回傳答案
+    """
+    from utils.captcha_handler import CaptchaHandler
+    from utils.parallel_recognizer import ParallelRecognizer
+
+    handler = CaptchaHandler(None)
+    # 快取會讓重複的圖片直接命中，基準測試一律關閉
+    handler.cache = None
+    parallel = ParallelRecognizer(ocr)
+
+    def raw(image_bytes):
+        return image_bytes
+
+    strategies = {
+        "image_ocr": (raw, ocr.recognize_captcha),
+        "multi_engine": (raw, ocr.recognize_with_multiple_engines),
+        "parallel": (raw, parallel.recognize),
+        "handler": (raw, handler.recognize_captcha),
+        "handler_fallback": (raw, handler.recognize_fallback),
+        "dddd_original": (raw, lambda image_bytes: ocr.ocr.classification(image_bytes)),
+    }
+    if ocr.digit_classifier is not None:
+        # 不套用信心門檻，直接看分類器本身的準確率
+        strategies["digit_classifier"] = (
+            raw, lambda image_bytes: getattr(ocr.digit_classifier.predict(image_bytes), "code", None)
+        )
+
+    # 個別預處理器：變體事先產生，只計算單一變體的辨識時間
+    def variants(image_bytes):
+        return dict(ocr.preprocess_variants(image_bytes))
+
+    for name in ocr.VARIANT_NAMES:
+        if name.startswith("digit_"):
+            continue
+        strategies[f"variant:{name}"] = (variants, lambda arrays, name=name: ocr._dddd_classify(arrays[name]))
+
+    def segments(arrays):
+        digits = []
+        for i in (1, 2, 3):
+            if f"digit_{i}" not in arrays:
+                return None
+            found = re.findall(r"\d", ocr._dddd_classify(arrays[f"digit_{i}"]))
+            digits.append(found[0] if found else "")
+        return "".join(digits)
+
+    strategies["variant:segments"] = (variants, segments)
+    if ocr.onnx_engine is not None:
+        # 分割數字只在 0~9 之間選擇，不套用信心門檻（包含切割本身的時間）
+        strategies["segments"] = (raw, lambda image_bytes: ocr.recognize_segments(preprocess(image_bytes)))
+
+    # 便宜的整張變體全部辨識一次：逐張 PNG 編碼交給 ddddocr vs 直接 ONNX 推論（只看延遲）
+    def cheap_batch(image_bytes):
+        return [array for name, array in ocr.preprocess_variants(image_bytes, False) if not name.startswith("digit_")]
+
+    strategies["variants:classification"] = (
+        cheap_batch, lambda arrays: [ocr.ocr.classification(ocr.encode_png(a)) for a in arrays] and None
+    )
+    if ocr.onnx_engine is not None:
+        strategies["variants:onnx_batch"] = (cheap_batch, lambda arrays: ocr.onnx_engine.classify_batch(arrays) and None)
+    # 預處理本身的耗時（沒有答案，只看延遲）；full 包含 NL-means 降噪
+    strategies["preprocess"] = (raw, lambda image_bytes: ocr.preprocess_variants(image_bytes, False) and None)
+    strategies["preprocess_full"] = (raw, lambda image_bytes: ocr.preprocess_variants(image_bytes) and None)
+    return strategies
+
+
+def run_strategy(func, prepared, label, verbose):
+    """執行一次辨識，回傳 (是否正確, 牆鐘毫秒, CPU 毫秒, 錯誤訊息)"""
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    error = None
+    with output:
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        try:
+            result = func(prepared)
+        except Exception as e:
+            result, error = None, str(e)
+        result = getattr(result, "code", result)
+        elapsed = (time.perf_counter() - start) * 1000
+        cpu = (time.process_time() - cpu_start) * 1000
+    digits = "".join(re.findall(r"\d", result)) if isinstance(result, str) else ""
+    return digits == label, elapsed, cpu, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="驗證碼辨識準確率與延遲基準測試")
+    parser.add_argument("target", nargs="?", default="captcha_corpus", help="已標註的驗證碼目錄")
+    parser.add_argument("--dataset", help="改用登入流程收集的 SQLite 資料集")
+    parser.add_argument("--synthetic", type=int, default=0, help="改用 mock_rayman 產生 N 張驗證碼")
+    parser.add_argument("--strategies", default="", help="以逗號分隔要執行的策略，預設全部")
+    parser.add_argument("--rounds", type=int, default=1, help="每張圖片重複次數")
+    parser.add_argument("--limit", type=int, default=0, help="最多使用幾張圖片")
+    parser.add_argument("--json", dest="json_path", help="將結果另存為 JSON")
+    parser.add_argument("--verbose", action="store_true", help="顯示辨識過程的輸出")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        corpus = synthetic_corpus(args.synthetic)
+    elif args.dataset:
+        corpus = dataset_corpus(args.dataset, args.limit or None)
+    elif os.path.isdir(args.target):
+        corpus = load_corpus(args.target)
+    else:
+        corpus = []
+    if args.limit:
+        corpus = corpus[:args.limit]
+    if not corpus:
+        print(f"找不到已標註的驗證碼: {args.target}")
+        return
+
+    ocr_registry.warm_up()
+    ocr = ImageOCR(debug=False)
+    strategies = build_strategies(ocr)
+    selected = [s.strip() for s in args.strategies.split(",") if s.strip()] or list(strategies)
+    unknown = [s for s in selected if s not in strategies]
+    if unknown:
+        print(f"未知的策略: {', '.join(unknown)}，可用: {', '.join(strategies)}")
+        return
+
+    print(f"驗證碼數: {len(corpus)}, 每張重複: {args.rounds}")
+    print(f"{'strategy':<20}{'acc':>8}{'p50 ms':>10}{'p95 ms':>10}{'cpu ms':>10}{'errors':>8}")
+    report = {}
+    for name in selected:
+        prepare, func = strategies[name]
+        correct, latencies, cpu_times, errors = 0, [], [], 0
+        for _, image_bytes, label in corpus:
+            prepared = prepare(image_bytes)
+            for _ in range(args.rounds):
+                ok, elapsed, cpu, error = run_strategy(func, prepared, label, args.verbose)
+                correct += ok
+                latencies.append(elapsed)
+                cpu_times.append(cpu)
+                errors += error is not None
+        runs = len(latencies)
+        report[name] = {
+            "accuracy": correct / runs,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "cpu_ms": sum(cpu_times) / runs,
+            "errors": errors,
+            "runs": runs,
+        }
+        accuracy = "-" if name.startswith(("preprocess", "variants:")) else f"{report[name]['accuracy']:.1%}"
+        print(f"{name:<20}{accuracy:>8}{report[name]['p50_ms']:>10.1f}{report[name]['p95_ms']:>10.1f}"
+              f"{report[name]['cpu_ms']:>10.1f}{errors:>8}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
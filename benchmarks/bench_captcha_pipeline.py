@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+驗證碼預處理延遲比較
+比較「寫入磁碟再讀回」與「全程記憶體」兩種預處理流程的單張驗證碼延遲
+
+用法:
+    python benchmarks/bench_captcha_pipeline.py [圖片路徑或目錄] [--rounds N] [--with-ocr]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_ocr import ImageOCR
+
+
+def collect_images(target):
+    """收集要測試的驗證碼圖片"""
+    if os.path.isdir(target):
+        # 略過舊流程殘留的預處理變體檔案
+        suffixes = tuple(f"_{name}.png" for name in ImageOCR.VARIANT_NAMES)
+        return [
+            os.path.join(target, name)
+            for name in sorted(os.listdir(target))
+            if name.lower().endswith(".png") and not name.endswith(suffixes)
+        ]
+    return [target]
+
+
+def run_disk(ocr, image_path, workdir, with_ocr):
+    """舊流程：變體寫入磁碟，再逐一讀回送入引擎"""
+    copy_path = os.path.join(workdir, os.path.basename(image_path))
+    with open(image_path, "rb") as src, open(copy_path, "wb") as dst:
+        dst.write(src.read())
+    paths = ocr.try_multiple_preprocessing(copy_path)
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        if with_ocr:
+            ocr.ocr.classification(data)
+    ocr.cleanup_temp_files(copy_path)
+
+
+def run_memory(ocr, image_bytes, with_ocr):
+    """新流程：變體只存在記憶體中"""
+    for _, array in ocr.preprocess_variants(image_bytes):
+        data = ocr.encode_png(array)
+        if with_ocr:
+            ocr.ocr.classification(data)
+
+
+def summarize(label, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<8} mean={statistics.mean(samples):8.2f} ms  "
+          f"p50={statistics.median(samples):8.2f} ms  p95={p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="驗證碼預處理延遲比較")
+    parser.add_argument("target", nargs="?", default="temp_captcha", help="圖片路徑或目錄")
+    parser.add_argument("--rounds", type=int, default=20, help="每張圖片重複次數")
+    parser.add_argument("--with-ocr", action="store_true", help="一併計入 ddddocr 推論時間")
+    args = parser.parse_args()
+
+    images = collect_images(args.target)
+    if not images:
+        print(f"找不到驗證碼圖片: {args.target}")
+        return
+
+    ocr = ImageOCR(debug=False)
+    disk_ms, memory_ms = [], []
+    with tempfile.TemporaryDirectory() as workdir:
+        for image_path in images:
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                run_disk(ocr, image_path, workdir, args.with_ocr)
+                disk_ms.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                run_memory(ocr, image_bytes, args.with_ocr)
+                memory_ms.append((time.perf_counter() - start) * 1000)
+
+    print(f"圖片數: {len(images)}, 每張重複: {args.rounds}, 含OCR: {args.with_ocr}")
+    summarize("disk", disk_ms)
+    summarize("memory", memory_ms)
+    saved = statistics.median(disk_ms) - statistics.median(memory_ms)
+    print(f"每張驗證碼中位數節省: {saved:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
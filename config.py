@@ -47,4 +47,101 @@ AREA_MAPPINGS = {
         "北投", "大安", "萬華", "大同", "中山",
         # ... 其他台北地區
     ]
-} 
\ No newline at end of file
+} 
+
+# 驗證碼辨識設定
+# 預處理變體預設只保留在記憶體中，設為 True 才會把每個變體寫入磁碟以便除錯
+CAPTCHA_DEBUG_SAVE = False
+CAPTCHA_TEMP_DIR = "temp_captcha"
+
+# 平行辨識設定：多個預處理變體與引擎同時辨識，達到共識票數即提前結束
+CAPTCHA_PARALLEL_ENABLED = True
+CAPTCHA_PARALLEL_WORKERS = 4
+CAPTCHA_QUORUM = 2  # 相同 3 位數答案達到此票數即採用
+CAPTCHA_DEADLINE = 3.0  # 單張驗證碼辨識的最長秒數
+CAPTCHA_TESSERACT_PSMS = (7, 6, 8, 13)
+CAPTCHA_MIN_CONFIDENCE = 0.3  # 辨識信心低於此值時換一張驗證碼，不送出登入
+
+# HTTP 預約引擎設定
+# 是否實際點擊「存檔」送出預約；預設只填寫到存檔前（與原本的 Selenium 流程相同），
+# 三種預約引擎共用此設定，需要真正預約時以 --submit 或 submit=True 明確開啟
+BOOKING_SUBMIT = False
+
+HTTP_TIMEOUT = 10
+HTTP_LOGIN_ATTEMPTS = 5
+
+# 預先登入待命模式（armed）設定
+OPEN_TIME = "07:00:00"  # 開放預約的時間
+OPEN_TIME_GRACE = 60  # 開放時間已過幾秒內仍立即送出，超過時改為等待隔天的開放時間
+KEEP_ALIVE_INTERVAL = 60  # 保持登入狀態的請求間隔（秒）
+BOOK_BUTTON_SELECTOR = "input[value='預約訂車'][onclick*='act.value=\\'netbook\\';snt()']"
+CLOCK_SYNC_SAMPLES = 8  # 以 HTTP Date 標頭估算伺服器時間差的取樣次數
+SCHEDULER_SPIN_SECONDS = 0.002  # 觸發前最後改為忙碌等待的秒數
+CLOCK_RESYNC_BEFORE = 30  # 開放前幾秒重新同步伺服器時鐘
+CLOCK_SYNC_MAX_SECONDS = 5  # 一次時鐘同步最多花費的秒數，距離開放時間不足時略過重新同步
+
+# 元素定位引擎：邏輯名稱對應依序嘗試的策略 (種類, 表達式)，種類可為 css / id / name / xpath
+LOCATOR_POLL_INTERVAL = 0.05
+LOCATOR_STRATEGIES = {
+    "goto_pickup_area": [("css", "input[name='areain']"), ("id", "areain"), ("xpath", "//input[@name='areain']")],
+    "goto_dropoff_area": [("css", "input[name='areaoff']"), ("id", "areaoff"), ("xpath", "//input[@name='areaoff']")],
+    "return_pickup_area": [("css", "input[name='areain2']"), ("id", "areain2"), ("xpath", "//input[@name='areain2']")],
+    "return_dropoff_area": [("css", "input[name='areaoff2']"), ("id", "areaoff2"), ("xpath", "//input[@name='areaoff2']")],
+}
+
+# 四段地址對應的表單欄位：(區域輸入框, 城市選單, 地區選單, 地址輸入框)
+ADDRESS_FIELDS = {
+    "goto_pickup": ("areain", "city", "areain_u", "pointin"),
+    "goto_dropoff": ("areaoff", "citya", "areaoff_u", "pointoff"),
+    "return_pickup": ("areain2", "cityb", "areain2_u", "pointin2"),
+    "return_dropoff": ("areaoff2", "citym", "areaoffb_u", "pointoff2"),
+}
+# 以單次注入腳本批次填寫地址，失敗時改用逐欄填寫
+ADDRESS_BATCH_FILL = True
+ADDRESS_FILL_TIMEOUT = 5  # 等待地區選單產生選項的最長秒數
+
+# 頁面就緒等待設定（取代固定的 time.sleep）
+READY_TIMEOUT = 10
+READY_POLL_INTERVAL = 0.01  # 輪詢間隔（秒）
+NETWORK_IDLE_MS = 300  # 資源請求數量維持不變多久視為網路閒置
+
+# 瀏覽器預熱池設定
+DRIVER_POOL_SIZE = 1  # 預先啟動的瀏覽器數量
+DRIVER_POOL_TIMEOUT = 60  # 取出瀏覽器的最長等待秒數
+DRIVER_CACHE_DIRS = ["drivers", "~/.cache/ycbus/drivers"]  # 優先搜尋的本機 driver 目錄
+DRIVER_NETWORK_FALLBACK = False  # 本機找不到 driver 時是否允許 Selenium Manager / webdriver_manager 從網路下載
+
+# 多乘客預約設定
+MULTI_BOOKING_CONCURRENCY = 3  # 同時預約的乘客數量上限
+
+# 平行登入設定
+LOGIN_RACE_SESSIONS = 1  # 同時登入的 session 數量（1 表示依序重試）
+
+# 驗證碼結果快取：登入成功確認過的答案，再次遇到同一張圖片時直接使用
+CAPTCHA_CACHE_ENABLED = True
+CAPTCHA_CACHE_PATH = "captcha_data/captcha_cache.sqlite3"  # 不放在每次執行都會清空的 temp_captcha
+CAPTCHA_CACHE_SIZE = 5000  # 最多保存的圖片數量，超過時淘汰最久未使用的項目
+CAPTCHA_CACHE_HASH = "sha1"  # sha1（位元組完全相同）或 dhash（感知雜湊，不同圖片可能碰撞而回傳錯誤答案）
+
+# 驗證碼資料集：每次送出的驗證碼圖片、答案與登入結果（背景附加寫入）
+CAPTCHA_DATASET_ENABLED = True
+CAPTCHA_DATASET_PATH = "captcha_data/captcha_dataset.sqlite3"
+
+# 數字分類器：從驗證碼資料集訓練的 3 位數字 k 近鄰樣板
+DIGIT_CLASSIFIER_ENABLED = True
+DIGIT_CLASSIFIER_PATH = "captcha_data/digit_templates.npz"
+DIGIT_CLASSIFIER_K = 3
+DIGIT_CLASSIFIER_MIN_CONFIDENCE = 0.5  # 低於此信心改用 ddddocr / Tesseract
+
+# 直接 ONNX 推論：預處理變體以 NumPy 張量交給 ddddocr 的模型，省去 PNG 編碼與解碼；
+# 內建模型的批次維度固定為 1，仍是逐張執行 session.run
+ONNX_BATCH_ENABLED = True
+ONNX_INTRA_OP_THREADS = 2  # 單次推論使用的執行緒數，0 表示由 ONNX Runtime 決定
+
+# Tesseract 設定：安裝 tesserocr 時在程序內辨識，否則以 pytesseract 呼叫執行檔
+TESSERACT_CMD = ""  # 空字串表示自動尋找（環境變數 TESSERACT_CMD → PATH → Windows 預設安裝路徑）
+TESSERACT_LANG = "eng"
+
+# 數字分割：以連通元件（不足時改用垂直投影）切出三個數字，各自辨識
+SEGMENTATION_ENABLED = True
+SEGMENT_MIN_CONFIDENCE = 0.9  # 三個數字的機率都達到此值才直接採用，否則只算一票
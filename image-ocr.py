@@ -1,85 +1,30 @@
 import cv2
-import numpy as np
 from PIL import Image
 import os
-import ddddocr
+from utils.ocr_registry import get_ddddocr
+from utils.preprocess import preprocess
 import re
-import pytesseract
-from PIL import ImageEnhance, ImageFilter
+from utils.tesseract_engine import get_tesseract
 
 def try_multiple_preprocessing(image_path):
-    """嘗試多種預處理方法以提高辨識率"""
-    image = cv2.imread(image_path)
-    if image is None:
+    """嘗試多種預處理方法以提高辨識率（圖片只解碼一次，變體共用灰階與 Otsu 結果）"""
+    try:
+        with open(image_path, 'rb') as f:
+            prepared = preprocess(f.read())
+    except OSError:
+        prepared = None
+    if prepared is None:
         print(f"無法讀取圖片: {image_path}")
         return []
     
     processed_images = []
     base_path = image_path.replace('.png', '')
     
-    # 方法1: 基本二值化
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    path1 = f"{base_path}_binary.png"
-    cv2.imwrite(path1, binary)
-    processed_images.append(path1)
-    
-    # 方法2: 調整對比度並二值化
-    alpha = 2.0
-    beta = 10
-    adjusted = cv2.convertScaleAbs(gray, alpha=alpha, beta=beta)
-    _, binary2 = cv2.threshold(adjusted, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    path2 = f"{base_path}_contrast.png"
-    cv2.imwrite(path2, binary2)
-    processed_images.append(path2)
-    
-    # 方法3: 形態學處理
-    kernel = np.ones((2, 2), np.uint8)
-    dilated = cv2.dilate(binary, kernel, iterations=1)
-    path3 = f"{base_path}_dilated.png"
-    cv2.imwrite(path3, dilated)
-    processed_images.append(path3)
-    
-    # 方法4: 自適應二值化
-    adaptive_thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                           cv2.THRESH_BINARY, 11, 2)
-    path4 = f"{base_path}_adaptive.png"
-    cv2.imwrite(path4, adaptive_thresh)
-    processed_images.append(path4)
-    
-    # 方法5: 使用PIL增強 - 修正模式問題
-    try:
-        pil_image = Image.open(image_path)
-        # 確保圖片為RGB模式，若不是則轉換
-        if pil_image.mode != 'RGB':
-            pil_image = pil_image.convert('RGB')
-        enhancer = ImageEnhance.Contrast(pil_image)
-        enhanced_img = enhancer.enhance(2.5)
-        enhanced_img = enhanced_img.filter(ImageFilter.SHARPEN)
-        path5 = f"{base_path}_enhanced.png"
-        enhanced_img.save(path5)
-        processed_images.append(path5)
-    except Exception as e:
-        print(f"PIL圖像增強處理錯誤: {str(e)}")
-    
-    # 方法6: 降噪後二值化
-    denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-    _, binary_denoised = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    path6 = f"{base_path}_denoised.png"
-    cv2.imwrite(path6, binary_denoised)
-    processed_images.append(path6)
-    
-    # 方法7: 圖像分割處理 - 嘗試分割成3個數字
-    width = image.shape[1]
-    part_width = width // 3
-    for i in range(3):
-        start_x = i * part_width
-        end_x = (i + 1) * part_width if i < 2 else width
-        digit_img = gray[:, start_x:end_x]
-        _, digit_binary = cv2.threshold(digit_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        path_digit = f"{base_path}_digit_{i+1}.png"
-        cv2.imwrite(path_digit, digit_binary)
-        processed_images.append(path_digit)
+    # 方法1~7: 二值化、對比、膨脹、自適應、增強、降噪、分割成3個數字
+    for name, array in prepared.variants(include_denoised=True):
+        path = f"{base_path}_{name}.png"
+        cv2.imwrite(path, array)
+        processed_images.append(path)
     
     return processed_images
 
@@ -90,7 +35,7 @@ def recognize_with_multiple_engines(image_path):
     # 先使用原始圖片嘗試辨識
     try:
         # 使用ddddocr
-        ocr = ddddocr.DdddOcr(show_ad=False)
+        ocr = get_ddddocr()
         with open(image_path, 'rb') as f:
             image_bytes = f.read()
         result_dddd = ocr.classification(image_bytes)
@@ -103,12 +48,8 @@ def recognize_with_multiple_engines(image_path):
         # 嘗試使用Tesseract
         try:
             img = Image.open(image_path)
-            # 確保圖片格式兼容Tesseract
-            if img.mode not in ['RGB', 'L']:
-                img = img.convert('L')  # 轉換為灰階
-            # 設定Tesseract配置，只辨識數字
-            custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789'
-            result_tesseract = pytesseract.image_to_string(img, config=custom_config)
+            # 只辨識數字
+            result_tesseract = get_tesseract().image_to_string(img, psm=6)
             numbers_tesseract = re.findall(r'\d+', result_tesseract)
             if numbers_tesseract:
                 result_tesseract = ''.join(numbers_tesseract)
@@ -141,10 +82,7 @@ def recognize_with_multiple_engines(image_path):
             # 使用Tesseract
             try:
                 img = Image.open(img_path)
-                # 確保圖片格式兼容Tesseract
-                if img.mode not in ['RGB', 'L']:
-                    img = img.convert('L')  # 轉換為灰階
-                result_tess = pytesseract.image_to_string(img, config=custom_config)
+                result_tess = get_tesseract().image_to_string(img, psm=6)
                 numbers_tess = re.findall(r'\d+', result_tess)
                 if numbers_tess:
                     result_tess = ''.join(numbers_tess)
@@ -6,7 +6,9 @@ from utils.notification import LineNotifier
 from utils.email_notification import EmailNotifier
 from read_google_sheet import ReadGSheet
 from utils.captcha_handler import CaptchaHandler
-import time
+from utils.captcha_fetcher import CaptchaFetcher
+from utils import ocr_registry
+from utils.driver_pool import DriverPool
 from selenium.webdriver.common.alert import Alert
 from selenium.common.exceptions import UnexpectedAlertPresentException
 from selenium.webdriver.support.ui import WebDriverWait
@@ -14,14 +16,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 import urllib.request
 import os
-from selenium.webdriver.firefox.options import Options
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
-import requests
-import random
-import base64
 from collections import Counter
 from utils.gmail_sender import GmailSender
-from config import BASE_URL
+from config import BASE_URL, BOOKING_SUBMIT, CAPTCHA_DEBUG_SAVE, CAPTCHA_MIN_CONFIDENCE, DRIVER_POOL_SIZE, LOGIN_RACE_SESSIONS, OPEN_TIME
 
 
 def parse_arguments():
@@ -33,6 +33,12 @@ def parse_arguments():
         help="運行模式",
     )
     parser.add_argument("--headless", action="store_true", help="是否使用無頭模式")
+    parser.add_argument("--armed", action="store_true", help="提前登入待命，於開放時間準時送出預約")
+    parser.add_argument("--open-time", default=OPEN_TIME, help="開放預約的時間 (HH:MM:SS)")
+    parser.add_argument("--submit", action="store_true", default=BOOKING_SUBMIT,
+                        help="實際點擊存檔送出預約（未指定時只填寫到存檔前）")
+    parser.add_argument("--login-race", type=int, default=LOGIN_RACE_SESSIONS,
+                        help="同時登入的 session 數量，大於 1 時採用第一個成功的 session")
     return parser.parse_args()
 
 
@@ -61,6 +67,22 @@ def load_data_from_txt():
     return result
 
 
+def apply_return_shortcuts(booking_data: Dict[str, str]) -> Dict[str, str]:
+    """將回程欄位中的 same_goto_dropoff / same_pickup 代換為對應的去程欄位"""
+    if booking_data["return_pickup_area"] == "same_goto_dropoff":
+        booking_data["return_pickup_area"] = booking_data["goto_dropoff_area"]
+
+    if booking_data["return_pickup_address"] == "same_goto_dropoff":
+        booking_data["return_pickup_address"] = booking_data["goto_dropoff_address"]
+
+    if booking_data["return_dropoff_area"] == "same_pickup":
+        booking_data["return_dropoff_area"] = booking_data["goto_pickup_area"]
+
+    if booking_data["return_dropoff_address"] == "same_pickup":
+        booking_data["return_dropoff_address"] = booking_data["goto_pickup_address"]
+    return booking_data
+
+
 def load_data_from_gsheet():
     """從 Google Sheet 讀取資料"""
     try:
@@ -86,17 +108,7 @@ def load_data_from_gsheet():
         }
 
         # 處理回程地址的特殊情況
-        if booking_data["return_pickup_area"] == "same_goto_dropoff":
-            booking_data["return_pickup_area"] = booking_data["goto_dropoff_area"]
-
-        if booking_data["return_pickup_address"] == "same_goto_dropoff":
-            booking_data["return_pickup_address"] = booking_data["goto_dropoff_address"]
-
-        if booking_data["return_dropoff_area"] == "same_pickup":
-            booking_data["return_dropoff_area"] = booking_data["goto_pickup_area"]
-
-        if booking_data["return_dropoff_address"] == "same_pickup":
-            booking_data["return_dropoff_address"] = booking_data["goto_pickup_address"]
+        apply_return_shortcuts(booking_data)
 
         # 返回预约数据和通知相关信息
         notification_data = {
@@ -120,383 +132,388 @@ def load_data_from_gsheet():
         raise
 
 
-def handle_login_process(system):
-    """處理登入流程，包含驗證碼處理"""
-    max_attempts = 5  # 增加嘗試次數
-    for attempt in range(max_attempts):
-        try:
-            print(f"開始第 {attempt + 1} 次登入嘗試")
+def refresh_captcha(system, captcha_fetcher):
+    """換一張驗證碼：優先只重新載入驗證碼圖片，失敗時才重新整理整個登入頁"""
+    if captcha_fetcher.refresh():
+        return
+    system.driver.refresh()
+    system.ready.document_ready("login_refresh")
 
-            # 確保頁面已經加載
-            system.navigate_to_login_page()
 
-            # 等待驗證碼圖片載入，嘗試多種定位方式
-            captcha_img = None
-            locators = [
-                (By.ID, "captchaImage"),
-                (By.CSS_SELECTOR, "img[src*='captcha']"),
-                (By.CSS_SELECTOR, "img[alt*='captcha']"),
-                (By.XPATH, "//img[contains(@src, 'captcha')]"),
-                (By.XPATH, "//img[contains(@alt, 'captcha')]"),
-            ]
-
-            for locator in locators:
-                try:
-                    captcha_img = WebDriverWait(system.driver, 5).until(
-                        EC.presence_of_element_located(locator)
-                    )
-                    if captcha_img:
-                        print(f"成功使用定位器 {locator} 找到驗證碼圖片")
-                        break
-                except:
-                    continue
+def fill_field(field, value):
+    """填寫輸入框，內容已經相同時（只換了驗證碼的重試）不再重新輸入"""
+    if field.get_attribute("value") == value:
+        return
+    field.clear()
+    field.send_keys(value)
 
-            if not captcha_img:
-                print("無法找到驗證碼圖片，嘗試截取整個頁面")
-                # 截取整個頁面以便調試
-                debug_screenshot = os.path.join(
-                    "temp_captcha", f"page_screenshot_{attempt}.png"
-                )
-                system.driver.save_screenshot(debug_screenshot)
-                print(f"已保存頁面截圖至: {debug_screenshot}")
 
-                # 嘗試重新加載頁面
-                system.driver.refresh()
-                time.sleep(3)
-                continue
+def attempt_login(system, captcha_handler, captcha_fetcher, attempt=0, is_last=False, before_submit=None):
+    """執行一次登入嘗試：取得驗證碼、辨識、填寫表單並送出
+
+    Args:
+        system: BusBookingSystem
+        captcha_handler: 驗證碼辨識器（CaptchaHandler）
+        captcha_fetcher: 驗證碼擷取器（CaptchaFetcher）
+        attempt: 第幾次嘗試（從 0 開始），用於訊息與除錯檔名
+        is_last: 是否為最後一次嘗試，失敗後不再重新整理頁面
+        before_submit: 點擊登入按鈕前呼叫，回傳 False 時放棄登入（平行登入時使用）
+
+    Returns:
+        True 表示登入成功，False 表示登入失敗且不應再重試，None 表示本次失敗可以重試
+    """
+    try:
+        print(f"開始第 {attempt + 1} 次登入嘗試")
 
-            # 確保圖片已完全載入
-            time.sleep(2)
+        # 確保頁面已經加載；上一次嘗試只換了驗證碼時登入頁仍然有效，不必重新導航
+        if captcha_fetcher.refreshed:
+            captcha_fetcher.refreshed = False
+        else:
+            system.navigate_to_login_page()
 
-            # 直接使用截圖方式獲取驗證碼圖片（優先使用此方法）
+        # 直接從驗證碼元素取得圖片 bytes，不經過整頁截圖也不寫入磁碟
+        captcha_image = captcha_fetcher.fetch()
+        if not captcha_image:
+            print("無法取得驗證碼圖片，嘗試截取整個頁面")
+            # 截取整個頁面以便調試
+            debug_screenshot = os.path.join(
+                "temp_captcha", f"page_screenshot_{attempt}.png"
+            )
+            system.driver.save_screenshot(debug_screenshot)
+            print(f"已保存頁面截圖至: {debug_screenshot}")
+
+            # 嘗試重新加載頁面
+            system.driver.refresh()
+            system.ready.document_ready("login_refresh")
+            return None
+
+        print(f"驗證碼取得方式: {captcha_image.method}，耗時 {captcha_image.elapsed_ms:.1f} ms")
+        if CAPTCHA_DEBUG_SAVE:
             debug_img_path = os.path.join("temp_captcha", f"captcha_{attempt}.png")
-            try:
-                # 獲取驗證碼元素的位置和大小
-                location = captcha_img.location
-                size = captcha_img.size
-
-                # 截取整個頁面
-                system.driver.save_screenshot(debug_img_path)
-
-                # 從截圖中裁剪出驗證碼部分
-                full_img = Image.open(debug_img_path)
-                left = location["x"]
-                top = location["y"]
-                right = location["x"] + size["width"]
-                bottom = location["y"] + size["height"]
-
-                # 裁剪並保存驗證碼圖片
-                captcha_img_cropped = full_img.crop((left, top, right, bottom))
-                captcha_img_cropped.save(debug_img_path)
-                print(f"已通過截圖方式保存驗證碼圖片至: {debug_img_path}")
-            except Exception as crop_error:
-                print(f"截圖獲取驗證碼失敗: {str(crop_error)}")
-
-                # 備用方法：嘗試使用JavaScript直接獲取圖片的base64編碼
-                try:
-                    print("嘗試使用JavaScript獲取驗證碼圖片...")
-
-                    # 使用JavaScript獲取圖片的base64編碼
-                    img_base64 = system.driver.execute_script(
-                        """
-                        var img = arguments[0];
-                        var canvas = document.createElement('canvas');
-                        canvas.width = img.width;
-                        canvas.height = img.height;
-                        var ctx = canvas.getContext('2d');
-                        ctx.drawImage(img, 0, 0);
-                        return canvas.toDataURL('image/png').substring(22);
-                    """,
-                        captcha_img,
-                    )
+            with open(debug_img_path, "wb") as f:
+                f.write(captcha_image.data)
+            print(f"除錯模式：已保存驗證碼圖片至: {debug_img_path}")
+
+        # 直接以圖片 bytes 進行驗證碼識別
+        recognition = captcha_handler.recognize(captcha_image.data)
+        captcha_code = recognition.code
+
+        if not captcha_code:
+            print("驗證碼識別失敗，重試中...")
+            refresh_captcha(system, captcha_fetcher)
+            return None
+
+        print(f"識別出的驗證碼: {captcha_code}（信心 {recognition.confidence:.2f}，"
+              f"{recognition.engine}/{recognition.variant}，耗時 {recognition.elapsed_ms:.1f} ms）")
 
-                    # 將base64轉換為圖片並保存
-                    if img_base64:
-                        with open(debug_img_path, "wb") as f:
-                            f.write(base64.b64decode(img_base64))
-                        print(
-                            f"已通過JavaScript獲取並保存驗證碼圖片至: {debug_img_path}"
+        # 信心不足時直接換一張驗證碼，不必付出一次失敗登入的來回；最後一次嘗試仍然送出
+        if recognition.confidence < CAPTCHA_MIN_CONFIDENCE and not is_last:
+            print(f"驗證碼信心低於 {CAPTCHA_MIN_CONFIDENCE:.2f}，改用新的驗證碼")
+            refresh_captcha(system, captcha_fetcher)
+            return None
+
+        # 嘗試登入
+        try:
+            # 使用更靈活的方式填寫登入表單
+            try:
+                # 嘗試填寫帳戶名稱
+                username_field = None
+                username_locators = [
+                    (By.CSS_SELECTOR, "#cusname"),
+                    (By.ID, "cusname"),
+                    (By.NAME, "cusname"),
+                    (By.XPATH, "//input[@placeholder='姓名']"),
+                    (By.XPATH, "//input[contains(@id, 'name')]"),
+                ]
+
+                for locator in username_locators:
+                    try:
+                        username_field = WebDriverWait(system.driver, 5).until(
+                            EC.presence_of_element_located(locator)
                         )
-                    else:
-                        raise Exception("無法獲取圖片的base64編碼")
-                except Exception as js_error:
-                    print(f"JavaScript獲取驗證碼失敗: {str(js_error)}")
+                        if username_field:
+                            break
+                    except:
+                        continue
 
-                    # 最後嘗試：使用URL下載方式
+                if not username_field:
+                    print("無法找到用戶名輸入框")
+                    system.driver.refresh()
+                    system.ready.document_ready("login_refresh")
+                    return None
+
+                fill_field(username_field, system.booking_data.name)
+                print("已填寫帳戶名稱")
+
+                # 嘗試填寫乘客編號
+                password_field = None
+                password_locators = [
+                    (By.CSS_SELECTOR, "#idcode"),
+                    (By.ID, "idcode"),
+                    (By.NAME, "idcode"),
+                    (By.XPATH, "//input[@placeholder='乘客編號']"),
+                    (By.XPATH, "//input[contains(@id, 'code')]"),
+                ]
+
+                for locator in password_locators:
                     try:
-                        # 獲取圖片的完整URL
-                        img_url = captcha_img.get_attribute("src")
-                        print(f"驗證碼圖片URL: {img_url}")
-
-                        if not img_url or img_url == "":
-                            print("無法獲取驗證碼圖片URL，嘗試使用JavaScript獲取")
-                            img_url = system.driver.execute_script(
-                                "return arguments[0].src;", captcha_img
-                            )
-                            print(f"使用JavaScript獲取的URL: {img_url}")
+                        password_field = WebDriverWait(system.driver, 5).until(
+                            EC.presence_of_element_located(locator)
+                        )
+                        if password_field:
+                            break
+                    except:
+                        continue
 
-                        if not img_url or img_url == "":
-                            print("仍然無法獲取驗證碼圖片URL，跳過此次嘗試")
-                            system.driver.refresh()
-                            time.sleep(3)
-                            continue
+                if not password_field:
+                    print("無法找到乘客編號輸入框")
+                    system.driver.refresh()
+                    system.ready.document_ready("login_refresh")
+                    return None
+
+                fill_field(password_field, system.booking_data.num)
+                print("已填寫乘客編號")
+
+                # 嘗試填寫驗證碼
+                captcha_field = None
+                captcha_locators = [
+                    (By.CSS_SELECTOR, "#captcha"),
+                    (By.ID, "captcha"),
+                    (By.NAME, "captcha"),
+                    (By.XPATH, "//input[@placeholder='驗證碼']"),
+                    (By.XPATH, "//input[contains(@id, 'captcha')]"),
+                ]
+
+                for locator in captcha_locators:
+                    try:
+                        captcha_field = WebDriverWait(system.driver, 5).until(
+                            EC.presence_of_element_located(locator)
+                        )
+                        if captcha_field:
+                            break
+                    except:
+                        continue
 
-                        # 修正URL處理
-                        if not img_url.startswith("http"):
-                            # 檢查是否是相對於根目錄的路徑
-                            if img_url.startswith("/"):
-                                # 獲取域名部分
-                                domain_parts = system.driver.current_url.split("/")
-                                base_url = f"{domain_parts[0]}//{domain_parts[2]}"
-                                img_url = f"{base_url}{img_url}"
-                            else:
-                                # 獲取當前頁面的基礎URL
-                                base_url = system.driver.current_url.rsplit("/", 1)[0]
-                                img_url = f"{base_url}/{img_url}"
-
-                        # 添加隨機參數避免快取
-                        img_url = f"{img_url}{'&' if '?' in img_url else '?'}random={random.randint(1, 100000)}"
-                        print(f"處理後的圖片URL: {img_url}")
-
-                        # 使用requests庫下載圖片
-                        response = requests.get(img_url, stream=True, timeout=10)
-                        if response.status_code == 200:
-                            with open(debug_img_path, "wb") as f:
-                                f.write(response.content)
-                            print(f"已通過URL下載並保存驗證碼圖片至: {debug_img_path}")
-                        else:
-                            raise Exception(
-                                f"下載圖片失敗，狀態碼: {response.status_code}"
-                            )
-                    except Exception as url_error:
-                        print(f"URL下載驗證碼失敗: {str(url_error)}")
-                        system.driver.refresh()
-                        time.sleep(3)
+                if not captcha_field:
+                    print("無法找到驗證碼輸入框")
+                    system.driver.refresh()
+                    system.ready.document_ready("login_refresh")
+                    return None
+
+                captcha_field.clear()
+                captcha_field.send_keys(captcha_code)
+                print(f"已填寫驗證碼: {captcha_code}")
+
+                # 嘗試點擊登入按鈕
+                login_button = None
+                login_button_locators = [
+                    (By.CSS_SELECTOR, "#btn101"),
+                    (By.ID, "btn101"),
+                    (By.XPATH, "//input[@type='button' and @value='登入']"),
+                    (By.XPATH, "//button[contains(text(), '登入')]"),
+                    (By.XPATH, "//input[contains(@value, '登入')]"),
+                ]
+
+                for locator in login_button_locators:
+                    try:
+                        login_button = WebDriverWait(system.driver, 5).until(
+                            EC.element_to_be_clickable(locator)
+                        )
+                        if login_button:
+                            break
+                    except:
                         continue
 
-            # 使用本地圖片路徑進行驗證碼識別
-            captcha_handler = CaptchaHandler(system.driver)
-            captcha_code = captcha_handler.recognize_captcha(debug_img_path)
+                if not login_button:
+                    print("無法找到登入按鈕")
+                    system.driver.refresh()
+                    system.ready.document_ready("login_refresh")
+                    return None
 
-            if not captcha_code:
-                print("驗證碼識別失敗，重試中...")
-                system.driver.refresh()
-                time.sleep(3)
-                continue
+                if before_submit and not before_submit():
+                    print("其他登入嘗試已經成功，放棄本次登入")
+                    return False
 
-            print(f"識別出的驗證碼: {captcha_code}")
+                login_button.click()
+                captcha_handler.mark_submitted(captcha_image.data, captcha_code, captcha_image.method)
+                print("已點擊登入按鈕")
 
-            # 嘗試登入
-            try:
-                # 使用更靈活的方式填寫登入表單
+                # 等待頁面反應（換頁或出現警告對話框）
+                system.ready.navigation(login_button, "login_response")
+
+                # 檢查是否登入成功 - 改為檢查特定按鈕是否存在
                 try:
-                    # 嘗試填寫帳戶名稱
-                    username_field = None
-                    username_locators = [
-                        (By.CSS_SELECTOR, "#cusname"),
-                        (By.ID, "cusname"),
-                        (By.NAME, "cusname"),
-                        (By.XPATH, "//input[@placeholder='姓名']"),
-                        (By.XPATH, "//input[contains(@id, 'name')]"),
+                    # 尋找特定按鈕元素
+                    success_buttons = [
+                        "查看預約趟",
+                        "查今日車趟_車號(含臨時車)",
+                        "查明日車趟_車號",
+                        "預約訂車",
+                        "查詢預約",
+                        "取消預約"
                     ]
 
-                    for locator in username_locators:
+                    # 等待頁面完全加載
+                    system.ready.document_ready("menu_page")
+                        
+                    # 檢查當前URL
+                    current_url = system.driver.current_url
+                    if "netbook/book.php" in current_url or "book.php" in current_url:
+                        print("通過URL檢查確認登入成功！")
+                        return True
+                            
+                    # 檢查是否有任何一個按鈕存在
+                    for button_text in success_buttons:
                         try:
-                            username_field = WebDriverWait(system.driver, 5).until(
-                                EC.presence_of_element_located(locator)
+                            button = system.driver.find_element(
+                                By.XPATH, f"//input[@value='{button_text}']"
                             )
-                            if username_field:
-                                break
+                            if button and button.is_displayed():
+                                print(f"找到按鈕: {button_text}，登入成功！")
+                                return True
                         except:
                             continue
+                                
+                    # 檢查是否有錯誤訊息
+                    try:
+                        error_elements = system.driver.find_elements(
+                            By.CSS_SELECTOR, ".alert-danger, .error, .w3-red"
+                        )
+                        for error in error_elements:
+                            if error.is_displayed():
+                                print(f"登入失敗 - 出現錯誤訊息: {error.text}")
+                                return False
+                    except:
+                        pass
+                            
+                    # 如果沒有找到任何按鈕，但URL已改變，也視為登入成功
+                    if current_url != system.base_url:
+                        print("URL已改變，登入成功！")
+                        return True
+                            
+                    print("未找到登入成功後的按鈕")
+                    return False
+                except Exception as e:
+                    print(f"檢查登入按鈕時出錯: {str(e)}")
+                    return False
+
+            except Exception as form_error:
+                print(f"填寫表單時發生錯誤: {str(form_error)}")
+                system.driver.refresh()
+                system.ready.document_ready("login_refresh")
 
-                    if not username_field:
-                        print("無法找到用戶名輸入框")
-                        system.driver.refresh()
-                        time.sleep(3)
-                        continue
+        except Exception as login_error:
+            print(f"登入過程中發生錯誤: {str(login_error)}")
+            try:
+                alert = system.driver.switch_to.alert
+                alert.accept()
+            except:
+                pass
+            system.driver.refresh()
+            system.ready.document_ready("login_refresh")
 
-                    username_field.clear()
-                    username_field.send_keys(system.booking_data.name)
-                    print("已填寫帳戶名稱")
-
-                    # 嘗試填寫乘客編號
-                    password_field = None
-                    password_locators = [
-                        (By.CSS_SELECTOR, "#idcode"),
-                        (By.ID, "idcode"),
-                        (By.NAME, "idcode"),
-                        (By.XPATH, "//input[@placeholder='乘客編號']"),
-                        (By.XPATH, "//input[contains(@id, 'code')]"),
-                    ]
+    except Exception as e:
+        print(f"登入嘗試 {attempt + 1} 失敗: {str(e)}")
+        if not is_last:
+            print("準備進行下一次嘗試...")
+            try:
+                alert = system.driver.switch_to.alert
+                alert.accept()
+            except:
+                pass
+            system.driver.refresh()
+            system.ready.document_ready("login_refresh")
 
-                    for locator in password_locators:
-                        try:
-                            password_field = WebDriverWait(system.driver, 5).until(
-                                EC.presence_of_element_located(locator)
-                            )
-                            if password_field:
-                                break
-                        except:
-                            continue
 
-                    if not password_field:
-                        print("無法找到乘客編號輸入框")
-                        system.driver.refresh()
-                        time.sleep(3)
-                        continue
+    return None
 
-                    password_field.clear()
-                    password_field.send_keys(system.booking_data.num)
-                    print("已填寫乘客編號")
-
-                    # 嘗試填寫驗證碼
-                    captcha_field = None
-                    captcha_locators = [
-                        (By.CSS_SELECTOR, "#captcha"),
-                        (By.ID, "captcha"),
-                        (By.NAME, "captcha"),
-                        (By.XPATH, "//input[@placeholder='驗證碼']"),
-                        (By.XPATH, "//input[contains(@id, 'captcha')]"),
-                    ]
 
-                    for locator in captcha_locators:
-                        try:
-                            captcha_field = WebDriverWait(system.driver, 5).until(
-                                EC.presence_of_element_located(locator)
-                            )
-                            if captcha_field:
-                                break
-                        except:
-                            continue
+def handle_login_process(system, max_attempts=5):
+    """處理登入流程，包含驗證碼處理"""
+    # 所有嘗試共用同一個辨識器，重試時只需付出推論時間
+    captcha_handler = CaptchaHandler(system.driver)
+    captcha_fetcher = CaptchaFetcher(system.driver)
+    for attempt in range(max_attempts):
+        result = attempt_login(
+            system, captcha_handler, captcha_fetcher, attempt, is_last=attempt == max_attempts - 1
+        )
+        captcha_handler.report_result(result is True)
+        if result is not None:
+            return result
 
-                    if not captcha_field:
-                        print("無法找到驗證碼輸入框")
-                        system.driver.refresh()
-                        time.sleep(3)
-                        continue
+    print("已達到最大重試次數，登入失敗")
+    return False
 
-                    captcha_field.clear()
-                    captcha_field.send_keys(captcha_code)
-                    print(f"已填寫驗證碼: {captcha_code}")
-
-                    # 嘗試點擊登入按鈕
-                    login_button = None
-                    login_button_locators = [
-                        (By.CSS_SELECTOR, "#btn101"),
-                        (By.ID, "btn101"),
-                        (By.XPATH, "//input[@type='button' and @value='登入']"),
-                        (By.XPATH, "//button[contains(text(), '登入')]"),
-                        (By.XPATH, "//input[contains(@value, '登入')]"),
-                    ]
 
-                    for locator in login_button_locators:
-                        try:
-                            login_button = WebDriverWait(system.driver, 5).until(
-                                EC.element_to_be_clickable(locator)
-                            )
-                            if login_button:
-                                break
-                        except:
-                            continue
+def race_login(booking_data, pool, racers=LOGIN_RACE_SESSIONS, max_attempts=5, base_url=BASE_URL,
+               submit=BOOKING_SUBMIT):
+    """同時以多個獨立的瀏覽器 session 登入，採用第一個成功的 session
 
-                    if not login_button:
-                        print("無法找到登入按鈕")
-                        system.driver.refresh()
-                        time.sleep(3)
-                        continue
+    每個 session 各自取得並辨識自己的驗證碼；送出登入表單則一次只讓一個 session 進行，
+    一旦有 session 成功，其餘 session 便不再送出，避免同一帳號再次登入讓成功的 session 失效
 
-                    login_button.click()
-                    print("已點擊登入按鈕")
+    Args:
+        booking_data: 預約資料
+        pool: DriverPool，每個 session 從中取出一個瀏覽器
+        racers: 同時登入的 session 數量
+        max_attempts: 每個 session 的最大嘗試次數
+        base_url: 登入頁網址
+        submit: 登入成功的 BusBookingSystem 之後是否實際點擊存檔
 
-                    # 等待頁面反應
-                    time.sleep(3)
+    Returns:
+        登入成功的 BusBookingSystem，全部失敗時回傳 None
+    """
+    won = threading.Event()
+    submit_gate = threading.Lock()
 
-                    # 檢查是否登入成功 - 改為檢查特定按鈕是否存在
-                    try:
-                        # 尋找特定按鈕元素
-                        success_buttons = [
-                            "查看預約趟",
-                            "查今日車趟_車號(含臨時車)",
-                            "查明日車趟_車號",
-                            "預約訂車",
-                            "查詢預約",
-                            "取消預約"
-                        ]
-
-                        # 等待頁面完全加載
-                        time.sleep(2)
-                        
-                        # 檢查當前URL
-                        current_url = system.driver.current_url
-                        if "netbook/book.php" in current_url or "book.php" in current_url:
-                            print("通過URL檢查確認登入成功！")
-                            return True
-                            
-                        # 檢查是否有任何一個按鈕存在
-                        for button_text in success_buttons:
-                            try:
-                                button = system.driver.find_element(
-                                    By.XPATH, f"//input[@value='{button_text}']"
-                                )
-                                if button and button.is_displayed():
-                                    print(f"找到按鈕: {button_text}，登入成功！")
-                                    return True
-                            except:
-                                continue
-                                
-                        # 檢查是否有錯誤訊息
-                        try:
-                            error_elements = system.driver.find_elements(
-                                By.CSS_SELECTOR, ".alert-danger, .error, .w3-red"
-                            )
-                            for error in error_elements:
-                                if error.is_displayed():
-                                    print(f"登入失敗 - 出現錯誤訊息: {error.text}")
-                                    return False
-                        except:
-                            pass
-                            
-                        # 如果沒有找到任何按鈕，但URL已改變，也視為登入成功
-                        if current_url != BASE_URL:
-                            print("URL已改變，登入成功！")
-                            return True
-                            
-                        print("未找到登入成功後的按鈕")
-                        return False
-                    except Exception as e:
-                        print(f"檢查登入按鈕時出錯: {str(e)}")
-                        return False
-
-                except Exception as form_error:
-                    print(f"填寫表單時發生錯誤: {str(form_error)}")
-                    system.driver.refresh()
-                    time.sleep(3)
+    def run(index):
+        driver = pool.checkout()
+        try:
+            system = BusBookingSystem(booking_data, base_url=base_url, driver=driver, submit=submit)
+            captcha_handler = CaptchaHandler(system.driver)
+            captcha_fetcher = CaptchaFetcher(system.driver)
+            for attempt in range(max_attempts):
+                if won.is_set():
+                    break
+                holding = []
 
-            except Exception as login_error:
-                print(f"登入過程中發生錯誤: {str(login_error)}")
-                try:
-                    alert = system.driver.switch_to.alert
-                    alert.accept()
-                except:
-                    pass
-                system.driver.refresh()
-                time.sleep(3)
+                def before_submit():
+                    submit_gate.acquire()
+                    holding.append(True)
+                    return not won.is_set()
 
-        except Exception as e:
-            print(f"登入嘗試 {attempt + 1} 失敗: {str(e)}")
-            if attempt < max_attempts - 1:
-                print("準備進行下一次嘗試...")
                 try:
-                    alert = system.driver.switch_to.alert
-                    alert.accept()
-                except:
-                    pass
-                system.driver.refresh()
-                time.sleep(3)
+                    result = attempt_login(
+                        system, captcha_handler, captcha_fetcher, attempt,
+                        is_last=attempt == max_attempts - 1, before_submit=before_submit,
+                    )
+                    captcha_handler.report_result(result is True)
+                    if result:
+                        won.set()
+                        print(f"登入 session {index + 1} 率先成功")
+                        return system
+                finally:
+                    if holding:
+                        submit_gate.release()
+                if result is False:
+                    break
+        except Exception as e:
+            print(f"登入 session {index + 1} 發生錯誤: {str(e)}")
+        pool.release(driver, reuse=True)
+        return None
 
-    print("已達到最大重試次數，登入失敗")
-    return False
+    executor = ThreadPoolExecutor(max_workers=racers, thread_name_prefix="login-race")
+    futures = [executor.submit(run, i) for i in range(racers)]
+    try:
+        for future in as_completed(futures):
+            system = future.result()
+            if system is not None:
+                return system
+        print("所有登入 session 皆失敗")
+        return None
+    finally:
+        # 不等待落敗的 session，它們會在下一個檢查點自行結束並歸還瀏覽器
+        executor.shutdown(wait=False)
 
 
 def main():
@@ -516,6 +533,10 @@ def main():
                     pass
             print("已清理臨時目錄中的舊文件")
 
+        # 在啟動瀏覽器之前先載入並暖機 OCR 模型
+        ocr_metrics = ocr_registry.warm_up()
+        print(f"OCR 模型預載完成: 載入 {ocr_metrics['load_ms']:.1f} ms, 暖機 {ocr_metrics['warmup_ms']:.1f} ms")
+
         args = parse_arguments()
         args.headless = True
         print(f"運行模式: {args.mode}, 無頭模式: {args.headless}")
@@ -569,58 +590,29 @@ def main():
             sender_name="預約系統通知"
         )
 
-        # 創建Firefox選項並設定偏好
-        firefox_options = Options()
-        firefox_options.set_preference("browser.tabs.warnOnRepost", False)
-        # 關閉其他可能的對話框
-        firefox_options.set_preference("dom.successive_dialog_time_limit", 0)
-        firefox_options.set_preference("dom.disable_beforeunload", True)
-        # 禁用 PDF 查看器
-        firefox_options.set_preference("pdfjs.disabled", True)
-        # 禁用緩存
-        firefox_options.set_preference("browser.cache.disk.enable", False)
-        firefox_options.set_preference("browser.cache.memory.enable", False)
-        firefox_options.set_preference("browser.cache.offline.enable", False)
-        firefox_options.set_preference("network.http.use-cache", False)
-        # 添加處理重複提交警告的設定
-        firefox_options.set_preference("browser.formfill.enable", False)
-        firefox_options.set_preference("browser.sessionstore.resume_from_crash", False)
-        firefox_options.set_preference("browser.sessionstore.resume_session_once", False)
-        firefox_options.set_preference("browser.sessionstore.max_resumed_crashes", 0)
-        firefox_options.set_preference("browser.sessionstore.warnOnQuit", False)
-        firefox_options.set_preference("browser.sessionstore.enabled", False)
-
-        # 添加中文語言和字體相關設定
-        firefox_options.set_preference("intl.accept_languages", "zh-TW")
-        firefox_options.set_preference("font.language.group", "zh-TW")
-        firefox_options.set_preference("font.name.serif.zh-TW", "Noto Sans CJK TC")
-        firefox_options.set_preference("font.name.sans-serif.zh-TW", "Noto Sans CJK TC")
-        firefox_options.set_preference("font.name.monospace.zh-TW", "Noto Sans Mono CJK TC")
-        
-        # 添加效能優化設定
-        firefox_options.add_argument("--disable-gpu")  # 停用 GPU 加速
-        firefox_options.add_argument("--disable-extensions")  # 停用擴充功能
-        firefox_options.add_argument("--no-sandbox")  # 停用沙盒模式
-        firefox_options.add_argument("--disable-dev-shm-usage")  # 避免記憶體不足問題
-        firefox_options.add_argument("--lang=zh-TW")  # 設定瀏覽器語言
-
-        # 如果需要無頭模式
+        # 預先啟動瀏覽器並停在登入頁，預約時直接取出使用
         if args.headless:
-            firefox_options.add_argument("--headless")
             print("已啟用無頭模式")
-
         print("正在初始化瀏覽器...")
-        system = BusBookingSystem(
-            booking_data=booking_data,
-            browser_type="firefox",
-            options=firefox_options,  # 使用options而非firefox_profile
-        )
+        pool = DriverPool(size=max(DRIVER_POOL_SIZE, args.login_race), browser="firefox", headless=args.headless)
+        pool.start()
         print("瀏覽器初始化完成")
 
         try:
             # 新增登入處理流程
             print("開始登入流程...")
-            if not handle_login_process(system):
+            if args.login_race > 1:
+                system = race_login(booking_data, pool, args.login_race, submit=args.submit)
+                logged_in = system is not None
+            else:
+                system = BusBookingSystem(
+                    booking_data=booking_data,
+                    browser_type="firefox",
+                    driver=pool.checkout(),
+                    submit=args.submit,
+                )
+                logged_in = handle_login_process(system)
+            if not logged_in:
                 error_msg = "登入失敗，無法完成預約"
                 print(error_msg)
                 try:
@@ -630,10 +622,16 @@ def main():
                     print(f"發送通知失敗: {str(notify_error)}")
                 return
 
-            print("登入成功，開始預約流程...")
-            success, screenshot_path = system.book_journey()
+            if args.armed and system.arm():
+                # 待命模式：登入與驗證碼都已在開放時間前完成，開放時只需送出預約
+                success, screenshot_path = system.fire_at(
+                    args.open_time, relogin=lambda: handle_login_process(system)
+                )
+            else:
+                print("登入成功，開始預約流程...")
+                success, screenshot_path = system.book_journey()
             if success:
-                success_msg = "預約成功"
+                success_msg = "預約成功" if args.submit else "預約表單已填寫完成（未指定 --submit，未點擊存檔）"
                 print(success_msg)
                 
                 if notifier:  # 只有在有通知器的情況下才發送通知
@@ -777,13 +775,12 @@ def main():
                 except Exception as notify_error:
                     print(f"發送錯誤通知失敗: {str(notify_error)}")
         finally:
-            if hasattr(system, "driver"):
-                try:
-                    print("關閉瀏覽器...")
-                    system.driver.quit()
-                    print("瀏覽器已關閉")
-                except Exception as quit_error:
-                    print(f"關閉瀏覽器時發生錯誤: {str(quit_error)}")
+            try:
+                print("關閉瀏覽器...")
+                pool.close()
+                print("瀏覽器已關閉")
+            except Exception as quit_error:
+                print(f"關閉瀏覽器時發生錯誤: {str(quit_error)}")
     except Exception as main_error:
         print(f"主程序發生嚴重錯誤: {str(main_error)}")
 
@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+rayman 訂車網站的本機模擬伺服器
+重現程式會操作到的頁面：book_inq.php 登入頁（含驗證碼圖片）、netbook/book.php 主選單、
+日期與時間選擇頁、地址填寫頁與存檔，供 HTTP 引擎與 Selenium 流程在本機測試
+
+可設定每個請求的延遲、驗證碼行為（嚴格比對 / 任何值皆可 / 固定答案 / 前 N 次必定失敗）、
+額滿的時段與開放預約的時間
+
+用法:
+    python mock_rayman.py [--port 8080] [--latency-ms 80] [--captcha-mode any]
+                          [--full-slots 07:30,08:00] [--open-time 07:00:00]
+    再將 BASE_URL 指向 http://127.0.0.1:8080/rayman/book_inq.php
+"""
+
+import argparse
+import datetime
+import html
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, ImageDraw
+
+# 各縣市的地區選項（城市代碼與 README 相同：a=新北市, b=台北市, c=桃園市, d=基隆市）
+MOCK_AREAS = {
+    "a": ["板橋", "新莊", "蘆洲", "三重", "淡水", "三芝", "萬里", "中和", "永和", "新店"],
+    "b": ["北投", "大安", "萬華", "大同", "中山", "松山", "信義", "南港", "中正", "士林"],
+    "c": ["桃園", "中壢", "龜山", "八德", "蘆竹"],
+    "d": ["仁愛", "信義", "中正", "安樂", "七堵"],
+}
+MOCK_CITIES = [("a", "新北市"), ("b", "台北市"), ("c", "桃園市"), ("d", "基隆市")]
+
+# 去程與回程時段分開，避免兩組 radio 的 onclick 內容重複
+GO_TIMES = [f"{h:02d}:{m:02d}" for h in range(5, 13) for m in (0, 30)]
+BACK_TIMES = [f"{h:02d}:{m:02d}" for h in range(13, 22) for m in (0, 30)]
+
+# 四段地址欄位：(區域輸入框, 城市選單, 地區選單, 地址輸入框, 標題)
+ADDRESS_LEGS = [
+    ("areain", "city", "areain_u", "pointin", "去程上車"),
+    ("areaoff", "citya", "areaoff_u", "pointoff", "去程下車"),
+    ("areain2", "cityb", "areain2_u", "pointin2", "回程上車"),
+    ("areaoff2", "citym", "areaoffb_u", "pointoff2", "回程下車"),
+]
+
+PAGE_SCRIPT = """
+<script>
+function snt() { document.form1.submit(); }
+var AREAS = %s;
+function fillArea(citySelect, areaName) {
+    var target = document.getElementsByName(areaName)[0];
+    target.options.length = 0;
+    (AREAS[citySelect.value] || []).forEach(function (area) {
+        target.options.add(new Option(area, area));
+    });
+}
+function showList(id) {
+    document.getElementById('golist').style.display = id == 'golist' ? '' : 'none';
+    document.getElementById('backlist').style.display = id == 'backlist' ? '' : 'none';
+}
+</script>
+"""
+
+
+def render_captcha(code: str) -> bytes:
+    """產生含有 3 位數字的驗證碼 PNG"""
+    small = Image.new("RGB", (26, 12), "white")
+    draw = ImageDraw.Draw(small)
+    draw.text((2, 0), code, fill=(20, 20, 20))
+    image = small.resize((78, 36), Image.NEAREST)
+    draw = ImageDraw.Draw(image)
+    rng = random.Random(code)
+    for _ in range(3):
+        draw.line([(rng.randint(0, 78), rng.randint(0, 36)), (rng.randint(0, 78), rng.randint(0, 36))],
+                  fill=(150, 150, 150))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class MockRaymanState:
+    """模擬伺服器的設定與 session 狀態"""
+
+    CAPTCHA_MODES = ("strict", "any")
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0,
+                 captcha_mode: str = "strict", captcha_code: str = None,
+                 captcha_fail_first: int = 0, full_slots=(), open_time: str = None):
+        """
+        Args:
+            latency_ms: 每個請求固定增加的延遲（毫秒）
+            jitter_ms: 延遲的隨機抖動上限（毫秒）
+            captcha_mode: strict=必須與圖片相符, any=任何值都接受
+            captcha_code: 固定的驗證碼答案，未設定時每次隨機產生
+            captcha_fail_first: 每個 session 前 N 次登入一律視為驗證碼錯誤
+            full_slots: 顯示為「車班已滿.排候補」且無法存檔的時段
+            open_time: 開放預約的時間（HH:MM:SS），之前進入預約訂車會顯示尚未開放
+        """
+        if captcha_mode not in self.CAPTCHA_MODES:
+            raise ValueError(f"不支援的驗證碼模式: {captcha_mode}")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.captcha_mode = captcha_mode
+        self.captcha_code = captcha_code
+        self.captcha_fail_first = captcha_fail_first
+        self.full_slots = set(full_slots)
+        self.open_time = open_time
+        self.sessions = {}
+        self.bookings = []
+        self.stats = {"requests": 0, "login_failures": 0, "full_rejections": 0}
+        self.lock = threading.Lock()
+
+    def delay(self):
+        """模擬網路與伺服器處理延遲"""
+        with self.lock:
+            self.stats["requests"] += 1
+        total = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if total > 0:
+            time.sleep(total / 1000)
+
+    def is_open(self) -> bool:
+        if not self.open_time:
+            return True
+        return datetime.datetime.now().strftime("%H:%M:%S") >= self.open_time
+
+    def new_captcha(self) -> str:
+        return self.captcha_code or f"{random.randint(0, 999):03d}"
+
+    def check_captcha(self, session, answer) -> bool:
+        session["login_attempts"] += 1
+        if session["login_attempts"] <= self.captcha_fail_first:
+            return False
+        if self.captcha_mode == "any":
+            return True
+        return session["captcha"] is not None and answer == session["captcha"]
+
+    def session(self, sid):
+        with self.lock:
+            if sid not in self.sessions:
+                self.sessions[sid] = {"captcha": None, "logged_in": False, "login_attempts": 0}
+            return self.sessions[sid]
+
+
+class MockRaymanHandler(BaseHTTPRequestHandler):
+    """處理 rayman 頁面的請求"""
+
+    state: MockRaymanState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---- 共用工具 ----
+
+    def _sid(self):
+        """取得目前請求的 session id，沒有 cookie 時產生新的（同一請求內只產生一次）"""
+        if getattr(self, "_session_id", None) is None:
+            self._session_id, self._session_new = secrets.token_hex(8), True
+            cookie = self.headers.get("Cookie", "")
+            for part in cookie.split(";"):
+                key, _, value = part.strip().partition("=")
+                if key == "PHPSESSID" and value:
+                    self._session_id, self._session_new = value, False
+        return self._session_id, self._session_new
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        sid, is_new = self._sid()
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        if is_new:
+            self.send_header("Set-Cookie", f"PHPSESSID={sid}; path=/")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirect(self, location):
+        self._send(302, "", headers={"Location": location})
+
+    def _form_data(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length).decode("utf-8", errors="replace")
+        return {k: v[0] for k, v in parse_qs(raw, keep_blank_values=True).items()}
+
+    @staticmethod
+    def _page(title, body):
+        return (f"<html><head><meta charset='utf-8'><title>{title}</title>"
+                f"{PAGE_SCRIPT % json.dumps(MOCK_AREAS, ensure_ascii=False)}</head>"
+                f"<body>{body}</body></html>")
+
+    # ---- 頁面 ----
+
+    def _login_page(self, error=""):
+        error_html = f"<div class='alert-danger w3-red'>{html.escape(error)}</div>" if error else ""
+        body = f"""
+        {error_html}
+        <form id="form1" name="form1" method="post" action="book_inq.php">
+          <input type="hidden" name="act" value="login">
+          <input id="cusname" class="w3-large" name="cusname" placeholder="姓名">
+          <input id="idcode" class="w3-large" name="idcode" placeholder="乘客編號">
+          <img id="captchaImage" alt="captcha" src="captcha.php?random={random.randint(1, 100000)}">
+          <input id="captcha" name="captcha" placeholder="驗證碼">
+          <input type="button" id="btn101" class="btn" value="登入" onclick="snt()">
+        </form>"""
+        return self._page("登入", body)
+
+    def _menu_page(self):
+        now = datetime.datetime.now().strftime("%m/%d %H:%M:%S")
+        body = f"""
+        <div align="center" class="w3-large">新北市復康巴士 網路訂車 <span id="time">{now}</span></div>
+        <form id="form1" name="form1" method="post" action="book.php">
+          <input type="hidden" name="act" value="">
+          <input type="button" class="btn_grey" name="btn19" value="查看預約趟" onclick="act.value='view';snt()">
+          <input type="button" name="btn20" value="預約訂車" onclick="act.value='netbook';snt()">
+          <input type="button" name="btn21" value="查詢預約" onclick="act.value='view';snt()">
+        </form>"""
+        return self._page("主選單", body)
+
+    def _slot_status(self, slot):
+        return "車班已滿.排候補" if slot in self.state.full_slots else "有車班"
+
+    def _choose_page(self):
+        today = datetime.date.today()
+        dates = [today + datetime.timedelta(days=i) for i in range(1, 15)]
+        date_buttons = "".join(
+            f"<input type='button' value='{d.strftime('%m/%d')}' onclick=\"bdate.value='{d.strftime('%m/%d')}'\">"
+            for d in dates
+        )
+        go_rows = "".join(
+            f"<tr><td><input type='radio' name='rgo' value='{t}' "
+            f"onclick=\"jump.value='{t}';gotime.value=jump.value\"> {t} [{self._slot_status(t)}]</td></tr>"
+            for t in GO_TIMES
+        )
+        back_rows = "".join(
+            f"<tr><td><input type='radio' name='rback' value='{t}' "
+            f"onclick=\"jump.value='{t}';backtime.value=jump.value\"> {t} [{self._slot_status(t)}]</td></tr>"
+            for t in BACK_TIMES
+        )
+        body = f"""
+        <form id="form1" name="form1" method="post" action="book.php">
+          <input type="hidden" name="act" value="">
+          <input type="hidden" name="jump" value="">
+          <input type="hidden" name="bdate" value="">
+          <input type="hidden" name="gotime" value="">
+          <input type="hidden" name="backtime" value="">
+          <div>{date_buttons}</div>
+          <input type="button" id="setgom2" value="去程" onclick="showList('golist')">
+          <input type="button" id="setgon" value="回程" onclick="showList('backlist')">
+          <table id="innerTable"><tbody>
+            <tr id="golist"><td><table>{go_rows}</table></td></tr>
+            <tr id="backlist" style="display:none"><td><table>{back_rows}</table></td></tr>
+          </tbody></table>
+          <input type="button" id="next5" value="送出" onclick="act.value='choose';snt()">
+        </form>"""
+        return self._page("選擇日期時間", body)
+
+    def _address_page(self, data):
+        city_options = "".join(f"<option value='{code}'>{name}</option>" for code, name in MOCK_CITIES)
+        legs = ""
+        for area_input, city, area_select, address, title in ADDRESS_LEGS:
+            legs += f"""
+            <div><b>{title}</b>
+              <input type="text" name="{area_input}" id="{area_input}" value="">
+              <select name="{city}" onchange="fillArea(this, '{area_select}')">{city_options}</select>
+              <select name="{area_select}"></select>
+              <input type="text" name="{address}" value="">
+            </div>"""
+            if area_input == "areaoff":
+                legs += "<textarea name='pmark'></textarea>"
+        hidden = "".join(
+            f"<input type='hidden' name='{name}' value='{html.escape(data.get(name, ''))}'>"
+            for name in ("bdate", "gotime", "backtime")
+        )
+        body = f"""
+        <form id="form1" name="form1" method="post" action="book.php">
+          <input type="hidden" name="act" value="">
+          {hidden}
+          {legs}
+          <input type="button" id="btnSave" value="存檔" onclick="act.value='save';snt()">
+        </form>"""
+        return self._page("填寫地址", body)
+
+    def _result_page(self, message):
+        body = f"""
+        <form id="form1" name="form1" method="post" action="book.php">
+          <h1>{html.escape(message)}</h1>
+          <input type="hidden" name="act" value="">
+          <input type="button" name="btn1" value="回主選單" onclick="act.value='';snt()">
+          <input type="button" class="btn_grey" name="btn19" value="查看預約趟" onclick="act.value='view';snt()">
+        </form>"""
+        return self._page(message, body)
+
+    # ---- 路由 ----
+
+    def do_GET(self):
+        self.state.delay()
+        path = urlparse(self.path).path
+        sid, _ = self._sid()
+        session = self.state.session(sid)
+        if path.endswith("/captcha.php"):
+            session["captcha"] = self.state.new_captcha()
+            self._send(200, render_captcha(session["captcha"]), content_type="image/png")
+        elif path.endswith("/book_inq.php"):
+            self._send(200, self._login_page())
+        elif path.endswith("/netbook/book.php"):
+            if not session["logged_in"]:
+                self._redirect("../book_inq.php")
+                return
+            self._send(200, self._menu_page())
+        else:
+            self._send(404, "not found")
+
+    def do_POST(self):
+        self.state.delay()
+        path = urlparse(self.path).path
+        sid, _ = self._sid()
+        session = self.state.session(sid)
+        data = self._form_data()
+        if path.endswith("/book_inq.php"):
+            captcha_ok = self.state.check_captcha(session, data.get("captcha"))
+            if data.get("cusname") and data.get("idcode") and captcha_ok:
+                session["logged_in"] = True
+                self._redirect("netbook/book.php")
+            else:
+                with self.state.lock:
+                    self.state.stats["login_failures"] += 1
+                self._send(200, self._login_page("驗證碼錯誤"))
+        elif path.endswith("/netbook/book.php"):
+            if not session["logged_in"]:
+                self._redirect("../book_inq.php")
+                return
+            act = data.get("act", "")
+            if act == "netbook":
+                if not self.state.is_open():
+                    self._send(200, self._result_page(f"尚未開放預約，開放時間 {self.state.open_time}"))
+                    return
+                self._send(200, self._choose_page())
+            elif act == "choose":
+                self._send(200, self._address_page(data))
+            elif act == "save":
+                full = self.state.full_slots & {data.get("gotime"), data.get("backtime")}
+                with self.state.lock:
+                    if full:
+                        self.state.stats["full_rejections"] += 1
+                    else:
+                        self.state.bookings.append(data)
+                if full:
+                    self._send(200, self._result_page(f"車班已滿 {'、'.join(sorted(full))}，已排候補"))
+                else:
+                    self._send(200, self._result_page("預約成功"))
+            else:
+                self._send(200, self._menu_page())
+        else:
+            self._send(404, "not found")
+
+
+class MockRaymanServer:
+    """在背景執行緒中啟動模擬伺服器"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **state_options):
+        self.state = MockRaymanState(**state_options)
+        handler = type("BoundMockRaymanHandler", (MockRaymanHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/rayman/book_inq.php"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rayman 訂車網站模擬伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0, help="每個請求的延遲（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="延遲的隨機抖動上限（毫秒）")
+    parser.add_argument("--captcha-mode", choices=MockRaymanState.CAPTCHA_MODES, default="strict")
+    parser.add_argument("--captcha-code", default=None, help="固定的驗證碼答案")
+    parser.add_argument("--captcha-fail-first", type=int, default=0, help="前 N 次登入一律失敗")
+    parser.add_argument("--full-slots", default="", help="額滿時段，以逗號分隔，例如 07:30,13:30")
+    parser.add_argument("--open-time", default=None, help="開放預約時間 HH:MM:SS")
+    args = parser.parse_args()
+
+    server = MockRaymanServer(
+        args.host, args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        captcha_mode=args.captcha_mode,
+        captcha_code=args.captcha_code,
+        captcha_fail_first=args.captcha_fail_first,
+        full_slots=[s.strip() for s in args.full_slots.split(",") if s.strip()],
+        open_time=args.open_time,
+    )
+    print(f"模擬伺服器啟動: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多乘客同時預約
+讀取多位乘客的預約資料，在限制的同時數量內平行預約，每位乘客使用獨立的瀏覽器或 HTTP session，
+最後彙整所有乘客的結果寄出一封通知
+
+用法:
+    python multi_booking.py --riders riders.json --engine selenium --concurrency 3 --armed --submit
+
+不加 --submit 時只填寫到存檔前，不會送出預約
+
+riders.json 為 BookingData 欄位組成的清單，回程欄位可使用 same_goto_dropoff / same_pickup
+"""
+
+import argparse
+import html
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from typing import List, Optional
+
+from config import BASE_URL, BOOKING_SUBMIT, MULTI_BOOKING_CONCURRENCY, OPEN_TIME
+from ycbus_v2 import BookingData, BusBookingSystem
+
+
+@dataclass
+class RiderResult:
+    """單一乘客的預約結果"""
+    name: str
+    date: str
+    success: bool
+    engine: str
+    elapsed: float  # 秒
+    screenshot_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+def load_riders(path: str) -> List[BookingData]:
+    """從 JSON 檔讀取乘客清單"""
+    from main import apply_return_shortcuts
+
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    names = [field.name for field in fields(BookingData)]
+    riders = []
+    for entry in entries:
+        data = {name: str(entry.get(name, "")) for name in names}
+        riders.append(BookingData(**apply_return_shortcuts(data)))
+    return riders
+
+
+class MultiBookingOrchestrator:
+    """在同時數量限制內平行為多位乘客預約"""
+
+    ENGINES = ("selenium", "http")
+
+    def __init__(self, riders: List[BookingData], engine: str = "selenium",
+                 max_concurrency: int = MULTI_BOOKING_CONCURRENCY, armed: bool = False,
+                 open_time: str = OPEN_TIME, base_url: str = BASE_URL, headless: bool = True,
+                 submit: bool = BOOKING_SUBMIT):
+        """
+        Args:
+            riders: 每位乘客的預約資料
+            engine: selenium（BusBookingSystem）或 http（HttpBookingSystem）
+            max_concurrency: 同時進行的預約數量上限
+            armed: 是否先登入待命，於開放時間送出（僅 selenium）；同時預約數量會提高為乘客人數
+            open_time: 開放預約的時間（HH:MM:SS）
+            base_url: 登入頁網址
+            headless: 瀏覽器是否使用無頭模式
+            submit: 是否實際點擊存檔送出預約，False 時只填寫到存檔前
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"不支援的預約引擎: {engine}")
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.riders = riders
+        self.engine = engine
+        self.max_concurrency = max(1, min(max_concurrency, len(riders) or 1))
+        self.armed = armed
+        if armed and engine == "selenium" and len(riders) > self.max_concurrency:
+            # 待命中的乘客會佔住執行緒直到開放時間，超出上限的乘客要等到開放後才能登入
+            self.logger.warning(
+                f"待命模式需要每位乘客同時登入，同時預約數量由 {self.max_concurrency} 提高為 {len(riders)}"
+            )
+            self.max_concurrency = len(riders)
+        self.open_time = open_time
+        self.base_url = base_url
+        self.headless = headless
+        self.submit = submit
+        self.pool = None
+        # 尚未開始的 selenium 預約數量，歸零後歸還的瀏覽器不再補充
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    def _book_selenium(self, booking_data: BookingData):
+        """以獨立的瀏覽器完成登入與預約，回傳 (是否成功, 截圖路徑)"""
+        from main import handle_login_process
+
+        with self._waiting_lock:
+            self._waiting -= 1
+        driver = self.pool.checkout()
+        try:
+            system = BusBookingSystem(booking_data, base_url=self.base_url, driver=driver, submit=self.submit)
+            if not handle_login_process(system):
+                raise RuntimeError("登入失敗")
+            if self.armed and system.arm():
+                return system.fire_at(self.open_time, relogin=lambda: handle_login_process(system))
+            return system.book_journey()
+        finally:
+            with self._waiting_lock:
+                refill = self._waiting > 0
+            self.pool.release(driver, refill=refill)
+
+    def _book_http(self, booking_data: BookingData):
+        """以獨立的 HTTP session 完成登入與預約，回傳 (是否成功, 截圖路徑)"""
+        from ycbus_http import HttpBookingSystem
+
+        system = HttpBookingSystem(booking_data, base_url=self.base_url, submit=self.submit)
+        try:
+            if not system.login():
+                raise RuntimeError("登入失敗")
+            return system.book_journey()
+        finally:
+            system.close()
+
+    def _book_one(self, booking_data: BookingData) -> RiderResult:
+        book = self._book_selenium if self.engine == "selenium" else self._book_http
+        start = time.perf_counter()
+        try:
+            success, screenshot_path = book(booking_data)
+            error = None if success else "預約失敗"
+        except Exception as e:
+            success, screenshot_path, error = False, None, str(e)
+        result = RiderResult(
+            name=booking_data.name,
+            date=booking_data.date,
+            success=bool(success),
+            engine=self.engine,
+            elapsed=time.perf_counter() - start,
+            screenshot_path=screenshot_path,
+            error=error,
+        )
+        self.logger.info(
+            f"{result.name} 預約{'成功' if result.success else '失敗'}，耗時 {result.elapsed:.1f} 秒"
+            + (f"（{result.error}）" if result.error else "")
+        )
+        return result
+
+    def run(self) -> List[RiderResult]:
+        """平行執行所有乘客的預約，結果順序與乘客清單相同"""
+        from utils import ocr_registry
+
+        ocr_registry.warm_up()
+        if self.engine == "selenium":
+            from utils.driver_pool import DriverPool
+
+            # 每位同時進行的乘客各有一個預先啟動的瀏覽器
+            self.pool = DriverPool(size=self.max_concurrency, headless=self.headless, base_url=self.base_url)
+            self.pool.start()
+            self._waiting = len(self.riders)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="rider") as executor:
+                return list(executor.map(self._book_one, self.riders))
+        finally:
+            if self.pool:
+                self.pool.close()
+                self.pool = None
+
+
+def build_summary(results: List[RiderResult]):
+    """彙整所有乘客的結果，回傳 (主旨, 純文字內容, HTML 內容, 截圖路徑清單)"""
+    succeeded = sum(1 for r in results if r.success)
+    subject = f"多乘客預約結果：成功 {succeeded}/{len(results)}"
+    lines = ["多乘客預約結果", "===================="]
+    rows = []
+    for r in results:
+        status = "成功" if r.success else f"失敗（{r.error}）"
+        lines.append(f"{r.name}　{r.date}　{status}　{r.elapsed:.1f} 秒")
+        rows.append(
+            f"<tr><td>{html.escape(r.name)}</td><td>{html.escape(r.date)}</td>"
+            f"<td>{html.escape(status)}</td><td>{r.elapsed:.1f} 秒</td></tr>"
+        )
+    lines += ["====================", "此為自動發送的通知郵件，請勿直接回覆。"]
+    html_content = f"""
+<html>
+<body>
+    <h2>{html.escape(subject)}</h2>
+    <table border="1" cellpadding="6" style="border-collapse: collapse;">
+        <tr><th>乘客</th><th>日期</th><th>結果</th><th>耗時</th></tr>
+        {''.join(rows)}
+    </table>
+    <p style="font-size: 12px; color: #666;">此為自動發送的通知郵件，請勿直接回覆。</p>
+</body>
+</html>
+"""
+    attachments = [r.screenshot_path for r in results if r.screenshot_path]
+    return subject, "\n".join(lines), html_content, attachments
+
+
+def notify(results: List[RiderResult], notifier) -> bool:
+    """寄出一封彙整所有乘客結果的通知"""
+    subject, text_content, html_content, attachments = build_summary(results)
+    try:
+        notifier.send_notification(subject, text_content, html_content, attachments or None)
+        return True
+    except Exception as e:
+        print(f"發送彙整通知失敗: {str(e)}")
+        return False
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="YC Bus 多乘客預約")
+    parser.add_argument("--riders", required=True, help="乘客預約資料 JSON 檔")
+    parser.add_argument("--engine", choices=MultiBookingOrchestrator.ENGINES, default="selenium")
+    parser.add_argument("--concurrency", type=int, default=MULTI_BOOKING_CONCURRENCY, help="同時預約的數量上限")
+    parser.add_argument("--armed", action="store_true", help="提前登入待命，於開放時間準時送出預約")
+    parser.add_argument("--open-time", default=OPEN_TIME, help="開放預約的時間 (HH:MM:SS)")
+    parser.add_argument("--base-url", default=BASE_URL, help="登入頁網址（可指向 mock_rayman）")
+    parser.add_argument("--submit", action="store_true", default=BOOKING_SUBMIT,
+                        help="實際點擊存檔送出預約（未指定時只填寫到存檔前）")
+    parser.add_argument("--no-notify", action="store_true", help="不寄出彙整通知")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    riders = load_riders(args.riders)
+    print(f"共 {len(riders)} 位乘客，同時預約上限 {args.concurrency}，引擎: {args.engine}")
+
+    orchestrator = MultiBookingOrchestrator(
+        riders,
+        engine=args.engine,
+        max_concurrency=args.concurrency,
+        armed=args.armed,
+        open_time=args.open_time,
+        base_url=args.base_url,
+        submit=args.submit,
+    )
+    results = orchestrator.run()
+    _, text_content, _, _ = build_summary(results)
+    print(text_content)
+
+    if not args.no_notify:
+        from main import load_data_from_txt
+        from utils.email_notification import EmailNotifier
+
+        data = load_data_from_txt()
+        notifier = EmailNotifier(
+            sender_email=data["gmail_sender"],
+            app_password=data["gmail_password"],
+            recipient_emails=[e.strip() for e in data["recipient_emails"].split(",") if e.strip()],
+            sender_name="預約系統通知",
+        )
+        notify(results, notifier)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""HttpBookingSystem 對 mock_rayman 模擬伺服器的端到端測試：登入 → 預約"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_booking import make_booking_data
+from mock_rayman import MockRaymanServer
+from ycbus_http import HttpBookingSystem
+
+CAPTCHA_CODE = "123"
+
+
+@pytest.fixture
+def server():
+    with MockRaymanServer(captcha_code=CAPTCHA_CODE) as running:
+        yield running
+
+
+def book(server, submit):
+    system = HttpBookingSystem(make_booking_data(), base_url=server.base_url,
+                               recognizer=lambda image_bytes: CAPTCHA_CODE, submit=submit)
+    try:
+        assert system.login()
+        return system.book_journey()
+    finally:
+        system.close()
+
+
+def test_login_and_submit_booking(server):
+    success, _ = book(server, submit=True)
+    assert success
+    assert len(server.state.bookings) == 1
+    booking = server.state.bookings[0]
+    assert booking["gotime"] == "07:30"
+    assert booking["pointin"] == "萬里地址"
+
+
+def test_without_submit_does_not_save(server):
+    success, _ = book(server, submit=False)
+    assert success
+    assert server.state.bookings == []
+
+
+def test_wrong_captcha_is_rejected(server):
+    system = HttpBookingSystem(make_booking_data(), base_url=server.base_url,
+                               recognizer=lambda image_bytes: "000")
+    try:
+        assert not system.login()
+    finally:
+        system.close()
+    assert server.state.stats["login_failures"] > 0
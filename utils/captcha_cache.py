@@ -0,0 +1,189 @@
+"""
+驗證碼辨識結果快取
+以驗證碼圖片的內容雜湊（SHA-1）或感知雜湊（dHash）為鍵，保存辨識出的答案以及登入時是否被接受；
+只有確認正確（登入成功）的答案會直接回傳，略過整個多引擎辨識流程。
+快取存放在 SQLite 中，超過容量時淘汰最久未使用的項目
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from config import CAPTCHA_CACHE_HASH, CAPTCHA_CACHE_PATH, CAPTCHA_CACHE_SIZE
+
+# dHash 的邊長，16 表示 16x16 = 256 位元，足以區分不同的 3 位數驗證碼
+DHASH_SIZE = 16
+
+
+def dhash(image_bytes: bytes, size: int = DHASH_SIZE) -> Optional[str]:
+    """
+    計算圖片的差異雜湊（dHash）
+
+    縮小為 (size+1) x size 的灰階圖後比較相鄰像素的亮度，
+    同一張驗證碼經由截圖、canvas 或 HTTP 取得（位元組不同但像素相同）會得到相同的雜湊
+
+    Returns:
+        16 進位字串，無法解碼時回傳 None
+    """
+    gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return np.packbits(bits).tobytes().hex()
+
+
+def image_key(image_bytes: bytes, mode: str = CAPTCHA_CACHE_HASH) -> str:
+    """
+    產生驗證碼圖片的快取鍵
+
+    Args:
+        image_bytes: 驗證碼圖片 bytes
+        mode: sha1（完全相同的位元組才算同一張）或 dhash（感知雜湊，像素相近的不同圖片也可能得到相同的鍵）
+    """
+    if mode == "dhash":
+        digest = dhash(image_bytes)
+        if digest:
+            return f"d:{digest}"
+    return f"s:{hashlib.sha1(image_bytes).hexdigest()}"
+
+
+class CaptchaCache:
+    """以 SQLite 保存的驗證碼答案快取（LRU 淘汰）"""
+
+    def __init__(self, path: str = CAPTCHA_CACHE_PATH, max_entries: int = CAPTCHA_CACHE_SIZE,
+                 hash_mode: str = CAPTCHA_CACHE_HASH):
+        """
+        Args:
+            path: SQLite 檔案路徑，":memory:" 表示只存在記憶體中
+            max_entries: 最多保存的項目數
+            hash_mode: sha1 或 dhash
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hash_mode = hash_mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS captcha_cache (
+                key TEXT PRIMARY KEY,
+                code TEXT NOT NULL,
+                confirmed INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_captcha_cache_last_used ON captcha_cache (last_used)")
+        self._conn.commit()
+
+    def key(self, image_bytes: bytes) -> str:
+        return image_key(image_bytes, self.hash_mode)
+
+    def lookup(self, image_bytes: bytes) -> Optional[str]:
+        """
+        查詢已確認正確的答案
+
+        Returns:
+            登入時被接受過的驗證碼，沒有時回傳 None
+        """
+        key = self.key(image_bytes)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT code FROM captcha_cache WHERE key = ? AND confirmed = 1", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE captcha_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return row[0]
+
+    def record(self, image_bytes: bytes, code: str, accepted: bool):
+        """
+        記錄送出的答案與登入結果
+
+        Args:
+            image_bytes: 驗證碼圖片 bytes
+            code: 送出的驗證碼
+            accepted: 登入是否成功；失敗的答案只會覆蓋同樣未確認的紀錄
+        """
+        key = self.key(image_bytes)
+        with self._lock:
+            if accepted:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO captcha_cache (key, code, confirmed, last_used) VALUES (?, ?, 1, ?)",
+                    (key, code, time.time()),
+                )
+            else:
+                # 已確認正確的答案不會被失敗的紀錄覆蓋（失敗也可能來自帳號或網路問題）
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO captcha_cache (key, code, confirmed, last_used) VALUES (?, ?, 0, ?)",
+                    (key, code, time.time()),
+                )
+                self._conn.execute(
+                    "UPDATE captcha_cache SET code = ?, last_used = ? WHERE key = ? AND confirmed = 0",
+                    (code, time.time(), key),
+                )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """超過容量時刪除最久未使用的項目"""
+        count = self._conn.execute("SELECT COUNT(*) FROM captcha_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM captcha_cache WHERE key IN "
+                "(SELECT key FROM captcha_cache ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    @property
+    def hit_rate(self) -> float:
+        """本次執行的快取命中率（0~1）"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """回傳命中次數、未命中次數、命中率與目前項目數"""
+        with self._lock:
+            entries, confirmed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(confirmed), 0) FROM captcha_cache"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": entries,
+            "confirmed": confirmed,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared: Optional[CaptchaCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_cache() -> CaptchaCache:
+    """取得程序內共用的驗證碼快取，第一次呼叫時才開啟"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = CaptchaCache()
+        return _shared
@@ -0,0 +1,189 @@
+"""
+驗證碼訓練資料收集
+登入成功代表送出的驗證碼答案正確，將每張送出過的驗證碼圖片與答案（以及是否被接受）
+附加寫入 SQLite，供準確率基準測試與之後的模型訓練使用。
+每筆資料記錄來自真實網站或 mock_rayman 等本機測試伺服器，讀取時預設只取真實網站的資料。
+寫入由背景執行緒處理，登入流程只需把資料放進佇列
+"""
+
+import atexit
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import BASE_URL, CAPTCHA_DATASET_PATH
+
+# 資料來源：真實網站，或 mock_rayman 等其他伺服器（基準測試、本機測試）
+ORIGIN_REAL = "real"
+ORIGIN_MOCK = "mock"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captchas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    sha1 TEXT NOT NULL,
+    label TEXT NOT NULL,
+    accepted INTEGER NOT NULL,
+    source TEXT,
+    image BLOB NOT NULL,
+    origin TEXT
+)
+"""
+
+
+def page_origin(url: Optional[str], base_url: str = BASE_URL) -> Optional[str]:
+    """
+    依驗證碼所在頁面的網址判斷資料來源
+
+    Returns:
+        與 base_url 同一主機時為 ORIGIN_REAL，其他主機為 ORIGIN_MOCK，無法判斷時回傳 None
+    """
+    host = urlparse(url).hostname if url else None
+    if not host:
+        return None
+    return ORIGIN_REAL if host == urlparse(base_url).hostname else ORIGIN_MOCK
+
+
+def _migrate(conn: sqlite3.Connection):
+    """為舊版資料庫加上 origin 欄位，舊資料的來源無法確定，保留為 NULL"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(captchas)")}
+    if "origin" not in columns:
+        conn.execute("ALTER TABLE captchas ADD COLUMN origin TEXT")
+        conn.commit()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA)
+    conn.commit()
+    _migrate(conn)
+    return conn
+
+
+class CaptchaDataset:
+    """只會附加的驗證碼資料集，寫入在背景執行緒中進行"""
+
+    # 背景執行緒每次最多合併寫入的筆數
+    BATCH_SIZE = 50
+
+    def __init__(self, path: str = CAPTCHA_DATASET_PATH):
+        """
+        Args:
+            path: SQLite 檔案路徑
+        """
+        self.path = path
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name="captcha-dataset", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, image_bytes: bytes, label: str, accepted: bool, source: Optional[str] = None,
+            origin: Optional[str] = None):
+        """
+        放入一筆資料，立即返回不等待寫入
+
+        Args:
+            image_bytes: 驗證碼圖片 bytes
+            label: 送出的答案
+            accepted: 登入是否成功（False 表示答案錯誤）
+            source: 擷取方式
+            origin: ORIGIN_REAL 或 ORIGIN_MOCK，None 表示無法判斷
+        """
+        self._queue.put((time.time(), bytes(image_bytes), label, bool(accepted), source, origin))
+
+    def _writer(self):
+        conn = None
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [entry for entry in batch if entry is not None]
+            if rows:
+                try:
+                    if conn is None:
+                        conn = _connect(self.path)
+                    conn.executemany(
+                        "INSERT INTO captchas (created, sha1, label, accepted, source, image, origin)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (created, hashlib.sha1(data).hexdigest(), label, int(accepted), source, data, origin)
+                            for created, data, label, accepted, source, origin in rows
+                        ],
+                    )
+                    conn.commit()
+                except Exception as e:
+                    print(f"寫入驗證碼資料集失敗: {str(e)}")
+            for _ in batch:
+                self._queue.task_done()
+            if len(rows) < len(batch):
+                # 收到結束訊號
+                if conn is not None:
+                    conn.close()
+                return
+
+    def flush(self):
+        """等待佇列中的資料全部寫入"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """寫完剩餘資料後結束背景執行緒"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+def iter_samples(path: str = CAPTCHA_DATASET_PATH, accepted_only: bool = True,
+                 limit: Optional[int] = None) -> Iterator[Tuple[int, bytes, str, bool]]:
+    """
+    讀取資料集
+
+    Args:
+        path: SQLite 檔案路徑
+        accepted_only: 只回傳真實網站上登入成功（答案正確）的資料，
+            模擬伺服器與來源不明的資料不會用於訓練
+        limit: 最多回傳幾筆，None 表示全部
+
+    Yields:
+        (編號, 圖片 bytes, 答案, 是否被接受)
+    """
+    if not os.path.isfile(path):
+        return
+    conn = sqlite3.connect(path)
+    try:
+        _migrate(conn)
+        sql = "SELECT id, image, label, accepted FROM captchas"
+        if accepted_only:
+            sql += f" WHERE accepted = 1 AND origin = '{ORIGIN_REAL}'"
+        sql += " ORDER BY id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        for row_id, image, label, accepted in conn.execute(sql):
+            yield row_id, bytes(image), label, bool(accepted)
+    finally:
+        conn.close()
+
+
+_shared: Optional[CaptchaDataset] = None
+_shared_lock = threading.Lock()
+
+
+def get_dataset() -> CaptchaDataset:
+    """取得程序內共用的資料集寫入器，第一次呼叫時才啟動背景執行緒"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = CaptchaDataset()
+        return _shared
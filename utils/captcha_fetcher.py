@@ -0,0 +1,212 @@
+"""
+驗證碼圖片擷取模組
+直接從驗證碼元素取得圖片 bytes，不經過整頁截圖與裁切，也不寫入磁碟；
+需要換一張驗證碼時只重新載入圖片，不重新整理整個登入頁
+"""
+
+import base64
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urljoin
+
+import requests
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# 只替換驗證碼圖片的 src 並等待新圖片載入；逾時或載入失敗時回傳 false
+REFRESH_SCRIPT = """
+var img = arguments[0], timeoutMs = arguments[1], src = arguments[2];
+var done = arguments[arguments.length - 1];
+var timer = setTimeout(function () { done(false); }, timeoutMs);
+img.addEventListener('load', function () { clearTimeout(timer); done(img.naturalWidth > 0); }, {once: true});
+img.addEventListener('error', function () { clearTimeout(timer); done(false); }, {once: true});
+img.src = src;
+"""
+
+
+def with_cache_buster(url: str) -> str:
+    """加上新的 random= 參數（取代原有的），讓瀏覽器與伺服器都產生新的驗證碼"""
+    url = re.sub(r"([?&])random=[^&#]*&?", r"\1", url).rstrip("?&")
+    return f"{url}{'&' if '?' in url else '?'}random={random.randint(1, 100000)}"
+
+
+@dataclass
+class CaptchaImage:
+    """擷取到的驗證碼圖片"""
+    data: bytes
+    method: str  # 取得方式：element_screenshot / canvas / http
+    elapsed_ms: float
+
+
+class CaptchaFetcher:
+    """從瀏覽器中的驗證碼元素取得圖片 bytes"""
+
+    # 驗證碼圖片的定位方式，依序嘗試
+    LOCATORS = [
+        (By.ID, "captchaImage"),
+        (By.CSS_SELECTOR, "img[src*='captcha']"),
+        (By.CSS_SELECTOR, "img[alt*='captcha']"),
+        (By.XPATH, "//img[contains(@src, 'captcha')]"),
+        (By.XPATH, "//img[contains(@alt, 'captcha')]"),
+    ]
+
+    # 圖片小於此大小視為擷取失敗
+    MIN_BYTES = 100
+
+    def __init__(self, driver, timeout: float = 5):
+        """
+        初始化擷取器
+
+        Args:
+            driver: Selenium WebDriver
+            timeout: 等待驗證碼元素出現的秒數
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.last_locator = None
+        # 上一次換驗證碼時只重新載入了圖片，登入頁仍然有效（由登入流程決定是否略過重新導航）
+        self.refreshed = False
+
+    def find_element(self):
+        """尋找驗證碼圖片元素，找不到時回傳 None"""
+        # 先用上次成功的定位方式，避免每次都從頭嘗試
+        locators = list(self.LOCATORS)
+        if self.last_locator in locators:
+            locators.remove(self.last_locator)
+            locators.insert(0, self.last_locator)
+
+        for locator in locators:
+            try:
+                element = WebDriverWait(self.driver, self.timeout).until(
+                    EC.presence_of_element_located(locator)
+                )
+                if element:
+                    self.last_locator = locator
+                    return element
+            except Exception:
+                continue
+        return None
+
+    def _wait_loaded(self, element):
+        """等待圖片實際載入完成"""
+        try:
+            WebDriverWait(self.driver, self.timeout, poll_frequency=0.05).until(
+                lambda d: d.execute_script(
+                    "return arguments[0].complete && arguments[0].naturalWidth > 0;", element
+                )
+            )
+        except Exception:
+            print("等待驗證碼圖片載入逾時，仍嘗試擷取")
+
+    def _from_element_screenshot(self, element) -> Optional[bytes]:
+        """直接對元素截圖"""
+        return element.screenshot_as_png
+
+    def _from_canvas(self, element) -> Optional[bytes]:
+        """使用 canvas 取得圖片原始像素"""
+        img_base64 = self.driver.execute_script(
+            """
+            var img = arguments[0];
+            var canvas = document.createElement('canvas');
+            canvas.width = img.naturalWidth || img.width;
+            canvas.height = img.naturalHeight || img.height;
+            var ctx = canvas.getContext('2d');
+            ctx.drawImage(img, 0, 0);
+            return canvas.toDataURL('image/png').substring(22);
+            """,
+            element,
+        )
+        return base64.b64decode(img_base64) if img_base64 else None
+
+    def _from_http(self, element) -> Optional[bytes]:
+        """使用瀏覽器的 cookies 在同一個 session 中下載圖片"""
+        src = element.get_attribute("src")
+        if not src:
+            return None
+        # 添加隨機參數避免快取
+        img_url = with_cache_buster(urljoin(self.driver.current_url, src))
+
+        session = requests.Session()
+        for cookie in self.driver.get_cookies():
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"))
+        headers = {
+            "User-Agent": self.driver.execute_script("return navigator.userAgent;"),
+            "Referer": self.driver.current_url,
+        }
+        response = session.get(img_url, headers=headers, timeout=10)
+        if response.status_code != 200:
+            raise Exception(f"下載圖片失敗，狀態碼: {response.status_code}")
+        return response.content
+
+    def refresh(self, element=None) -> bool:
+        """
+        換一張驗證碼：只重新請求驗證碼圖片，已填寫的登入表單與頁面狀態都保留
+
+        Args:
+            element: 驗證碼圖片元素，未提供時自動尋找
+
+        Returns:
+            新圖片載入成功時回傳 True；失敗時回傳 False，由呼叫端改為重新整理整個頁面
+        """
+        start = time.perf_counter()
+        if element is None:
+            element = self.find_element()
+            if element is None:
+                return False
+        src = element.get_attribute("src")
+        if not src:
+            return False
+        try:
+            loaded = self.driver.execute_async_script(
+                REFRESH_SCRIPT, element, int(self.timeout * 1000), with_cache_buster(src)
+            )
+        except Exception as e:
+            print(f"重新載入驗證碼圖片失敗: {str(e)}")
+            return False
+        if not loaded:
+            print("重新載入驗證碼圖片失敗")
+            return False
+        self.refreshed = True
+        print(f"已重新載入驗證碼圖片，耗時 {(time.perf_counter() - start) * 1000:.1f} ms")
+        return True
+
+    def fetch(self, element=None) -> Optional[CaptchaImage]:
+        """
+        取得驗證碼圖片 bytes
+
+        Args:
+            element: 驗證碼圖片元素，未提供時自動尋找
+
+        Returns:
+            CaptchaImage，所有方式都失敗時回傳 None
+        """
+        if element is None:
+            element = self.find_element()
+            if element is None:
+                print("無法找到驗證碼圖片")
+                return None
+
+        self._wait_loaded(element)
+
+        methods = [
+            ("element_screenshot", self._from_element_screenshot),
+            ("canvas", self._from_canvas),
+            ("http", self._from_http),
+        ]
+        for method, func in methods:
+            start = time.perf_counter()
+            try:
+                data = func(element)
+            except Exception as e:
+                print(f"使用 {method} 擷取驗證碼失敗: {str(e)}")
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if data and len(data) >= self.MIN_BYTES:
+                print(f"已使用 {method} 擷取驗證碼 ({len(data)} bytes)，耗時 {elapsed_ms:.1f} ms")
+                return CaptchaImage(data=data, method=method, elapsed_ms=elapsed_ms)
+            print(f"使用 {method} 擷取的驗證碼圖片太小，改用下一種方式")
+        return None
@@ -1,4 +1,3 @@
-import pytesseract
 from PIL import Image
 import os
 import time
@@ -7,173 +6,196 @@ from selenium.webdriver.common.by import By
 from io import BytesIO
 import numpy as np
 import cv2
-from utils.image_ocr import ImageOCR
+from utils.image_ocr import ImageOCR, RecognitionResult
+from utils.parallel_recognizer import ParallelRecognizer
+from utils.preprocess import clahe_binary, preprocess
+from utils.captcha_cache import get_cache
+from utils.captcha_dataset import get_dataset, page_origin
+from config import CAPTCHA_CACHE_ENABLED, CAPTCHA_DATASET_ENABLED, CAPTCHA_PARALLEL_ENABLED, CAPTCHA_QUORUM
 
 class CaptchaHandler:
     def __init__(self, driver):
         self.driver = driver
-        # 設定 Tesseract 執行檔路徑
-        pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-        # 初始化 ImageOCR
+        # 初始化 ImageOCR（Tesseract 引擎也由 ImageOCR 共用）
         self.image_ocr = ImageOCR()
+        # 平行辨識器與 ImageOCR 共用同一個模型
+        self.parallel = ParallelRecognizer(self.image_ocr) if CAPTCHA_PARALLEL_ENABLED else None
+        # 登入成功確認過的答案快取，同一張圖片再次出現時不必重新辨識
+        self.cache = get_cache() if CAPTCHA_CACHE_ENABLED else None
+        # 送出過的驗證碼與登入結果會在背景寫入資料集
+        self.dataset = get_dataset() if CAPTCHA_DATASET_ENABLED else None
+        self._submitted = None
+
+    def mark_submitted(self, image_bytes, code, source=None):
+        """記錄已送出的驗證碼，登入結果確定後再由 report_result 回報"""
+        try:
+            origin = page_origin(self.driver.current_url) if self.driver else None
+        except Exception:
+            origin = None
+        self._submitted = (bytes(image_bytes), code, source, origin)
+
+    def report_result(self, accepted):
+        """
+        回報最近一次送出的驗證碼是否被接受，沒有送出過時不做任何事
+        :param accepted: 登入是否成功
+        """
+        if self._submitted is None:
+            return
+        image_bytes, code, source, origin = self._submitted
+        self._submitted = None
+        if self.cache:
+            try:
+                self.cache.record(image_bytes, code, accepted)
+            except Exception as e:
+                print(f"寫入驗證碼快取失敗: {str(e)}")
+        if self.dataset:
+            self.dataset.add(image_bytes, code, accepted, source, origin)
 
     def preprocess_image(self, image):
         """
         預處理圖片以提高識別準確率
         """
-        # 將 PIL Image 轉換為 numpy array
         img_array = np.array(image)
+        gray = img_array if img_array.ndim == 2 else cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+        return Image.fromarray(clahe_binary(gray))
+
+    def recognize_fallback(self, image_bytes, debug_path=None):
+        """
+        備用辨識方法：CLAHE 與自適應二值化等預處理後交給 Tesseract，最後再嘗試 ddddocr
+        :param image_bytes: 驗證碼圖片 bytes
+        :param debug_path: 除錯模式下保存處理後圖片的檔名基準
+        :return: RecognitionResult，失敗時回傳 None
+        """
+        start = time.perf_counter()
+        prepared = preprocess(image_bytes)
+        if prepared is None:
+            print("無法解碼驗證碼圖片")
+            return None
+
+        results = []
+        sources = {}
+
+        tesseract = self.image_ocr.tesseract
+
+        def run_tesseract(variants):
+            for name, processed in variants:
+                processed_image = Image.fromarray(processed)
+                # 除錯模式下才保存處理後的圖片以便檢查效果
+                if self.image_ocr.debug and debug_path:
+                    save_path = debug_path.replace('.png', f'_processed_{name}.png')
+                    processed_image.save(save_path)
+                    print(f"已保存處理後的圖片 {name}: {save_path}")
+                if not tesseract.available:
+                    continue
+
+                # 使用 Tesseract 進行 OCR，調整 PSM 模式
+                for psm in [7, 6, 8, 13]:
+                    ocr_result = tesseract.image_to_string(processed_image, psm=psm)
+                    
+                    # 只保留數字
+                    ocr_result = ''.join(filter(str.isdigit, ocr_result))
+                    
+                    # 驗證結果是否為3位數
+                    if len(ocr_result) == 3:
+                        print(f"處理方法 {name}, PSM {psm} 成功識別: {ocr_result}")
+                        results.append(ocr_result)
+                        sources.setdefault(ocr_result, (name, psm))
+
+        # 原圖、增強對比、銳化三種變體共用同一份灰階影像，一次產生
+        names, batch = prepared.fallback_batch()
+        run_tesseract(zip(names, batch))
+        # 結果不一致時才加入最耗時的降噪變體
+        if self.image_ocr.vote_confidence(results)[2] < CAPTCHA_QUORUM:
+            run_tesseract([("clahe_denoised", clahe_binary(prepared.denoised_gray))])
         
-        # 檢查圖片是否已經是灰度圖
-        if len(img_array.shape) == 2:
-            gray = img_array
-        else:
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
-        # 增強對比度
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(4,4))
-        gray = clahe.apply(gray)
-        
-        # 使用自適應閾值進行二值化
-        binary = cv2.adaptiveThreshold(
-            gray,
-            255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY_INV,
-            11,
-            2
-        )
-        
-        # 去除小噪點
-        kernel = np.ones((2,2), np.uint8)
-        opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-        
-        # 稍微膨脹，使數字更清晰
-        dilated = cv2.dilate(opening, kernel, iterations=1)
+        # 如果有多個結果，選擇出現頻率最高的
+        if results:
+            most_common, confidence, votes = self.image_ocr.vote_confidence(results)
+            print(f"多種方法中最常見的結果: {most_common}（{votes} 票，信心 {confidence:.2f}）")
+            name, psm = sources[most_common]
+            return RecognitionResult(most_common, confidence, f"tesseract_psm{psm}", name,
+                                     (time.perf_counter() - start) * 1000, votes)
         
-        # 轉回 PIL Image
-        return Image.fromarray(dilated)
+        # 如果備用方法也失敗，嘗試使用 ddddocr（共用已載入的模型）
+        try:
+            ocr = self.image_ocr.ocr
+            dddd_result = ocr.classification(image_bytes)
+            print(f"ddddocr 識別結果: {dddd_result}")
+            
+            # 只保留數字
+            dddd_result = ''.join(filter(str.isdigit, dddd_result))
+            
+            # 驗證結果是否為3位數
+            if len(dddd_result) == 3:
+                _, confidence, votes = self.image_ocr.vote_confidence([dddd_result])
+                return RecognitionResult(dddd_result, confidence, "ddddocr", "original",
+                                         (time.perf_counter() - start) * 1000, votes)
+        except Exception as e:
+            print(f"ddddocr 識別失敗: {str(e)}")
+        return None
 
     def recognize_captcha(self, image_path):
         """
         識別驗證碼
-        :param image_path: 驗證碼圖片的本地路徑
+        :param image_path: 驗證碼圖片的本地路徑，或直接傳入圖片 bytes
         :return: 識別出的驗證碼文字
         """
+        return self.recognize(image_path).code
+
+    def recognize(self, image_path):
+        """
+        識別驗證碼並回傳信心、引擎與耗時
+        :param image_path: 驗證碼圖片的本地路徑，或直接傳入圖片 bytes
+        :return: RecognitionResult，失敗時 code 為 None
+        """
+        start = time.perf_counter()
         try:
-            # 檢查圖片是否存在
-            if not os.path.exists(image_path):
-                print(f"錯誤：驗證碼圖片不存在: {image_path}")
-                return None
-                
+            if isinstance(image_path, (bytes, bytearray)):
+                image_bytes = bytes(image_path)
+            else:
+                # 檢查圖片是否存在
+                if not os.path.exists(image_path):
+                    print(f"錯誤：驗證碼圖片不存在: {image_path}")
+                    return RecognitionResult(None, 0.0)
+                image_bytes = self.image_ocr.load_image_bytes(image_path)
+
             # 檢查圖片大小
-            file_size = os.path.getsize(image_path)
+            file_size = len(image_bytes)
             if file_size < 100:  # 如果圖片太小，可能是下載失敗
                 print(f"警告：驗證碼圖片太小 ({file_size} bytes)，可能下載不完整")
-                return None
+                return RecognitionResult(None, 0.0)
+
+            # 同一張圖片的答案已經確認正確時直接使用
+            if self.cache:
+                try:
+                    cached = self.cache.lookup(image_bytes)
+                except Exception as e:
+                    print(f"查詢驗證碼快取失敗: {str(e)}")
+                    cached = None
+                if cached:
+                    print(f"驗證碼快取命中: {cached}（命中率 {self.cache.hit_rate:.0%}）")
+                    return RecognitionResult(cached, 1.0, "cache", "original", (time.perf_counter() - start) * 1000)
             
-            # 使用新的 ImageOCR 類別進行辨識
+            # 使用平行辨識器或 ImageOCR 類別進行辨識
             print("使用主要辨識方法...")
-            result = self.image_ocr.recognize_captcha(image_path)
+            if self.parallel:
+                result = self.parallel.recognize(image_bytes)
+            else:
+                result = self.image_ocr.recognize(image_bytes)
             
             # 如果新方法失敗，嘗試使用舊方法作為備用
-            if not result or len(result) != 3 or not result.isdigit():
+            if not result.ok:
                 print("主要辨識方法失敗，使用備用辨識方法...")
-                # 讀取圖片
-                image = Image.open(image_path)
-                
-                # 嘗試多種預處理方法
-                processed_images = []
-                
-                # 方法1：基本預處理
-                processed_image1 = self.preprocess_image(image)
-                processed_images.append(processed_image1)
-                
-                # 方法2：增強對比度
-                try:
-                    from PIL import ImageEnhance
-                    enhancer = ImageEnhance.Contrast(image)
-                    enhanced_image = enhancer.enhance(2.0)  # 增強對比度
-                    processed_image2 = self.preprocess_image(enhanced_image)
-                    processed_images.append(processed_image2)
-                except Exception as e:
-                    print(f"對比度增強處理失敗: {str(e)}")
-                
-                # 方法3：銳化
-                try:
-                    from PIL import ImageFilter
-                    sharpened_image = image.filter(ImageFilter.SHARPEN)
-                    processed_image3 = self.preprocess_image(sharpened_image)
-                    processed_images.append(processed_image3)
-                except Exception as e:
-                    print(f"銳化處理失敗: {str(e)}")
-                
-                # 方法4：降噪
-                try:
-                    import cv2
-                    import numpy as np
-                    img_array = np.array(image)
-                    if len(img_array.shape) == 3:
-                        img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-                    denoised = cv2.fastNlMeansDenoising(img_array, None, 10, 7, 21)
-                    denoised_image = Image.fromarray(denoised)
-                    processed_image4 = self.preprocess_image(denoised_image)
-                    processed_images.append(processed_image4)
-                except Exception as e:
-                    print(f"降噪處理失敗: {str(e)}")
-                
-                # 保存所有處理後的圖片以便檢查效果
-                for i, processed_image in enumerate(processed_images):
-                    debug_path = image_path.replace('.png', f'_processed_{i}.png')
-                    processed_image.save(debug_path)
-                    print(f"已保存處理後的圖片 {i}: {debug_path}")
-                
-                # 對每個處理後的圖片嘗試識別
-                results = []
-                for i, processed_image in enumerate(processed_images):
-                    # 使用 Tesseract 進行 OCR，調整 PSM 模式
-                    for psm in [7, 6, 8, 13]:
-                        custom_config = f'--oem 3 --psm {psm} -c tessedit_char_whitelist=0123456789'
-                        ocr_result = pytesseract.image_to_string(
-                            processed_image, 
-                            config=custom_config
-                        ).strip()
-                        
-                        # 只保留數字
-                        ocr_result = ''.join(filter(str.isdigit, ocr_result))
-                        
-                        # 驗證結果是否為3位數
-                        if len(ocr_result) == 3:
-                            print(f"處理方法 {i}, PSM {psm} 成功識別: {ocr_result}")
-                            results.append(ocr_result)
-                
-                # 如果有多個結果，選擇出現頻率最高的
-                if results:
-                    from collections import Counter
-                    most_common = Counter(results).most_common(1)[0][0]
-                    print(f"多種方法中最常見的結果: {most_common}")
-                    return most_common
-                
-                # 如果備用方法也失敗，嘗試使用 ddddocr
-                try:
-                    import ddddocr
-                    ocr = ddddocr.DdddOcr(show_ad=False)
-                    with open(image_path, 'rb') as f:
-                        img_bytes = f.read()
-                    dddd_result = ocr.classification(img_bytes)
-                    print(f"ddddocr 識別結果: {dddd_result}")
-                    
-                    # 只保留數字
-                    dddd_result = ''.join(filter(str.isdigit, dddd_result))
-                    
-                    # 驗證結果是否為3位數
-                    if len(dddd_result) == 3:
-                        return dddd_result
-                except Exception as e:
-                    print(f"ddddocr 識別失敗: {str(e)}")
+                fallback = self.recognize_fallback(
+                    image_bytes, image_path if isinstance(image_path, str) else None
+                )
+                if fallback:
+                    fallback.elapsed_ms = (time.perf_counter() - start) * 1000
+                    return fallback
             
+            result.elapsed_ms = (time.perf_counter() - start) * 1000
             return result
                 
         except Exception as e:
             print(f"驗證碼識別出錯: {str(e)}")
-            return None 
\ No newline at end of file
+            return RecognitionResult(None, 0.0, elapsed_ms=(time.perf_counter() - start) * 1000)
@@ -0,0 +1,191 @@
+"""
+伺服器時鐘同步與精準觸發
+由 HTTP Date 標頭或頁面上的 span#time 估算本機與訂車伺服器的時間差，
+再以「先睡眠、最後忙碌等待」的方式在目標時刻執行預約動作
+"""
+
+import datetime
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Optional, Tuple
+
+import requests
+
+from config import BASE_URL, CLOCK_SYNC_MAX_SECONDS, CLOCK_SYNC_SAMPLES, SCHEDULER_SPIN_SECONDS
+
+
+class ClockSync:
+    """估算伺服器時間與本機時間的差值（伺服器時間 = 本機時間 + offset）"""
+
+    def __init__(self, url: str = BASE_URL, samples: int = CLOCK_SYNC_SAMPLES,
+                 session: Optional[requests.Session] = None, max_seconds: float = CLOCK_SYNC_MAX_SECONDS):
+        """
+        Args:
+            url: 用來取得 Date 標頭的網址
+            samples: 取樣次數，樣本會分散在一秒內的不同相位以縮小誤差
+            session: 共用的 requests.Session，未提供時自動建立
+            max_seconds: sync_http 最多花費的秒數，時間用完時以已取得的樣本估算
+        """
+        self.url = url
+        self.samples = samples
+        self.max_seconds = max_seconds
+        self.session = session or requests.Session()
+        self.offset: Optional[float] = None
+        self.error: Optional[float] = None
+        self.rtt: Optional[float] = None
+
+    def _sample(self, timeout: float = 5) -> Tuple[float, float, float]:
+        """送出一次 HEAD 請求，回傳 (送出時間, 收到時間, 伺服器 Date 秒數)"""
+        sent = time.time()
+        response = self.session.head(self.url, timeout=timeout, allow_redirects=False)
+        received = time.time()
+        date_header = response.headers.get("Date")
+        if not date_header:
+            raise ValueError("伺服器回應中沒有 Date 標頭")
+        return sent, received, parsedate_to_datetime(date_header).timestamp()
+
+    def sync_http(self) -> float:
+        """
+        以 HTTP Date 標頭估算時間差
+
+        Date 只有秒的精度：伺服器在 [送出, 收到] 之間某一刻的時間落在 [D, D+1)，
+        因此 offset 落在 [D - 收到, D + 1 - 送出]。之後每個樣本都安排在預測的
+        伺服器整秒邊界抵達，取所有區間的交集，誤差每次約減半，下限約為 RTT / 2。
+        總耗時不超過 max_seconds，來不及再取一個樣本時提前結束
+
+        Returns:
+            offset 秒數
+        """
+        deadline = time.time() + self.max_seconds
+        low, high = float("-inf"), float("inf")
+        best: Optional[Tuple[float, float, float]] = None
+        for _ in range(self.samples):
+            if best is not None and low <= high:
+                # 讓請求在目前估計區間中點所預測的伺服器整秒邊界抵達
+                half_rtt = (best[1] - best[0]) / 2
+                middle = (low + high) / 2
+                arrive = time.time() + half_rtt + 0.01
+                arrive += (-(arrive + middle)) % 1
+                if arrive + half_rtt > deadline:
+                    break
+                time.sleep(max(0.0, arrive - half_rtt - time.time()))
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                sent, received, server_second = self._sample(timeout=min(5.0, remaining))
+            except Exception as e:
+                print(f"時鐘同步取樣失敗: {str(e)}")
+                continue
+            low = max(low, server_second - received)
+            high = min(high, server_second + 1 - sent)
+            if best is None or received - sent < best[1] - best[0]:
+                best = (sent, received, server_second)
+
+        if best is None:
+            raise RuntimeError("時鐘同步失敗，沒有任何成功的樣本")
+
+        self.rtt = best[1] - best[0]
+        if low <= high:
+            self.offset = (low + high) / 2
+            self.error = (high - low) / 2
+        else:
+            # 區間沒有交集（伺服器時鐘跳動或網路抖動），改用最小 RTT 樣本的中點估算
+            sent, received, server_second = best
+            self.offset = server_second + 0.5 - (sent + received) / 2
+            self.error = 0.5 + self.rtt / 2
+        print(
+            f"HTTP 時鐘同步: offset={self.offset * 1000:+.1f} ms, "
+            f"誤差 ±{self.error * 1000:.1f} ms, 最小 RTT={self.rtt * 1000:.1f} ms"
+        )
+        return self.offset
+
+    def sync_page_clock(self, driver, selector: str = "span#time", timeout: float = 3) -> float:
+        """
+        以頁面上的伺服器時鐘（span#time）估算時間差
+
+        快速輪詢時鐘文字，在秒數跳動的瞬間記錄本機時間，此時伺服器時間恰為整秒
+
+        Returns:
+            offset 秒數
+        """
+        read_script = f"var e = document.querySelector('{selector}'); return e ? e.textContent : null;"
+        previous = driver.execute_script(read_script)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            sent = time.time()
+            text = driver.execute_script(read_script)
+            received = time.time()
+            if text and text != previous:
+                server_time = self._parse_page_clock(text)
+                if server_time is not None:
+                    self.rtt = received - sent
+                    self.offset = server_time - (sent + received) / 2
+                    self.error = self.rtt / 2
+                    print(
+                        f"頁面時鐘同步: offset={self.offset * 1000:+.1f} ms, 誤差 ±{self.error * 1000:.1f} ms"
+                    )
+                    return self.offset
+            previous = text
+        raise RuntimeError("頁面時鐘在逾時前沒有跳動")
+
+    @staticmethod
+    def _parse_page_clock(text: str) -> Optional[float]:
+        """解析 'MM/DD HH:MM:SS' 或 'HH:MM:SS' 格式的頁面時鐘，回傳 epoch 秒數"""
+        now = datetime.datetime.now()
+        match = re.search(r"(?:(\d{2})/(\d{2})\s+)?(\d{2}):(\d{2}):(\d{2})", text)
+        if not match:
+            return None
+        month, day, hour, minute, second = match.groups()
+        parsed = now.replace(
+            month=int(month) if month else now.month,
+            day=int(day) if day else now.day,
+            hour=int(hour), minute=int(minute), second=int(second), microsecond=0,
+        )
+        return parsed.timestamp()
+
+    def server_now(self) -> datetime.datetime:
+        """回傳目前估計的伺服器時間"""
+        return datetime.datetime.fromtimestamp(time.time() + (self.offset or 0.0))
+
+
+class PreciseScheduler:
+    """在伺服器時間的指定時刻執行動作：先以 sleep 等待，最後一小段以忙碌等待對齊"""
+
+    def __init__(self, offset: float = 0.0, spin_seconds: float = SCHEDULER_SPIN_SECONDS):
+        """
+        Args:
+            offset: 伺服器時間與本機時間的差值（秒），通常來自 ClockSync
+            spin_seconds: 目標前最後多少秒改為忙碌等待
+        """
+        self.offset = offset
+        self.spin_seconds = spin_seconds
+        self.achieved_ms: List[float] = []
+
+    def sleep_until(self, server_target: float):
+        """等待到伺服器時間 server_target（epoch 秒）"""
+        # 以 perf_counter 作為單調時鐘，避免等待期間本機時間被校正造成跳動
+        local_target = server_target - self.offset
+        deadline = time.perf_counter() + (local_target - time.time())
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= self.spin_seconds:
+                break
+            time.sleep(min(remaining - self.spin_seconds, 0.5))
+        while time.perf_counter() < deadline:
+            pass
+
+    def fire_at(self, server_target: datetime.datetime, action: Callable, *args, **kwargs):
+        """
+        在伺服器時間 server_target 執行 action，並記錄實際觸發的偏差（毫秒）
+
+        Returns:
+            action 的回傳值
+        """
+        target = server_target.timestamp()
+        self.sleep_until(target)
+        achieved = (time.time() + self.offset - target) * 1000
+        self.achieved_ms.append(achieved)
+        print(f"觸發時間 {server_target.strftime('%H:%M:%S')}，實際偏差 {achieved:+.2f} ms")
+        return action(*args, **kwargs)
@@ -0,0 +1,318 @@
+"""
+瀏覽器預熱池
+在預約時段前先啟動並檢查 N 個無頭瀏覽器，預約時直接取出已停在 BASE_URL 的瀏覽器；
+driver 執行檔只從本機路徑與快取解析，找不到時直接報錯，
+除非 DRIVER_NETWORK_FALLBACK 明確允許從網路下載
+"""
+
+import glob
+import os
+import queue
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.firefox.options import Options as FirefoxOptions
+from selenium.webdriver.firefox.service import Service as FirefoxService
+
+from config import (BASE_URL, BROWSER_OPTIONS, DRIVER_CACHE_DIRS, DRIVER_NETWORK_FALLBACK, DRIVER_POOL_SIZE,
+                    DRIVER_POOL_TIMEOUT)
+
+# 各瀏覽器對應的 driver 執行檔名稱與指定路徑的環境變數
+DRIVER_BINARIES = {
+    "firefox": ("geckodriver", "GECKODRIVER_PATH"),
+    "chrome": ("chromedriver", "CHROMEDRIVER_PATH"),
+}
+
+
+def build_firefox_options(headless: bool = True) -> FirefoxOptions:
+    """建立預約用的 Firefox 選項（關閉重複提交警告、快取與對話框，設定中文字型）"""
+    firefox_options = FirefoxOptions()
+    firefox_options.set_preference("browser.tabs.warnOnRepost", False)
+    # 關閉其他可能的對話框
+    firefox_options.set_preference("dom.successive_dialog_time_limit", 0)
+    firefox_options.set_preference("dom.disable_beforeunload", True)
+    # 禁用 PDF 查看器
+    firefox_options.set_preference("pdfjs.disabled", True)
+    # 禁用緩存
+    firefox_options.set_preference("browser.cache.disk.enable", False)
+    firefox_options.set_preference("browser.cache.memory.enable", False)
+    firefox_options.set_preference("browser.cache.offline.enable", False)
+    firefox_options.set_preference("network.http.use-cache", False)
+    # 添加處理重複提交警告的設定
+    firefox_options.set_preference("browser.formfill.enable", False)
+    firefox_options.set_preference("browser.sessionstore.resume_from_crash", False)
+    firefox_options.set_preference("browser.sessionstore.resume_session_once", False)
+    firefox_options.set_preference("browser.sessionstore.max_resumed_crashes", 0)
+    firefox_options.set_preference("browser.sessionstore.warnOnQuit", False)
+    firefox_options.set_preference("browser.sessionstore.enabled", False)
+
+    # 添加中文語言和字體相關設定
+    firefox_options.set_preference("intl.accept_languages", "zh-TW")
+    firefox_options.set_preference("font.language.group", "zh-TW")
+    firefox_options.set_preference("font.name.serif.zh-TW", "Noto Sans CJK TC")
+    firefox_options.set_preference("font.name.sans-serif.zh-TW", "Noto Sans CJK TC")
+    firefox_options.set_preference("font.name.monospace.zh-TW", "Noto Sans Mono CJK TC")
+
+    # 添加效能優化設定
+    for name, value in BROWSER_OPTIONS["firefox"]["preferences"].items():
+        firefox_options.set_preference(name, value)
+    for argument in BROWSER_OPTIONS["firefox"]["arguments"]:
+        firefox_options.add_argument(argument)
+
+    if headless:
+        firefox_options.add_argument("--headless")
+    return firefox_options
+
+
+def build_chrome_options(headless: bool = True) -> ChromeOptions:
+    """建立預約用的 Chrome 選項"""
+    chrome_options = ChromeOptions()
+    for argument in BROWSER_OPTIONS["chrome"]["arguments"]:
+        chrome_options.add_argument(argument)
+    chrome_options.add_argument("--lang=zh-TW")
+    if headless:
+        chrome_options.add_argument("--headless")
+    return chrome_options
+
+
+def build_options(browser: str, headless: bool = True):
+    """依瀏覽器類型建立選項"""
+    if browser == "chrome":
+        return build_chrome_options(headless)
+    return build_firefox_options(headless)
+
+
+def resolve_driver_binary(browser: str) -> Optional[str]:
+    """
+    在本機尋找 driver 執行檔，不做任何網路查詢
+
+    依序檢查：環境變數（GECKODRIVER_PATH / CHROMEDRIVER_PATH）、DRIVER_CACHE_DIRS、
+    webdriver_manager 已下載的快取（~/.wdm）、PATH
+
+    Returns:
+        執行檔路徑，找不到時回傳 None
+    """
+    binary, env_name = DRIVER_BINARIES[browser]
+    if sys.platform.startswith("win"):
+        binary += ".exe"
+
+    env_path = os.environ.get(env_name)
+    if env_path and os.path.isfile(env_path):
+        return env_path
+
+    for directory in DRIVER_CACHE_DIRS:
+        candidate = os.path.join(os.path.expanduser(directory), binary)
+        if os.path.isfile(candidate):
+            return candidate
+
+    # webdriver_manager 的快取結構: ~/.wdm/drivers/<driver>/<os>/<version>/<binary>
+    # （設定 WDM_LOCAL 時快取位於目前目錄）
+    wdm_home = os.getcwd() if os.environ.get("WDM_LOCAL") else os.path.expanduser("~")
+    wdm_root = os.path.join(wdm_home, ".wdm")
+    cached = glob.glob(os.path.join(wdm_root, "drivers", binary.split(".")[0], "**", binary), recursive=True)
+    if cached:
+        return max(cached, key=os.path.getmtime)
+
+    return shutil.which(binary)
+
+
+def require_driver_binary(browser: str, download: Optional[Callable[[], str]] = None,
+                          allow_network: bool = DRIVER_NETWORK_FALLBACK) -> Optional[str]:
+    """
+    取得本機 driver 執行檔，找不到時只有在 allow_network 為 True 才改用網路
+
+    Args:
+        browser: firefox 或 chrome
+        download: 允許網路時用來下載 driver 的函式（例如 GeckoDriverManager().install），
+            未提供時回傳 None 交由 Selenium Manager 處理
+        allow_network: 是否允許網路下載，預設為 DRIVER_NETWORK_FALLBACK
+
+    Raises:
+        RuntimeError: 本機找不到 driver 且不允許網路下載
+    """
+    binary = resolve_driver_binary(browser)
+    if binary:
+        return binary
+    name, env_name = DRIVER_BINARIES[browser]
+    if not allow_network:
+        raise RuntimeError(
+            f"本機找不到 {name}：請設定環境變數 {env_name}、放入 {DRIVER_CACHE_DIRS} 或 PATH，"
+            f"或將 DRIVER_NETWORK_FALLBACK 設為 True 允許從網路下載"
+        )
+    print(f"本機找不到 {name}，依 DRIVER_NETWORK_FALLBACK 設定改從網路取得 driver")
+    return download() if download else None
+
+
+def create_driver(browser: str = "firefox", options=None):
+    """
+    以本機 driver 執行檔啟動瀏覽器
+
+    Raises:
+        RuntimeError: 本機找不到 driver 且 DRIVER_NETWORK_FALLBACK 為 False
+    """
+    browser = browser.lower()
+    if browser not in DRIVER_BINARIES:
+        raise ValueError(f"不支援的瀏覽器類型: {browser}")
+    options = options if options is not None else build_options(browser)
+    # 允許網路且本機找不到時為 None，由 Selenium Manager 尋找或下載
+    binary = require_driver_binary(browser)
+
+    if browser == "chrome":
+        service = ChromeService(executable_path=binary) if binary else ChromeService()
+        return webdriver.Chrome(service=service, options=options)
+    service = FirefoxService(executable_path=binary) if binary else FirefoxService()
+    return webdriver.Firefox(service=service, options=options)
+
+
+def is_healthy(driver) -> bool:
+    """確認瀏覽器仍可回應指令"""
+    try:
+        return driver.execute_script("return document.readyState") in ("interactive", "complete")
+    except Exception:
+        return False
+
+
+class DriverPool:
+    """預先啟動的瀏覽器池，取出時瀏覽器已停在 base_url"""
+
+    def __init__(self, size: int = DRIVER_POOL_SIZE, browser: str = "firefox", headless: bool = True,
+                 base_url: str = BASE_URL, options_factory: Optional[Callable[[], object]] = None):
+        """
+        Args:
+            size: 預先啟動的瀏覽器數量
+            browser: firefox 或 chrome
+            headless: 是否使用無頭模式
+            base_url: 瀏覽器預先開啟的網址
+            options_factory: 建立瀏覽器選項的函式，未提供時使用 build_options
+        """
+        self.size = size
+        self.browser = browser
+        self.base_url = base_url
+        self.options_factory = options_factory or (lambda: build_options(browser, headless))
+        self._idle: "queue.Queue" = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, size), thread_name_prefix="driver-pool")
+
+    def _launch(self):
+        """啟動一個瀏覽器、開啟 base_url 並檢查狀態，成功後放入池中"""
+        driver = None
+        try:
+            driver = create_driver(self.browser, self.options_factory())
+            driver.get(self.base_url)
+            if not is_healthy(driver):
+                raise RuntimeError("瀏覽器狀態檢查失敗")
+        except Exception as e:
+            print(f"預先啟動瀏覽器失敗: {str(e)}")
+            if driver:
+                self._quit(driver)
+            return None
+        with self._lock:
+            self._all.append(driver)
+        self._idle.put(driver)
+        return driver
+
+    def start(self, wait: bool = True) -> int:
+        """
+        平行啟動 size 個瀏覽器
+
+        Args:
+            wait: 是否等待全部啟動完成
+
+        Returns:
+            成功啟動的數量（wait=False 時為 0）
+        """
+        futures = [self._executor.submit(self._launch) for _ in range(self.size)]
+        if not wait:
+            return 0
+        ready = sum(1 for f in futures if f.result() is not None)
+        print(f"瀏覽器池已就緒: {ready}/{self.size}")
+        return ready
+
+    def checkout(self, timeout: float = DRIVER_POOL_TIMEOUT):
+        """
+        取出一個健康且停在 base_url 的瀏覽器，池中沒有可用瀏覽器時立即補啟動一個
+
+        Raises:
+            RuntimeError: 逾時仍無法取得瀏覽器
+        """
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                self._executor.submit(self._launch)
+                try:
+                    driver = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise RuntimeError("瀏覽器池逾時，無法取得瀏覽器")
+            if not is_healthy(driver):
+                print("瀏覽器已失去回應，丟棄並改用下一個")
+                self._discard(driver)
+                continue
+            try:
+                if driver.current_url != self.base_url:
+                    driver.get(self.base_url)
+            except Exception as e:
+                print(f"瀏覽器無法開啟 {self.base_url}: {str(e)}")
+                self._discard(driver)
+                continue
+            return driver
+
+    def release(self, driver, reuse: bool = False, refill: bool = True):
+        """
+        歸還瀏覽器
+
+        Args:
+            reuse: True 時清除 cookies 後放回池中，否則關閉
+            refill: 關閉後是否在背景補一個新的（之後不會再取用時應為 False）
+        """
+        if reuse and is_healthy(driver):
+            try:
+                driver.delete_all_cookies()
+                driver.get(self.base_url)
+                self._idle.put(driver)
+                return
+            except Exception:
+                pass
+        self._discard(driver)
+        if not refill:
+            return
+        try:
+            self._executor.submit(self._launch)
+        except RuntimeError:
+            # 池已關閉，不再補充
+            pass
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+        self._quit(driver)
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """關閉池中所有瀏覽器"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            drivers, self._all = self._all, []
+        for driver in drivers:
+            self._quit(driver)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
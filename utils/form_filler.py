@@ -0,0 +1,143 @@
+"""
+批次表單填寫模組
+以單次注入的 JavaScript 一次填完四段地址：設定城市選單並觸發 change 事件，
+等待地區選單實際產生選項後再選取地區、填寫地址，取代逐欄的 WebDriver 往返與固定等待
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from config import ADDRESS_FIELDS, ADDRESS_FILL_TIMEOUT
+
+# 參數：legs, message, timeoutMs, callback
+BATCH_FILL_SCRIPT = """
+var legs = arguments[0], message = arguments[1], timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var start = Date.now(), report = {}, pending = [];
+
+function field(name) { return document.getElementsByName(name)[0] || document.getElementById(name); }
+function fire(el, type) { el.dispatchEvent(new Event(type, {bubbles: true})); }
+function texts(select) {
+    return Array.prototype.map.call(select.options, function (o) { return o.text.trim(); });
+}
+
+legs.forEach(function (leg) {
+    var r = report[leg.leg] = {ok: false};
+    var areaInput = field(leg.area_input), city = field(leg.city_select);
+    var areaSelect = field(leg.area_select), address = field(leg.address_input);
+    if (!city || !areaSelect || !address) { r.error = 'missing field'; return; }
+    if (areaInput) areaInput.click();
+    // 切換城市前先記下地區選項，之後等到選項實際改變才選取，避免選到上一個城市的地區
+    var before = texts(areaSelect).join('|'), sameCity = city.value === leg.city;
+    city.value = leg.city;
+    if (city.value !== leg.city) { r.error = 'city option not found: ' + leg.city; return; }
+    fire(city, 'change');
+    pending.push({leg: leg, r: r, areaInput: areaInput, areaSelect: areaSelect,
+                  address: address, before: before, sameCity: sameCity});
+});
+
+function refreshed(p) {
+    var options = texts(p.areaSelect);
+    // 城市沒有改變時選項不會重新產生，已有目標地區即可選取
+    return options.length > 0 && (options.join('|') !== p.before || p.sameCity);
+}
+
+function finish(p) {
+    var options = texts(p.areaSelect), index = options.indexOf(p.leg.area);
+    p.r.wait_ms = Date.now() - start;
+    if (!refreshed(p)) { p.r.error = 'area options not refreshed'; return; }
+    if (index < 0) { p.r.error = 'area option not found: ' + p.leg.area; return; }
+    p.areaSelect.selectedIndex = index;
+    fire(p.areaSelect, 'change');
+    p.address.value = p.leg.address;
+    fire(p.address, 'input');
+    fire(p.address, 'change');
+    p.r.area = p.leg.area;
+    p.r.ok = true;
+}
+
+(function poll() {
+    pending = pending.filter(function (p) {
+        // 地區選項已由 change 事件重新產生（非同步載入時可能分次加入，等到出現目標地區或逾時）
+        if (refreshed(p) && texts(p.areaSelect).indexOf(p.leg.area) >= 0) {
+            finish(p);
+            return false;
+        }
+        return true;
+    });
+    if (pending.length && Date.now() - start < timeoutMs) { setTimeout(poll, 10); return; }
+    pending.forEach(finish);
+    if (message) {
+        var mark = field('pmark');
+        if (mark) { mark.value = message; fire(mark, 'change'); }
+    }
+    done(report);
+})();
+"""
+
+
+def build_address_legs(booking_data) -> List[Dict[str, str]]:
+    """
+    由 BookingData 產生四段地址的填寫資料
+
+    區域格式為「城市_地區」，格式不符時預設為新北市（a）
+    """
+    values = {
+        "goto_pickup": (booking_data.goto_pickup_area, booking_data.goto_pickup_address),
+        "goto_dropoff": (booking_data.goto_dropoff_area, booking_data.goto_dropoff_address),
+        "return_pickup": (booking_data.return_pickup_area, booking_data.return_pickup_address),
+        "return_dropoff": (booking_data.return_dropoff_area, booking_data.return_dropoff_address),
+    }
+    legs = []
+    for leg, (area_value, address) in values.items():
+        city, area = area_value.split("_", 1) if "_" in area_value else ("a", area_value)
+        area_input, city_select, area_select, address_input = ADDRESS_FIELDS[leg]
+        legs.append({
+            "leg": leg,
+            "area_input": area_input,
+            "city_select": city_select,
+            "area_select": area_select,
+            "address_input": address_input,
+            "city": city,
+            "area": area,
+            "address": address,
+        })
+    return legs
+
+
+class BatchFormFiller:
+    """以一次 execute_async_script 填寫整份地址表單"""
+
+    def __init__(self, driver, timeout: float = ADDRESS_FILL_TIMEOUT):
+        """
+        Args:
+            driver: Selenium WebDriver
+            timeout: 等待地區選單產生選項的最長秒數
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.last_elapsed_ms: Optional[float] = None
+
+    def fill(self, legs: List[Dict[str, str]], message: Optional[str] = None) -> Dict[str, dict]:
+        """
+        填寫地址
+
+        Args:
+            legs: build_address_legs 產生的填寫資料
+            message: 留言給客服（pmark），可省略
+
+        Returns:
+            {段別: {"ok": bool, "area": 選取的地區, "wait_ms": 等待選項的毫秒數, "error": 失敗原因}}；
+            地區選項沒有更新或找不到指定地區時 ok 為 False
+        """
+        previous_timeout = self.driver.timeouts.script
+        self.driver.set_script_timeout(self.timeout + 5)
+        start = time.perf_counter()
+        try:
+            report = self.driver.execute_async_script(
+                BATCH_FILL_SCRIPT, legs, message or "", int(self.timeout * 1000)
+            )
+        finally:
+            self.driver.set_script_timeout(previous_timeout)
+        self.last_elapsed_ms = (time.perf_counter() - start) * 1000
+        return report or {}
@@ -1,122 +1,213 @@
 import cv2
-import numpy as np
 from PIL import Image
 import os
 import re
-import pytesseract
-from PIL import ImageEnhance, ImageFilter
-import ddddocr
+import time
 from collections import Counter
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+from config import (
+    CAPTCHA_DEBUG_SAVE,
+    CAPTCHA_QUORUM,
+    DIGIT_CLASSIFIER_ENABLED,
+    DIGIT_CLASSIFIER_MIN_CONFIDENCE,
+    ONNX_BATCH_ENABLED,
+    SEGMENT_MIN_CONFIDENCE,
+    SEGMENTATION_ENABLED,
+)
+from utils.digit_classifier import get_classifier
+from utils.ocr_registry import get_ddddocr
+from utils.onnx_engine import get_onnx_engine
+from utils.preprocess import preprocess
+from utils.tesseract_engine import get_tesseract
+
+
+@dataclass
+class RecognitionResult:
+    """驗證碼辨識結果"""
+    code: Optional[str]  # 辨識出的驗證碼，失敗時為 None
+    confidence: float  # 0~1，票數差距或分類器信心
+    engine: str = ""  # 產生答案的引擎：digit_classifier / ddddocr / tesseract_psm7 / cache ...
+    variant: str = ""  # 產生答案的預處理變體，original 表示原始圖片
+    elapsed_ms: float = 0.0
+    votes: int = 0  # 相同答案的票數
+
+    @property
+    def ok(self) -> bool:
+        """是否為 3 位數字"""
+        return bool(self.code) and len(self.code) == 3 and self.code.isdigit()
+
 
 class ImageOCR:
-    def __init__(self):
-        """初始化 OCR 處理類別"""
-        # 設定 Tesseract 執行檔路徑
-        pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-        # 初始化 ddddocr
-        self.ocr = ddddocr.DdddOcr(show_ad=False)
-    
+    # 預處理變體的名稱（同時也是除錯模式下的檔名後綴）
+    VARIANT_NAMES = [
+        "binary", "contrast", "dilated", "adaptive", "enhanced", "denoised",
+        "digit_1", "digit_2", "digit_3"
+    ]
+
+    def __init__(self, debug=CAPTCHA_DEBUG_SAVE):
+        """初始化 OCR 處理類別
+
+        Args:
+            debug: 是否將預處理後的變體寫入磁碟（僅供除錯，會增加延遲）
+        """
+        # 共用的 Tesseract 引擎（執行檔依平台自動尋找，有 tesserocr 時在程序內辨識）
+        self.tesseract = get_tesseract()
+        # 使用程序內共用的 ddddocr 模型，避免每次登入嘗試都重新載入
+        self.ocr = get_ddddocr()
+        # 從歷史驗證碼訓練的數字分類器，沒有樣板檔時為 None
+        self.digit_classifier = get_classifier() if DIGIT_CLASSIFIER_ENABLED else None
+        # 直接以 NumPy 張量推論的 ONNX 引擎，無法建立時為 None（改用 ocr.classification）
+        self.onnx_engine = get_onnx_engine() if ONNX_BATCH_ENABLED else None
+        self.debug = debug
+
+    @staticmethod
+    def load_image_bytes(image):
+        """將圖片路徑或 bytes 統一轉為 bytes"""
+        if isinstance(image, (bytes, bytearray)):
+            return bytes(image)
+        with open(image, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def encode_png(array):
+        """將 NumPy 影像編碼為 PNG bytes，供 ddddocr 使用"""
+        ok, buffer = cv2.imencode('.png', array)
+        if not ok:
+            raise ValueError("PNG 編碼失敗")
+        return buffer.tobytes()
+
+    def preprocess_variants(self, image_bytes, include_denoised=True):
+        """在記憶體中產生所有預處理變體
+
+        Args:
+            image_bytes: 驗證碼原始圖片 bytes
+            include_denoised: 是否包含最耗時的 NL-means 降噪變體
+
+        Returns:
+            [(變體名稱, NumPy 影像)] 列表，順序與 VARIANT_NAMES 相同
+        """
+        prepared = preprocess(image_bytes)
+        if prepared is None:
+            print("無法解碼驗證碼圖片")
+            return []
+        return prepared.variants(include_denoised)
+
+    def save_variants(self, variants, image_path):
+        """將預處理變體寫入磁碟（除錯用），回傳檔案路徑列表"""
+        base_path = image_path.replace('.png', '')
+        paths = []
+        for name, array in variants:
+            path = f"{base_path}_{name}.png"
+            cv2.imwrite(path, array)
+            paths.append(path)
+        return paths
+
+    def _debug_dump(self, variants, image):
+        """除錯模式下才把變體寫入磁碟"""
+        if self.debug and isinstance(image, str):
+            self.save_variants(variants, image)
+
     def try_multiple_preprocessing(self, image_path):
-        """嘗試多種預處理方法以提高辨識率"""
-        image = cv2.imread(image_path)
-        if image is None:
+        """嘗試多種預處理方法以提高辨識率（寫入磁碟版本，保留給除錯與舊流程使用）"""
+        try:
+            image_bytes = self.load_image_bytes(image_path)
+        except OSError:
             print(f"無法讀取圖片: {image_path}")
             return []
-        
-        processed_images = []
-        base_path = image_path.replace('.png', '')
-        
-        # 方法1: 基本二值化
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        path1 = f"{base_path}_binary.png"
-        cv2.imwrite(path1, binary)
-        processed_images.append(path1)
-        
-        # 方法2: 調整對比度並二值化
-        alpha = 2.0
-        beta = 10
-        adjusted = cv2.convertScaleAbs(gray, alpha=alpha, beta=beta)
-        _, binary2 = cv2.threshold(adjusted, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        path2 = f"{base_path}_contrast.png"
-        cv2.imwrite(path2, binary2)
-        processed_images.append(path2)
-        
-        # 方法3: 形態學處理
-        kernel = np.ones((2, 2), np.uint8)
-        dilated = cv2.dilate(binary, kernel, iterations=1)
-        path3 = f"{base_path}_dilated.png"
-        cv2.imwrite(path3, dilated)
-        processed_images.append(path3)
-        
-        # 方法4: 自適應二值化
-        adaptive_thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                               cv2.THRESH_BINARY, 11, 2)
-        path4 = f"{base_path}_adaptive.png"
-        cv2.imwrite(path4, adaptive_thresh)
-        processed_images.append(path4)
-        
-        # 方法5: 使用PIL增強
+        return self.save_variants(self.preprocess_variants(image_bytes), image_path)
+
+    def classify_digits(self, image_bytes):
+        """使用專用數字分類器辨識，信心足夠時回傳 RecognitionResult，否則回傳 None 交給其他引擎"""
+        if self.digit_classifier is None:
+            return None
         try:
-            pil_image = Image.open(image_path)
-            # 確保圖片為RGB模式，若不是則轉換
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-            enhancer = ImageEnhance.Contrast(pil_image)
-            enhanced_img = enhancer.enhance(2.5)
-            enhanced_img = enhanced_img.filter(ImageFilter.SHARPEN)
-            path5 = f"{base_path}_enhanced.png"
-            enhanced_img.save(path5)
-            processed_images.append(path5)
+            prediction = self.digit_classifier.predict(image_bytes)
         except Exception as e:
-            print(f"PIL圖像增強處理錯誤: {str(e)}")
-        
-        # 方法6: 降噪後二值化
-        denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-        _, binary_denoised = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        path6 = f"{base_path}_denoised.png"
-        cv2.imwrite(path6, binary_denoised)
-        processed_images.append(path6)
-        
-        # 方法7: 圖像分割處理 - 嘗試分割成3個數字
-        width = image.shape[1]
-        part_width = width // 3
-        for i in range(3):
-            start_x = i * part_width
-            end_x = (i + 1) * part_width if i < 2 else width
-            digit_img = gray[:, start_x:end_x]
-            _, digit_binary = cv2.threshold(digit_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            path_digit = f"{base_path}_digit_{i+1}.png"
-            cv2.imwrite(path_digit, digit_binary)
-            processed_images.append(path_digit)
-        
-        return processed_images
-    
-    def recognize_with_multiple_engines(self, image_path):
-        """結合多種OCR引擎嘗試辨識"""
+            print(f"數字分類器辨識失敗: {str(e)}")
+            return None
+        if prediction is None:
+            print("數字分類器無法切出三個數字")
+            return None
+        if prediction.confidence < DIGIT_CLASSIFIER_MIN_CONFIDENCE:
+            print(f"數字分類器信心不足 ({prediction.code}, {prediction.confidence:.2f})，改用其他引擎")
+            return None
+        print(f"數字分類器辨識結果: {prediction.code}（信心 {prediction.confidence:.2f}，"
+              f"耗時 {prediction.elapsed_ms:.1f} ms）")
+        return RecognitionResult(prediction.code, prediction.confidence, "digit_classifier", "original",
+                                 prediction.elapsed_ms)
+
+    def recognize_segments(self, prepared):
+        """逐一辨識分割出的三個數字（需要 ONNX 引擎，只在 0~9 之間選擇）
+
+        Args:
+            prepared: preprocess() 的結果
+
+        Returns:
+            RecognitionResult，信心為三個數字中最低的機率；
+            無法切出正好三個數字或任一個不是單一數字時回傳 None
+        """
+        if not SEGMENTATION_ENABLED or prepared is None or self.onnx_engine is None:
+            return None
+        start = time.perf_counter()
+        crops = prepared.digits()
+        if crops is None:
+            print("無法切出正好三個數字，改用整張圖片辨識")
+            return None
+        try:
+            digits = self.onnx_engine.classify_digits(crops)
+        except Exception as e:
+            print(f"分割數字辨識失敗: {str(e)}")
+            return None
+        if any(len(text) != 1 for text, _ in digits):
+            print(f"分割數字辨識結果不完整: {[text for text, _ in digits]}")
+            return None
+        code = "".join(text for text, _ in digits)
+        confidence = min(probability for _, probability in digits)
+        print(f"分割數字辨識結果: {code}（最低機率 {confidence:.2f}）")
+        return RecognitionResult(code, confidence, "segments", "segments",
+                                 (time.perf_counter() - start) * 1000, 1)
+
+    def _dddd_classify(self, array):
+        """使用 ddddocr 辨識 NumPy 影像"""
+        return self.dddd_classify_batch([array])[0]
+
+    def dddd_classify_batch(self, arrays):
+        """使用 ddddocr 模型一次辨識多個 NumPy 影像，回傳與輸入順序相同的結果列表
+
+        ONNX 引擎失敗時改為逐張呼叫 ocr.classification
+        """
+        if self.onnx_engine is not None:
+            try:
+                return self.onnx_engine.classify_batch(arrays)
+            except Exception as e:
+                print(f"ONNX 推論失敗，改用 ocr.classification: {str(e)}")
+        return [self.ocr.classification(self.encode_png(array)) for array in arrays]
+
+    def recognize_with_multiple_engines(self, image):
+        """結合多種OCR引擎嘗試辨識
+
+        Args:
+            image: 驗證碼圖片路徑或 bytes
+        """
         results = []
-        
+
         # 先使用原始圖片嘗試辨識
         try:
             # 使用ddddocr
-            with open(image_path, 'rb') as f:
-                image_bytes = f.read()
+            image_bytes = self.load_image_bytes(image)
             result_dddd = self.ocr.classification(image_bytes)
             numbers_dddd = re.findall(r'\d+', result_dddd)
             if numbers_dddd:
                 result_dddd = ''.join(numbers_dddd)
                 print(f"ddddocr原始辨識結果: {result_dddd}")
                 results.append(result_dddd)
-            
-            # 嘗試使用Tesseract
+
+            # 嘗試使用Tesseract（只辨識數字）
             try:
-                img = Image.open(image_path)
-                # 確保圖片格式兼容Tesseract
-                if img.mode not in ['RGB', 'L']:
-                    img = img.convert('L')  # 轉換為灰階
-                # 設定Tesseract配置，只辨識數字
-                custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789'
-                result_tesseract = pytesseract.image_to_string(img, config=custom_config)
+                img = Image.open(BytesIO(image_bytes))
+                result_tesseract = self.tesseract.image_to_string(img, psm=6)
                 numbers_tesseract = re.findall(r'\d+', result_tesseract)
                 if numbers_tesseract:
                     result_tesseract = ''.join(numbers_tesseract)
@@ -124,84 +215,59 @@ class ImageOCR:
                     results.append(result_tesseract)
             except Exception as e:
                 print(f"Tesseract辨識錯誤: {str(e)}")
-        
-            # 預處理圖片並嘗試辨識
-            processed_images = self.try_multiple_preprocessing(image_path)
-            for img_path in processed_images:
-                # 確認圖片存在
-                if not os.path.exists(img_path):
-                    print(f"預處理圖片不存在: {img_path}")
-                    continue
-                    
+
+            # 預處理圖片並嘗試辨識（變體只保留在記憶體中）
+            variants = self.preprocess_variants(image_bytes)
+            self._debug_dump(variants, image)
+            segment_results = []
+            for name, array in variants:
                 # 使用ddddocr
                 try:
-                    with open(img_path, 'rb') as f:
-                        img_bytes = f.read()
-                    result = self.ocr.classification(img_bytes)
+                    result = self._dddd_classify(array)
                     numbers = re.findall(r'\d+', result)
                     if numbers:
+                        # 分割的數字圖片只取單一數字，最後再組合
+                        if name.startswith("digit_"):
+                            segment_results.append(numbers[0][0])
                         result = ''.join(numbers)
-                        print(f"ddddocr處理後圖片 {os.path.basename(img_path)} 辨識結果: {result}")
+                        print(f"ddddocr處理後圖片 {name} 辨識結果: {result}")
                         results.append(result)
                 except Exception as e:
-                    print(f"處理圖片 {img_path} 時發生錯誤: {str(e)}")
-                
+                    print(f"處理圖片 {name} 時發生錯誤: {str(e)}")
+
                 # 使用Tesseract
                 try:
-                    img = Image.open(img_path)
-                    # 確保圖片格式兼容Tesseract
-                    if img.mode not in ['RGB', 'L']:
-                        img = img.convert('L')  # 轉換為灰階
-                    custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789'
-                    result_tess = pytesseract.image_to_string(img, config=custom_config)
+                    result_tess = self.tesseract.image_to_string(array, psm=6)
                     numbers_tess = re.findall(r'\d+', result_tess)
                     if numbers_tess:
                         result_tess = ''.join(numbers_tess)
-                        print(f"Tesseract處理後圖片 {os.path.basename(img_path)} 辨識結果: {result_tess}")
+                        print(f"Tesseract處理後圖片 {name} 辨識結果: {result_tess}")
                         results.append(result_tess)
                 except Exception as e:
-                    print(f"Tesseract處理圖片 {img_path} 錯誤: {str(e)}")
-            
-            # 處理分割的數字圖片 (最後三個)
-            segment_results = []
-            for i in range(3):
-                digit_path = f"{image_path.replace('.png', '')}_digit_{i+1}.png"
-                if os.path.exists(digit_path):
-                    try:
-                        with open(digit_path, 'rb') as f:
-                            img_bytes = f.read()
-                        digit_result = self.ocr.classification(img_bytes)
-                        numbers = re.findall(r'\d+', digit_result)
-                        if numbers:
-                            digit = numbers[0]
-                            # 確保只取一個數字
-                            digit = digit[0] if len(digit) > 0 else ""
-                            segment_results.append(digit)
-                    except Exception as e:
-                        print(f"處理分割圖片 {digit_path} 時發生錯誤: {str(e)}")
-            
+                    print(f"Tesseract處理圖片 {name} 錯誤: {str(e)}")
+
             if len(segment_results) > 0:
                 combined = ''.join(segment_results)
                 print(f"分割圖片組合辨識結果: {combined}")
                 results.append(combined)
-        
+
         except Exception as e:
             print(f"辨識過程出現錯誤: {str(e)}")
             import traceback
             print(traceback.format_exc())  # 輸出完整錯誤追蹤
-        
+
         # 處理所有結果，尋找最佳答案
         final_result = self.find_best_result(results)
         return final_result
-    
+
     def find_best_result(self, results):
         """從多個辨識結果中選擇最佳的一個"""
         if not results:
             return None
-        
+
         # 過濾掉空字串
         results = [r for r in results if r]
-        
+
         # 優先選擇3位數字的結果
         three_digits = [r for r in results if len(r) == 3]
         if three_digits:
@@ -209,26 +275,34 @@ class ImageOCR:
             counts = Counter(three_digits)
             most_common = counts.most_common(1)[0][0]
             return most_common
-        
+
         # 如果沒有3位數字結果，則選擇最接近3位數的結果
         results.sort(key=lambda x: abs(len(x) - 3))
         return results[0]
-    
+
+    @staticmethod
+    def vote_confidence(results, quorum=CAPTCHA_QUORUM):
+        """以票數差距估計 3 位數答案的信心
+
+        信心 = (最高票 - 次高票) / max(3 位數結果總數, quorum)，
+        只有一票時為 1/quorum，票數平手或沒有 3 位數結果時為 0
+
+        Returns:
+            (答案, 信心, 最高票數)，沒有 3 位數結果時答案為 None
+        """
+        three_digits = [r for r in results if r and len(r) == 3 and r.isdigit()]
+        if not three_digits:
+            return None, 0.0, 0
+        ranked = Counter(three_digits).most_common(2)
+        top = ranked[0][1]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0
+        return ranked[0][0], (top - runner_up) / max(len(three_digits), quorum), top
+
     def cleanup_temp_files(self, base_image_path):
         """清理所有預處理產生的臨時圖片檔案"""
         base_path = base_image_path.replace('.png', '')
-        patterns = [
-            f"{base_path}_binary.png",
-            f"{base_path}_contrast.png",
-            f"{base_path}_dilated.png",
-            f"{base_path}_adaptive.png",
-            f"{base_path}_enhanced.png",
-            f"{base_path}_denoised.png",
-            f"{base_path}_digit_1.png",
-            f"{base_path}_digit_2.png",
-            f"{base_path}_digit_3.png"
-        ]
-        
+        patterns = [f"{base_path}_{name}.png" for name in self.VARIANT_NAMES]
+
         for pattern in patterns:
             try:
                 if os.path.exists(pattern):
@@ -236,103 +310,161 @@ class ImageOCR:
                     print(f"已刪除臨時檔案: {os.path.basename(pattern)}")
             except Exception as e:
                 print(f"刪除檔案 {pattern} 時發生錯誤: {str(e)}")
-    
-    def recognize_captcha(self, image_path):
-        """主要的驗證碼辨識方法，整合所有辨識功能"""
+
+    def recognize_captcha(self, image):
+        """主要的驗證碼辨識方法，只回傳驗證碼字串（相容舊介面）
+
+        Args:
+            image: 驗證碼圖片路徑或 bytes；傳入 bytes 時整個流程不會碰到磁碟
+        """
+        return self.recognize(image).code
+
+    def recognize(self, image):
+        """主要的驗證碼辨識方法，整合所有辨識功能
+
+        Args:
+            image: 驗證碼圖片路徑或 bytes；傳入 bytes 時整個流程不會碰到磁碟
+
+        Returns:
+            RecognitionResult，辨識失敗時 code 為 None
+        """
+        start = time.perf_counter()
+
+        def result(code, confidence, engine="", variant="", votes=0):
+            return RecognitionResult(code, confidence, engine, variant,
+                                     (time.perf_counter() - start) * 1000, votes)
+
         try:
-            print(f"開始辨識驗證碼圖片: {image_path}")
-            
-            # 檢查圖片是否存在
-            if not os.path.exists(image_path):
-                print(f"錯誤：驗證碼圖片不存在: {image_path}")
-                return None
-                
+            if isinstance(image, (bytes, bytearray)):
+                print(f"開始辨識驗證碼圖片 ({len(image)} bytes)")
+                img_bytes = bytes(image)
+            else:
+                print(f"開始辨識驗證碼圖片: {image}")
+
+                # 檢查圖片是否存在
+                if not os.path.exists(image):
+                    print(f"錯誤：驗證碼圖片不存在: {image}")
+                    return result(None, 0.0)
+                img_bytes = self.load_image_bytes(image)
+
             # 檢查圖片大小
-            file_size = os.path.getsize(image_path)
-            if file_size < 100:  # 如果圖片太小，可能是下載失敗
-                print(f"警告：驗證碼圖片太小 ({file_size} bytes)，可能下載不完整")
-                return None
-            
+            if len(img_bytes) < 100:  # 如果圖片太小，可能是下載失敗
+                print(f"警告：驗證碼圖片太小 ({len(img_bytes)} bytes)，可能下載不完整")
+                return result(None, 0.0)
+
+            # 先用專用數字分類器，信心不足才進入完整的多引擎流程
+            classified = self.classify_digits(img_bytes)
+            if classified:
+                classified.elapsed_ms = (time.perf_counter() - start) * 1000
+                return classified
+
             # 嘗試使用 ddddocr 直接辨識原始圖片
             try:
-                with open(image_path, 'rb') as f:
-                    img_bytes = f.read()
                 dddd_result = self.ocr.classification(img_bytes)
                 print(f"ddddocr 原始圖片識別結果: {dddd_result}")
-                
+
                 # 只保留數字
                 dddd_result = ''.join(filter(str.isdigit, dddd_result))
-                
+
                 # 驗證結果是否為3位數
                 if len(dddd_result) == 3:
                     print(f"ddddocr 成功識別出3位數字: {dddd_result}")
-                    return dddd_result
+                    _, confidence, votes = self.vote_confidence([dddd_result])
+                    return result(dddd_result, confidence, "ddddocr", "original", votes)
             except Exception as e:
                 print(f"ddddocr 原始圖片識別失敗: {str(e)}")
-            
-            # 如果直接識別失敗，嘗試預處理後再識別
-            processed_images = self.try_multiple_preprocessing(image_path)
-            
-            # 對每個處理後的圖片嘗試使用 ddddocr 識別
+
+            # 如果直接識別失敗，嘗試預處理後再識別（變體只保留在記憶體中）
+            prepared = preprocess(img_bytes)
             results = []
-            for proc_img_path in processed_images:
+            sources = {}
+
+            # 先逐一辨識分割出的三個數字，夠有把握時不必再辨識整張圖片的變體
+            segmented = self.recognize_segments(prepared)
+            if segmented:
+                if segmented.confidence >= SEGMENT_MIN_CONFIDENCE:
+                    segmented.elapsed_ms = (time.perf_counter() - start) * 1000
+                    return segmented
+                results.append(segmented.code)
+                sources[segmented.code] = "segments"
+
+            # 對每個處理後的圖片嘗試使用 ddddocr 識別
+            variants = prepared.variants(include_segments=False) if prepared else []
+
+            def classify(batch):
+                # 所有變體一次交給模型，不再逐張編碼成 PNG
                 try:
-                    with open(proc_img_path, 'rb') as f:
-                        img_bytes = f.read()
-                    proc_result = self.ocr.classification(img_bytes)
-                    print(f"處理後圖片 {proc_img_path} 識別結果: {proc_result}")
-                    
-                    # 只保留數字
-                    proc_result = ''.join(filter(str.isdigit, proc_result))
-                    
-                    # 驗證結果是否為3位數
-                    if len(proc_result) == 3:
-                        print(f"成功從處理後圖片識別出3位數字: {proc_result}")
-                        results.append(proc_result)
+                    texts = self.dddd_classify_batch([array for _, array in batch])
                 except Exception as e:
-                    print(f"處理後圖片 {proc_img_path} 識別失敗: {str(e)}")
-            
+                    print(f"處理後圖片識別失敗: {str(e)}")
+                    return
+                for (name, _), proc_result in zip(batch, texts):
+                    try:
+                        print(f"處理後圖片 {name} 識別結果: {proc_result}")
+
+                        # 只保留數字
+                        proc_result = ''.join(filter(str.isdigit, proc_result))
+
+                        # 驗證結果是否為3位數
+                        if len(proc_result) == 3:
+                            print(f"成功從處理後圖片識別出3位數字: {proc_result}")
+                            results.append(proc_result)
+                            sources.setdefault(proc_result, name)
+                    except Exception as e:
+                        print(f"處理後圖片 {name} 識別失敗: {str(e)}")
+
+            classify(variants)
+            # 便宜的變體未達共識時，才加入最耗時的降噪變體
+            if prepared is not None and self.vote_confidence(results)[2] < CAPTCHA_QUORUM:
+                print("便宜的預處理變體結果不一致，加入降噪變體")
+                denoised = [("denoised", prepared.denoised())]
+                classify(denoised)
+                variants += denoised
+            self._debug_dump(variants, image)
+
             # 如果有多個結果，選擇出現頻率最高的
             if results:
-                most_common = Counter(results).most_common(1)[0][0]
-                print(f"多種處理方法中最常見的結果: {most_common}")
-                return most_common
-            
+                most_common, confidence, votes = self.vote_confidence(results)
+                print(f"多種處理方法中最常見的結果: {most_common}（{votes} 票，信心 {confidence:.2f}）")
+                return result(most_common, confidence, "ddddocr", sources[most_common], votes)
+
             # 如果 ddddocr 方法都失敗，嘗試使用 Tesseract
+            if not self.tesseract.available:
+                print("所有辨識方法都失敗（沒有可用的 Tesseract）")
+                return result(None, 0.0)
             print("嘗試使用 Tesseract 進行識別...")
             tesseract_results = []
-            
+
             # 對原始圖片和每個處理後的圖片嘗試使用 Tesseract
-            all_images = [image_path] + processed_images
-            for img_path in all_images:
+            all_images = [("original", Image.open(BytesIO(img_bytes)))]
+            all_images += variants
+            for name, image_data in all_images:
                 for psm in [7, 6, 8, 13]:
                     try:
-                        custom_config = f'--oem 3 --psm {psm} -c tessedit_char_whitelist=0123456789'
-                        result = pytesseract.image_to_string(
-                            Image.open(img_path), 
-                            config=custom_config
-                        ).strip()
-                        
+                        ocr_result = self.tesseract.image_to_string(image_data, psm=psm)
+
                         # 只保留數字
-                        result = ''.join(filter(str.isdigit, result))
-                        
+                        ocr_result = ''.join(filter(str.isdigit, ocr_result))
+
                         # 驗證結果是否為3位數
-                        if len(result) == 3:
-                            print(f"Tesseract PSM {psm} 在 {img_path} 成功識別: {result}")
-                            tesseract_results.append(result)
+                        if len(ocr_result) == 3:
+                            print(f"Tesseract PSM {psm} 在 {name} 成功識別: {ocr_result}")
+                            tesseract_results.append(ocr_result)
+                            sources.setdefault(f"tesseract:{ocr_result}", (name, psm))
                     except Exception as e:
-                        print(f"Tesseract 在 {img_path} 使用 PSM {psm} 識別失敗: {str(e)}")
-            
+                        print(f"Tesseract 在 {name} 使用 PSM {psm} 識別失敗: {str(e)}")
+
             # 如果有多個結果，選擇出現頻率最高的
             if tesseract_results:
-                most_common = Counter(tesseract_results).most_common(1)[0][0]
-                print(f"Tesseract 多種方法中最常見的結果: {most_common}")
-                return most_common
-            
+                most_common, confidence, votes = self.vote_confidence(tesseract_results)
+                print(f"Tesseract 多種方法中最常見的結果: {most_common}（{votes} 票，信心 {confidence:.2f}）")
+                name, psm = sources[f"tesseract:{most_common}"]
+                return result(most_common, confidence, f"tesseract_psm{psm}", name, votes)
+
             # 如果所有方法都失敗，返回 None
             print("所有辨識方法都失敗")
-            return None
-            
+            return result(None, 0.0)
+
         except Exception as e:
             print(f"驗證碼辨識過程中發生錯誤: {str(e)}")
-            return None 
\ No newline at end of file
+            return result(None, 0.0)
@@ -0,0 +1,127 @@
+"""
+元素定位引擎
+將邏輯名稱對應到依序嘗試的定位策略清單，並在一次 JavaScript 呼叫中嘗試所有策略，
+主要選擇器找不到時不必再為每個備用選擇器各等一次 DEFAULT_TIMEOUT；
+每個頁面上最後成功的策略會被記住，下次優先嘗試
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webelement import WebElement
+
+from config import CSS_SELECTORS, DEFAULT_TIMEOUT, LOCATOR_POLL_INTERVAL, LOCATOR_STRATEGIES
+
+# 在瀏覽器中依序嘗試所有策略，回傳 [策略索引, 元素, 是否可見, 是否可用, 頁面路徑]
+RESOLVE_SCRIPT = """
+var strategies = arguments[0], preferred = arguments[1];
+var page = location.pathname;
+var order = [];
+if (preferred.hasOwnProperty(page)) order.push(preferred[page]);
+for (var i = 0; i < strategies.length; i++) if (order.indexOf(i) < 0) order.push(i);
+for (var k = 0; k < order.length; k++) {
+    var idx = order[k], kind = strategies[idx][0], expr = strategies[idx][1], el = null;
+    try {
+        if (kind === 'css') el = document.querySelector(expr);
+        else if (kind === 'id') el = document.getElementById(expr);
+        else if (kind === 'name') el = document.getElementsByName(expr)[0] || null;
+        else if (kind === 'xpath') el = document.evaluate(expr, document, null,
+            XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    } catch (e) { el = null; }
+    if (el) {
+        var visible = !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+        return [idx, el, visible, !el.disabled, page];
+    }
+}
+return null;
+"""
+
+
+@dataclass
+class LocatorMatch:
+    """定位結果"""
+    element: WebElement
+    strategy: Tuple[str, str]  # (策略種類, 表達式)
+    visible: bool
+    enabled: bool
+    elapsed_ms: float
+
+
+class LocatorEngine:
+    """以邏輯名稱定位元素，所有備用策略在同一次瀏覽器往返中嘗試"""
+
+    def __init__(self, driver, timeout: float = DEFAULT_TIMEOUT, poll_interval: float = LOCATOR_POLL_INTERVAL):
+        """
+        Args:
+            driver: Selenium WebDriver
+            timeout: 預設等待秒數
+            poll_interval: 元素尚未出現時的輪詢間隔（秒）
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._strategies: Dict[str, List[Tuple[str, str]]] = {}
+        # {邏輯名稱: {頁面路徑: 最後成功的策略索引}}
+        self._winners: Dict[str, Dict[str, int]] = {}
+
+    def strategies_for(self, name: str) -> List[Tuple[str, str]]:
+        """
+        取得邏輯名稱的定位策略清單（只解析一次）
+
+        未在 LOCATOR_STRATEGIES 或 CSS_SELECTORS 中定義的名稱視為選擇器本身，
+        以 // 或 ( 開頭者為 XPath，其餘為 CSS
+        """
+        strategies = self._strategies.get(name)
+        if strategies is None:
+            if name in LOCATOR_STRATEGIES:
+                strategies = [tuple(s) for s in LOCATOR_STRATEGIES[name]]
+            elif name in CSS_SELECTORS:
+                strategies = [("css", CSS_SELECTORS[name])]
+            elif name.startswith("//") or name.startswith("("):
+                strategies = [("xpath", name)]
+            else:
+                strategies = [("css", name)]
+            self._strategies[name] = strategies
+        return strategies
+
+    def resolve(self, name: str, timeout: Optional[float] = None) -> Optional[LocatorMatch]:
+        """
+        定位元素，逾時前每隔 poll_interval 以一次 JavaScript 呼叫嘗試所有策略
+
+        Args:
+            name: 邏輯名稱或選擇器
+            timeout: 等待秒數，未提供時使用預設值
+
+        Returns:
+            LocatorMatch，逾時仍找不到時回傳 None
+        """
+        strategies = self.strategies_for(name)
+        preferred = self._winners.setdefault(name, {})
+        start = time.perf_counter()
+        deadline = start + (self.timeout if timeout is None else timeout)
+        while True:
+            try:
+                result = self.driver.execute_script(RESOLVE_SCRIPT, strategies, preferred)
+            except WebDriverException:
+                # 頁面切換中，下一輪再試
+                result = None
+            if result:
+                index, element, visible, enabled, page = result
+                preferred[page] = index
+                return LocatorMatch(
+                    element=element,
+                    strategy=strategies[index],
+                    visible=visible,
+                    enabled=enabled,
+                    elapsed_ms=(time.perf_counter() - start) * 1000,
+                )
+            if time.perf_counter() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def find(self, name: str, timeout: Optional[float] = None) -> Optional[WebElement]:
+        """定位元素並直接回傳 WebElement，找不到時回傳 None"""
+        match = self.resolve(name, timeout)
+        return match.element if match else None
@@ -0,0 +1,77 @@
+"""
+OCR 模型註冊表
+整個程序只載入一次 ddddocr 模型，所有登入嘗試共用同一個實例
+"""
+
+import threading
+import time
+from io import BytesIO
+from typing import Dict, Optional
+
+import ddddocr
+from PIL import Image
+
+_lock = threading.Lock()
+_models: Dict[str, ddddocr.DdddOcr] = {}
+_metrics: Dict[str, Dict[str, float]] = {}
+
+
+def get_ddddocr(name: str = "default", **kwargs) -> ddddocr.DdddOcr:
+    """
+    取得共用的 ddddocr 模型，第一次呼叫時才載入
+
+    Args:
+        name: 模型名稱，不同設定（例如 beta 模型）使用不同名稱
+        kwargs: 傳給 ddddocr.DdddOcr 的額外參數
+
+    Returns:
+        已載入的 ddddocr.DdddOcr 實例
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # 取得鎖之後再檢查一次，避免多個執行緒重複載入
+        if name not in _models:
+            start = time.perf_counter()
+            _models[name] = ddddocr.DdddOcr(show_ad=False, **kwargs)
+            load_ms = (time.perf_counter() - start) * 1000
+            _metrics[name] = {"load_ms": load_ms, "warmup_ms": 0.0}
+            print(f"ddddocr 模型 [{name}] 載入完成，耗時 {load_ms:.1f} ms")
+        return _models[name]
+
+
+def warm_up(name: str = "default", **kwargs) -> Dict[str, float]:
+    """
+    預先載入模型並執行一次推論，讓第一次辨識只需付出推論時間
+    建議在訂車時段開始前（例如啟動瀏覽器之前）呼叫
+
+    Returns:
+        該模型的載入與暖機耗時（毫秒）
+    """
+    model = get_ddddocr(name, **kwargs)
+    if _metrics[name]["warmup_ms"]:
+        return dict(_metrics[name])
+
+    buffer = BytesIO()
+    Image.new("RGB", (60, 24), "white").save(buffer, format="PNG")
+    start = time.perf_counter()
+    try:
+        model.classification(buffer.getvalue())
+    except Exception as e:
+        print(f"ddddocr 模型 [{name}] 暖機失敗: {str(e)}")
+    _metrics[name]["warmup_ms"] = (time.perf_counter() - start) * 1000
+    print(f"ddddocr 模型 [{name}] 暖機完成，耗時 {_metrics[name]['warmup_ms']:.1f} ms")
+    return dict(_metrics[name])
+
+
+def load_time_ms(name: str = "default") -> Optional[float]:
+    """回傳模型載入耗時（毫秒），尚未載入時回傳 None"""
+    metrics = _metrics.get(name)
+    return metrics["load_ms"] if metrics else None
+
+
+def get_metrics() -> Dict[str, Dict[str, float]]:
+    """回傳所有已載入模型的耗時統計"""
+    return {name: dict(values) for name, values in _metrics.items()}
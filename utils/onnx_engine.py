@@ -0,0 +1,185 @@
+"""
+直接 ONNX 推論引擎
+把預處理好的 NumPy 變體直接轉成 (1, 1, 64, 寬) 的張量交給 ddddocr 的 ONNX 模型，
+省去每個變體都要 PNG 編碼、再由 ddddocr 解碼與驗證輸入的開銷。
+縮放、灰階與 CTC 解碼都與 ddddocr 1.6 預設模型的流程相同，因此每張圖片的結果與
+ocr.classification 一致。ddddocr 內建模型的批次維度固定為 1，每個變體各執行一次
+session.run；只有換成批次維度可變的模型時，寬度相同的變體才會合併為一次推論
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import ddddocr
+import numpy as np
+import onnxruntime
+from PIL import Image
+
+from config import ONNX_INTRA_OP_THREADS
+from utils.ocr_registry import get_ddddocr
+
+# ddddocr 預設模型的輸入高度
+INPUT_HEIGHT = 64
+
+
+class OnnxBatchEngine:
+    """以單一 ONNX Runtime Session 逐張辨識多個預處理變體（模型支援時合併為一批）"""
+
+    def __init__(self, ocr: Optional[ddddocr.DdddOcr] = None, intra_op_threads: int = ONNX_INTRA_OP_THREADS):
+        """
+        Args:
+            ocr: 提供模型與字元集的 ddddocr 實例，未提供時使用共用實例
+            intra_op_threads: ONNX Runtime 單次推論使用的執行緒數，0 表示由 ONNX Runtime 決定
+
+        Raises:
+            ValueError: ddddocr 使用自訂模型（輸入格式不同）
+        """
+        ocr = ocr or get_ddddocr()
+        engine = ocr.ocr_engine
+        if engine is None or engine.use_import_onnx:
+            raise ValueError("只支援 ddddocr 內建的 OCR 模型")
+        self.charset = engine.charset_manager.get_charset()
+        valid = engine.charset_manager.get_valid_indices()
+        self.valid_indices = set(valid) if valid else None
+        # 空白（索引 0）與 0~9，辨識分割出的單一數字時只在這些類別中取最大值
+        self.digit_indices = np.array([0] + [i for i, c in enumerate(self.charset) if c and c in "0123456789"])
+        self.session = self._create_session(engine, intra_op_threads)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # 批次維度為固定的 1 時只能逐張推論
+        self.batched = not isinstance(model_input.shape[0], int) or model_input.shape[0] != 1
+
+    @staticmethod
+    def _create_session(engine, intra_op_threads: int) -> onnxruntime.InferenceSession:
+        """以指定的執行緒數重新建立模型 Session，找不到模型檔時沿用 ddddocr 的 Session"""
+        # 與 ddddocr ModelLoader.load_ocr_model 選擇模型檔的規則相同
+        model_name = "common.onnx" if engine.beta and not engine.old else "common_old.onnx"
+        model_path = os.path.join(os.path.dirname(ddddocr.__file__), model_name)
+        if not os.path.isfile(model_path):
+            return engine.session
+        options = onnxruntime.SessionOptions()
+        # 超過 CPU 核心數只會互相搶佔，反而更慢
+        options.intra_op_num_threads = max(0, min(int(intra_op_threads), os.cpu_count() or 1))
+        return onnxruntime.InferenceSession(model_path, sess_options=options,
+                                            providers=engine.session.get_providers())
+
+    @staticmethod
+    def prepare(array: np.ndarray) -> np.ndarray:
+        """
+        將變體轉成模型輸入：等比例縮放到高 64、灰階、除以 255
+
+        使用與 ddddocr 相同的 PIL LANCZOS 縮放，確保結果與 ocr.classification 一致
+
+        Returns:
+            (1, 64, 寬) 的 float32 陣列
+        """
+        if array.ndim == 3:
+            image = Image.fromarray(cv2.cvtColor(array, cv2.COLOR_BGR2RGB))
+        else:
+            image = Image.fromarray(array)
+        width = int(image.size[0] * (INPUT_HEIGHT / image.size[1]))
+        image = image.resize((width, INPUT_HEIGHT), Image.LANCZOS).convert("L")
+        return (np.asarray(image, dtype=np.float32) / 255.0)[np.newaxis]
+
+    def _decode(self, indices: np.ndarray) -> str:
+        """CTC 解碼：去除連續重複與空白（索引 0）後對應到字元集"""
+        chars = []
+        previous = None
+        for index in indices.tolist():
+            if index != previous and index != 0:
+                if (self.valid_indices is None or index in self.valid_indices) and index < len(self.charset):
+                    chars.append(self.charset[index])
+            previous = index
+        return "".join(chars)
+
+    def _run(self, tensor: np.ndarray) -> np.ndarray:
+        """
+        執行推論並回傳每張圖片的輸出 (張數, 序列長度, 類別數)
+
+        模型輸出為 (序列長度, 張數, 類別數)
+        """
+        if self.batched:
+            outputs = [self.session.run(None, {self.input_name: tensor})[0]]
+        else:
+            outputs = [self.session.run(None, {self.input_name: tensor[i:i + 1]})[0] for i in range(len(tensor))]
+        return np.concatenate([output.transpose(1, 0, 2) for output in outputs])
+
+    def _logits(self, arrays: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        推論多個影像，縮放後寬度相同的影像（例如 PreprocessedCaptcha.batch）合併為同一個張量
+
+        Returns:
+            與 arrays 順序相同的 (序列長度, 類別數) 輸出
+        """
+        groups: Dict[int, List[int]] = {}
+        inputs = []
+        for i, array in enumerate(arrays):
+            prepared = self.prepare(array)
+            inputs.append(prepared)
+            groups.setdefault(prepared.shape[-1], []).append(i)
+
+        logits: List[Optional[np.ndarray]] = [None] * len(inputs)
+        for members in groups.values():
+            tensor = np.stack([inputs[i] for i in members])
+            for i, output in zip(members, self._run(tensor)):
+                logits[i] = output
+        return logits
+
+    def classify_batch(self, arrays: Sequence[np.ndarray]) -> List[str]:
+        """
+        辨識多個變體
+
+        Args:
+            arrays: 灰階或 BGR 的 NumPy 影像
+
+        Returns:
+            與 arrays 順序相同的辨識結果
+        """
+        return [self._decode(np.argmax(output, axis=1)) for output in self._logits(arrays)]
+
+    def classify_digits(self, arrays: Sequence[np.ndarray]) -> List[Tuple[str, float]]:
+        """
+        辨識分割出的單一數字，只在 0~9 與空白之間選擇
+
+        Args:
+            arrays: 每張只含一個數字的影像
+
+        Returns:
+            與 arrays 順序相同的 (辨識結果, 機率)；機率為輸出數字的時間步中最高的 softmax 值，
+            結果不是正好一個數字時機率為 0
+        """
+        results = []
+        for output in self._logits(arrays):
+            digits = output[:, self.digit_indices]
+            probabilities = np.exp(digits - digits.max(axis=1, keepdims=True))
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            best = np.argmax(probabilities, axis=1)
+            text = self._decode(self.digit_indices[best])
+            steps = best != 0
+            probability = float(probabilities[steps, best[steps]].max()) if steps.any() and len(text) == 1 else 0.0
+            results.append((text, probability))
+        return results
+
+    def classify(self, array: np.ndarray) -> str:
+        """辨識單一變體"""
+        return self.classify_batch([array])[0]
+
+
+_shared: Optional[OnnxBatchEngine] = None
+_shared_lock = threading.Lock()
+_shared_attempted = False
+
+
+def get_onnx_engine() -> Optional[OnnxBatchEngine]:
+    """取得程序內共用的 ONNX 引擎，無法建立時回傳 None（改用 ocr.classification）"""
+    global _shared, _shared_attempted
+    with _shared_lock:
+        if not _shared_attempted:
+            _shared_attempted = True
+            try:
+                _shared = OnnxBatchEngine()
+            except Exception as e:
+                print(f"建立 ONNX 引擎失敗: {str(e)}")
+        return _shared
@@ -0,0 +1,156 @@
+"""
+頁面就緒等待模組
+以毫秒級輪詢等待具體的 DOM、網路閒置或選單選項條件，取代固定的 time.sleep，
+並記錄每次等待實際花費的時間
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from selenium.common.exceptions import NoAlertPresentException, StaleElementReferenceException, WebDriverException
+
+from config import NETWORK_IDLE_MS, READY_POLL_INTERVAL, READY_TIMEOUT
+
+
+class PageReady:
+    """等待頁面達到指定狀態，並記錄每次等待的耗時"""
+
+    def __init__(self, driver, timeout: float = READY_TIMEOUT, poll_interval: float = READY_POLL_INTERVAL):
+        """
+        Args:
+            driver: Selenium WebDriver
+            timeout: 預設等待秒數
+            poll_interval: 輪詢間隔（秒）
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        # (標籤, 耗時毫秒, 是否在逾時前達成)
+        self.timings: List[Tuple[str, float, bool]] = []
+
+    def until(self, label: str, condition: Callable[[Any], Any], timeout: Optional[float] = None) -> Any:
+        """
+        輪詢直到 condition(driver) 回傳真值
+
+        Args:
+            label: 記錄用的標籤
+            condition: 接收 driver 的條件函式，例外視為尚未就緒
+            timeout: 等待秒數，未提供時使用預設值
+
+        Returns:
+            condition 的回傳值，逾時則回傳 None
+        """
+        start = time.perf_counter()
+        deadline = start + (self.timeout if timeout is None else timeout)
+        while True:
+            try:
+                value = condition(self.driver)
+            except WebDriverException:
+                value = None
+            if value:
+                self._record(label, start, True)
+                return value
+            if time.perf_counter() >= deadline:
+                self._record(label, start, False)
+                print(f"等待 {label} 逾時")
+                return None
+            time.sleep(self.poll_interval)
+
+    def _record(self, label: str, start: float, ok: bool):
+        self.timings.append((label, (time.perf_counter() - start) * 1000, ok))
+
+    def document_ready(self, label: str = "document_ready", timeout: Optional[float] = None) -> bool:
+        """等待 document.readyState 為 complete"""
+        return bool(self.until(
+            label, lambda d: d.execute_script("return document.readyState") == "complete", timeout
+        ))
+
+    def navigation(self, old_element, label: str = "navigation", timeout: Optional[float] = None) -> bool:
+        """
+        等待點擊後離開目前頁面（舊元素失效）且新頁面載入完成；出現警告對話框也視為已有回應
+
+        Args:
+            old_element: 點擊前頁面上的任一元素，通常就是被點擊的按鈕
+        """
+        def left_page(driver):
+            try:
+                driver.switch_to.alert
+                return "alert"
+            except NoAlertPresentException:
+                pass
+            try:
+                old_element.is_enabled()
+                return None
+            except StaleElementReferenceException:
+                return driver.execute_script("return document.readyState") == "complete"
+
+        return bool(self.until(label, left_page, timeout))
+
+    def element(self, selector: str, label: Optional[str] = None, timeout: Optional[float] = None):
+        """等待 CSS 選擇器對應的元素出現，回傳該元素"""
+        return self.until(
+            label or selector,
+            lambda d: d.execute_script("return document.querySelector(arguments[0]);", selector),
+            timeout,
+        )
+
+    def options_populated(self, select_name: str, expected_text: Optional[str] = None,
+                          timeout: Optional[float] = None) -> bool:
+        """
+        等待動態產生的下拉選單出現選項
+
+        Args:
+            select_name: select 的 name
+            expected_text: 指定時等待出現此文字的選項；若選項已產生但沒有此文字，也視為就緒
+        """
+        script = """
+        var s = document.getElementsByName(arguments[0])[0];
+        if (!s || !s.options.length) return false;
+        if (!arguments[1]) return true;
+        for (var i = 0; i < s.options.length; i++) if (s.options[i].text.trim() === arguments[1]) return true;
+        return 'populated';
+        """
+        return bool(self.until(
+            f"options:{select_name}", lambda d: d.execute_script(script, select_name, expected_text), timeout
+        ))
+
+    def network_idle(self, idle_ms: float = NETWORK_IDLE_MS, timeout: Optional[float] = None) -> bool:
+        """等待頁面載入完成且資源請求數量在 idle_ms 內沒有增加"""
+        state = {"count": -1, "since": time.perf_counter()}
+
+        def idle(driver):
+            ready, count = driver.execute_script(
+                "return [document.readyState, performance.getEntriesByType('resource').length];"
+            )
+            now = time.perf_counter()
+            if ready != "complete" or count != state["count"]:
+                state["count"], state["since"] = count, now
+                return False
+            return (now - state["since"]) * 1000 >= idle_ms
+
+        return bool(self.until("network_idle", idle, timeout))
+
+    def layout_stable(self, label: str = "layout_stable", timeout: Optional[float] = None) -> bool:
+        """等待頁面載入完成、圖片載入完畢且版面尺寸在連續兩次輪詢間不再改變（截圖前使用）"""
+        state = {"size": None}
+
+        def stable(driver):
+            size = driver.execute_script(
+                """
+                if (document.readyState !== 'complete') return null;
+                for (var i = 0; i < document.images.length; i++) if (!document.images[i].complete) return null;
+                var r = document.documentElement;
+                return [r.scrollWidth, r.scrollHeight];
+                """
+            )
+            previous, state["size"] = state["size"], size
+            return size is not None and size == previous
+
+        return bool(self.until(label, stable, timeout))
+
+    def summary(self) -> Dict[str, float]:
+        """回傳各標籤累計的等待毫秒數"""
+        totals: Dict[str, float] = {}
+        for label, elapsed_ms, _ in self.timings:
+            totals[label] = totals.get(label, 0.0) + elapsed_ms
+        return totals
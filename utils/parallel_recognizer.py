@@ -0,0 +1,202 @@
+"""
+平行驗證碼辨識
+原始圖片的 ddddocr 辨識出 3 位數時直接採用（與 ImageOCR 的循序流程相同），
+失敗時才將預處理變體與 OCR 引擎分派到執行緒池，相同的 3 位數答案達到共識票數即提前結束，
+最差情況的辨識時間由截止時間限制，不再隨變體數量線性增加
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+
+from config import (
+    CAPTCHA_PARALLEL_WORKERS,
+    CAPTCHA_QUORUM,
+    CAPTCHA_DEADLINE,
+    CAPTCHA_TESSERACT_PSMS,
+    SEGMENT_MIN_CONFIDENCE,
+)
+from utils.image_ocr import ImageOCR, RecognitionResult
+from utils.preprocess import preprocess
+
+_executors: Dict[int, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(max_workers: int = CAPTCHA_PARALLEL_WORKERS) -> ThreadPoolExecutor:
+    """
+    取得程序內共用的辨識執行緒池（同樣大小的池只建立一次）
+
+    每個 CaptchaHandler 都會建立 ParallelRecognizer，若各自擁有執行緒池，
+    平行登入、非同步引擎與基準測試中閒置的工作執行緒會不斷累積
+    """
+    with _executors_lock:
+        executor = _executors.get(max_workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="captcha-ocr")
+            _executors[max_workers] = executor
+        return executor
+
+
+class ParallelRecognizer:
+    """以執行緒池同時執行多個引擎與變體的驗證碼辨識器"""
+
+    def __init__(self, image_ocr: Optional[ImageOCR] = None,
+                 max_workers: int = CAPTCHA_PARALLEL_WORKERS,
+                 quorum: int = CAPTCHA_QUORUM,
+                 deadline: float = CAPTCHA_DEADLINE,
+                 tesseract_psms=CAPTCHA_TESSERACT_PSMS):
+        """
+        初始化平行辨識器
+
+        Args:
+            image_ocr: 共用的 ImageOCR 實例，未提供時自動建立
+            max_workers: 共用執行緒池的大小
+            quorum: 相同 3 位數答案達到此票數即提前結束
+            deadline: 單張驗證碼辨識的最長秒數
+            tesseract_psms: Tesseract 要嘗試的 PSM 模式
+        """
+        self.image_ocr = image_ocr or ImageOCR()
+        self.quorum = quorum
+        self.deadline = deadline
+        self.tesseract_psms = tuple(tesseract_psms)
+        # 所有辨識器共用同一個執行緒池，提前結束時不必等待仍在執行的工作
+        self.executor = get_executor(max_workers)
+
+    @staticmethod
+    def _digits(text: str) -> str:
+        """只保留辨識結果中的數字"""
+        return ''.join(re.findall(r'\d+', text or ''))
+
+    def _run_dddd(self, name, data):
+        """ddddocr 辨識工作"""
+        if isinstance(data, (bytes, bytearray)):
+            text = self.image_ocr.ocr.classification(data)
+        else:
+            # NumPy 變體直接交給 ONNX 引擎，不必先編碼成 PNG
+            text = self.image_ocr._dddd_classify(data)
+        return name, "ddddocr", self._digits(text), None
+
+    def _run_tesseract(self, name, array, psm):
+        """Tesseract 辨識工作"""
+        text = self.image_ocr.tesseract.image_to_string(array, psm=psm)
+        return name, f"tesseract_psm{psm}", self._digits(text), None
+
+    def _run_segments(self, prepared):
+        """分割數字辨識工作，另外回傳三個數字中最低的機率"""
+        segmented = self.image_ocr.recognize_segments(prepared)
+        if segmented is None:
+            return "segments", "segments", "", None
+        return "segments", "segments", segmented.code, segmented.confidence
+
+    def _submit_variant(self, futures, name, array):
+        """為單一變體排入所有引擎的辨識工作"""
+        futures.add(self.executor.submit(self._run_dddd, name, array))
+        if not self.image_ocr.tesseract.available:
+            return
+        for psm in self.tesseract_psms:
+            futures.add(self.executor.submit(self._run_tesseract, name, array, psm))
+
+    def recognize(self, image) -> RecognitionResult:
+        """
+        平行辨識驗證碼
+
+        Args:
+            image: 驗證碼圖片路徑或 bytes
+
+        Returns:
+            RecognitionResult，答案的選擇規則與 ImageOCR.find_best_result 相同，
+            信心為 ImageOCR.vote_confidence 的票數差距
+        """
+        start = time.perf_counter()
+        end_at = start + self.deadline
+        image_bytes = self.image_ocr.load_image_bytes(image)
+
+        # 數字分類器只需約 1 ms，信心足夠時不必啟動任何平行工作
+        classified = self.image_ocr.classify_digits(image_bytes)
+        if classified:
+            classified.elapsed_ms = (time.perf_counter() - start) * 1000
+            return classified
+
+        # 原始圖片第一次就讀出 3 位數時直接採用，共識票數只用來解決變體之間的分歧
+        try:
+            _, engine, digits, _ = self._run_dddd("original", image_bytes)
+        except Exception as e:
+            print(f"ddddocr 原始圖片識別失敗: {str(e)}")
+            digits = ""
+        if len(digits) == 3:
+            _, confidence, votes = self.image_ocr.vote_confidence([digits], self.quorum)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"ddddocr 原始圖片識別出 3 位數 {digits}，耗時 {elapsed:.1f} ms")
+            return RecognitionResult(digits, confidence, engine, "original", elapsed, votes)
+
+        futures = set()
+        try:
+            prepared = preprocess(image_bytes)
+        except Exception as e:
+            print(f"預處理失敗，只使用原始圖片辨識: {str(e)}")
+            prepared = None
+        if prepared is not None:
+            # 分割出的三個數字在同一個工作中辨識，與整張圖片的變體同時進行
+            futures.add(self.executor.submit(self._run_segments, prepared))
+        for name, array in (prepared.variants(include_segments=False) if prepared else []):
+            self._submit_variant(futures, name, array)
+        # 最耗時的降噪變體只在其他變體都完成仍未達共識時才加入
+        denoise_pending = prepared is not None
+
+        results: List[str] = []
+        # 票數相同時依循序流程的順序（分割數字、各變體）決定，不受工作完成的先後影響
+        order = {name: i for i, name in enumerate(
+            ("segments",) + (prepared.names if prepared else ()) + ("denoised",))}
+        ranked = []  # (順序, 答案)
+        sources = {}  # 答案 -> 順序最前面的 (順序, 引擎, 變體)
+        pending = futures
+        try:
+            while pending or denoise_pending:
+                if not pending:
+                    denoise_pending = False
+                    print("便宜的預處理變體未達共識，加入降噪變體")
+                    self._submit_variant(pending, "denoised", prepared.denoised())
+                remaining = end_at - time.perf_counter()
+                if remaining <= 0:
+                    print(f"平行辨識已達截止時間 {self.deadline:.1f} 秒，剩餘 {len(pending)} 個工作放棄")
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        name, engine, digits, probability = future.result()
+                    except Exception as e:
+                        print(f"平行辨識工作失敗: {str(e)}")
+                        continue
+                    if not digits:
+                        continue
+                    # 三個分割數字都夠有把握時直接採用，否則只算一票
+                    if probability is not None and probability >= SEGMENT_MIN_CONFIDENCE:
+                        elapsed = (time.perf_counter() - start) * 1000
+                        print(f"平行辨識採用分割數字結果 {digits}（最低機率 {probability:.2f}），耗時 {elapsed:.1f} ms")
+                        return RecognitionResult(digits, probability, engine, name, elapsed, 1)
+                    results.append(digits)
+                    rank = order.get(name, len(order))
+                    ranked.append((rank, digits))
+                    if digits not in sources or rank < sources[digits][0]:
+                        sources[digits] = (rank, engine, name)
+
+                    # 檢查是否已達到共識票數
+                    code, confidence, votes = self.image_ocr.vote_confidence(results, self.quorum)
+                    if code and votes >= self.quorum:
+                        elapsed = (time.perf_counter() - start) * 1000
+                        print(f"平行辨識達成共識 {code} ({votes} 票，最後由 {engine}/{name} 確認)，耗時 {elapsed:.1f} ms")
+                        _, first_engine, first_variant = sources[code]
+                        return RecognitionResult(code, confidence, first_engine, first_variant, elapsed, votes)
+        finally:
+            for future in pending:
+                future.cancel()
+
+        best = self.image_ocr.find_best_result([digits for _, digits in sorted(ranked, key=lambda item: item[0])])
+        _, confidence, votes = self.image_ocr.vote_confidence(results, self.quorum)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"平行辨識未達共識，採用最佳結果 {best}（信心 {confidence:.2f}），耗時 {elapsed:.1f} ms")
+        _, engine, variant = sources.get(best, (0, "", ""))
+        return RecognitionResult(best, confidence if best and len(best) == 3 else 0.0, engine, variant, elapsed, votes)
@@ -0,0 +1,136 @@
+"""
+驗證碼預處理核心
+圖片只解碼一次，灰階與 Otsu 二值化等中間結果在所有變體間共用，
+同尺寸的變體一次產生為 (變體數, 高, 寬) 的 NumPy 陣列，不再反覆在 PIL 與 NumPy 之間轉換。
+最耗時的非局部平均降噪（NL-means，約佔預處理時間的八成）延遲到便宜的變體辨識結果不一致時才計算。
+單一數字的切割由 utils.segmentation 負責
+"""
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.segmentation import segment_digits
+
+# 便宜的整張變體，順序與 ImageOCR.VARIANT_NAMES 相同
+CHEAP_VARIANTS = ("binary", "contrast", "dilated", "adaptive", "enhanced")
+# CaptchaHandler 備用辨識的變體
+FALLBACK_VARIANTS = ("clahe", "clahe_contrast", "clahe_sharpen")
+
+KERNEL_2X2 = np.ones((2, 2), np.uint8)
+# 與 PIL ImageFilter.SHARPEN 相同的卷積核
+SHARPEN_KERNEL = np.array([[-2, -2, -2], [-2, 32, -2], [-2, -2, -2]], np.float32) / 16
+
+
+def decode_gray(image_bytes: bytes) -> Optional[np.ndarray]:
+    """解碼為灰階影像，無法解碼時回傳 None"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def otsu(gray: np.ndarray) -> np.ndarray:
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def contrast(gray: np.ndarray, factor: float) -> np.ndarray:
+    """與 PIL ImageEnhance.Contrast 相同：以平均亮度為中心拉開對比"""
+    mean = int(gray.mean() + 0.5)
+    return np.clip(mean + factor * (gray.astype(np.float32) - mean) + 0.5, 0, 255).astype(np.uint8)
+
+
+def sharpen(gray: np.ndarray) -> np.ndarray:
+    """與 PIL ImageFilter.SHARPEN 相同，邊緣像素保持不變"""
+    sharpened = cv2.filter2D(gray, -1, SHARPEN_KERNEL, borderType=cv2.BORDER_REPLICATE)
+    sharpened[0, :], sharpened[-1, :] = gray[0, :], gray[-1, :]
+    sharpened[:, 0], sharpened[:, -1] = gray[:, 0], gray[:, -1]
+    return sharpened
+
+
+def clahe_binary(gray: np.ndarray) -> np.ndarray:
+    """CaptchaHandler 的預處理：CLAHE、反相自適應二值化、開運算去噪點後膨脹"""
+    equalized = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(4, 4)).apply(gray)
+    binary = cv2.adaptiveThreshold(equalized, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                   cv2.THRESH_BINARY_INV, 11, 2)
+    opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, KERNEL_2X2)
+    return cv2.dilate(opening, KERNEL_2X2, iterations=1)
+
+
+class PreprocessedCaptcha:
+    """單張驗證碼的預處理結果，共用的中間結果只計算一次"""
+
+    def __init__(self, gray: np.ndarray):
+        self.gray = gray
+        self.otsu = otsu(gray)
+        self.names = CHEAP_VARIANTS
+        self.batch = np.stack([
+            self.otsu,
+            # 調整對比度並二值化
+            otsu(cv2.convertScaleAbs(gray, alpha=2.0, beta=10)),
+            # 形態學處理
+            cv2.dilate(self.otsu, KERNEL_2X2, iterations=1),
+            # 自適應二值化
+            cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2),
+            # 增強對比並銳化
+            sharpen(contrast(gray, 2.5)),
+        ])
+        self._denoised_gray = None
+        self._digits = None
+
+    def digits(self) -> Optional[List[np.ndarray]]:
+        """以連通元件或垂直投影切出的三個數字，無法切出正好三個時回傳 None"""
+        if self._digits is None:
+            self._digits = segment_digits(self.gray) or []
+        return self._digits or None
+
+    def segments(self) -> List[Tuple[str, np.ndarray]]:
+        """回傳 [(digit_1~3, 數字影像)]，無法切出正好三個數字時回傳空列表"""
+        return [(f"digit_{i + 1}", crop) for i, crop in enumerate(self.digits() or [])]
+
+    def variants(self, include_denoised: bool = False, include_segments: bool = True) -> List[Tuple[str, np.ndarray]]:
+        """
+        回傳 [(變體名稱, 影像)]
+
+        Args:
+            include_denoised: 是否包含 NL-means 降噪變體（較慢）
+            include_segments: 是否包含分割出的單一數字
+        """
+        variants = list(zip(self.names, self.batch))
+        if include_denoised:
+            variants.append(("denoised", self.denoised()))
+        if include_segments:
+            variants += self.segments()
+        return variants
+
+    @property
+    def denoised_gray(self) -> np.ndarray:
+        """NL-means 降噪後的灰階影像，第一次存取時才計算"""
+        if self._denoised_gray is None:
+            self._denoised_gray = cv2.fastNlMeansDenoising(self.gray, None, 10, 7, 21)
+        return self._denoised_gray
+
+    def denoised(self) -> np.ndarray:
+        """降噪後二值化"""
+        return otsu(self.denoised_gray)
+
+    def fallback_batch(self) -> Tuple[Tuple[str, ...], np.ndarray]:
+        """
+        CaptchaHandler 備用辨識的變體：原圖、增強對比、銳化後套用 clahe_binary
+        （降噪變體需要時再以 clahe_binary(denoised_gray) 產生）
+
+        Returns:
+            (變體名稱, (變體數, 高, 寬) 陣列)
+        """
+        sources = [self.gray, contrast(self.gray, 2.0), sharpen(self.gray)]
+        return FALLBACK_VARIANTS, np.stack([clahe_binary(source) for source in sources])
+
+
+def preprocess(image_bytes: bytes) -> Optional[PreprocessedCaptcha]:
+    """解碼並產生便宜的預處理變體，無法解碼時回傳 None"""
+    gray = decode_gray(image_bytes)
+    if gray is None:
+        return None
+    return PreprocessedCaptcha(gray)
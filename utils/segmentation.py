@@ -0,0 +1,145 @@
+"""
+驗證碼數字分割
+以連通元件找出每個數字的外框，元件數量不對（數字斷裂或黏在一起）時改用垂直投影切割，
+取代原本把圖片等寬切成三份的做法（數字跨過切線時兩邊都會辨識錯誤）。
+切出的數字補白成正方形後可以個別交給 OCR 引擎；無法切出正好三個數字時回傳 None，
+由整張圖片的辨識流程處理
+"""
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 一欄至少要有幾個墨跡像素才算是數字的一部分
+MIN_COLUMN_INK = 2
+MIN_SEGMENT_WIDTH = 3
+# 連通元件至少要有的面積，以及高度佔整張圖片的比例，較小的視為雜點或干擾線
+MIN_COMPONENT_AREA = 12
+MIN_COMPONENT_HEIGHT = 0.25
+# 裁切數字時左右保留的邊界（像素）
+CROP_PADDING = 2
+
+KERNEL_2X2 = np.ones((2, 2), np.uint8)
+
+
+def binarize_gray(gray: np.ndarray) -> np.ndarray:
+    """二值化，數字為 255、背景為 0，並以開運算去除細干擾線"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    # 背景比數字多，若反相後墨跡過半表示原圖為深底淺字
+    if np.count_nonzero(binary) > binary.size / 2:
+        binary = cv2.bitwise_not(binary)
+    return cv2.morphologyEx(binary, cv2.MORPH_OPEN, KERNEL_2X2)
+
+
+def binarize(image_bytes: bytes) -> Optional[np.ndarray]:
+    """解碼並二值化，無法解碼時回傳 None"""
+    gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    return binarize_gray(gray)
+
+
+def _column_runs(profile: np.ndarray) -> List[Tuple[int, int]]:
+    """找出投影值達到門檻的連續欄位區間 [start, end)"""
+    mask = np.concatenate(([False], profile >= MIN_COLUMN_INK, [False]))
+    edges = np.flatnonzero(mask[1:] != mask[:-1])
+    return [(int(s), int(e)) for s, e in zip(edges[::2], edges[1::2]) if e - s >= MIN_SEGMENT_WIDTH]
+
+
+def segment_columns(binary: np.ndarray, count: int = 3) -> Optional[List[Tuple[int, int]]]:
+    """
+    以垂直投影切出 count 個數字的欄位範圍
+
+    區間過多時保留墨跡最多的 count 個（其餘多半是干擾線），
+    過少時在最寬區間中投影最低的位置切開
+
+    Returns:
+        由左到右的 [(start, end)]，無法切出 count 個時回傳 None
+    """
+    profile = np.count_nonzero(binary, axis=0)
+    runs = _column_runs(profile)
+    while 0 < len(runs) < count:
+        widest = max(range(len(runs)), key=lambda i: runs[i][1] - runs[i][0])
+        start, end = runs[widest]
+        if end - start < 2 * MIN_SEGMENT_WIDTH:
+            return None
+        inner = profile[start + MIN_SEGMENT_WIDTH:end - MIN_SEGMENT_WIDTH]
+        cut = start + MIN_SEGMENT_WIDTH + int(np.argmin(inner)) if inner.size else (start + end) // 2
+        runs[widest:widest + 1] = [(start, cut), (cut, end)]
+    if len(runs) < count:
+        return None
+    if len(runs) > count:
+        mass = [int(profile[s:e].sum()) for s, e in runs]
+        keep = sorted(sorted(range(len(runs)), key=lambda i: mass[i], reverse=True)[:count])
+        runs = [runs[i] for i in keep]
+    return runs
+
+
+def component_columns(binary: np.ndarray, count: int = 3) -> Optional[List[Tuple[int, int]]]:
+    """
+    以連通元件找出數字的欄位範圍
+
+    過小或過矮的元件視為雜點；水平方向大部分重疊的元件（例如斷成上下兩截的數字）合併為一個
+
+    Returns:
+        由左到右的 [(start, end)]，數量不是 count 時回傳 None
+    """
+    n, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    min_height = binary.shape[0] * MIN_COMPONENT_HEIGHT
+    boxes = sorted(
+        (int(x), int(x + w)) for x, _, w, h, area in stats[1:n]
+        if area >= MIN_COMPONENT_AREA and h >= min_height
+    )
+    merged: List[List[int]] = []
+    for start, end in boxes:
+        if merged and min(end, merged[-1][1]) - start > (end - start) / 2:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    if len(merged) != count:
+        return None
+    return [(start, end) for start, end in merged]
+
+
+def find_digit_columns(binary: np.ndarray, count: int = 3) -> Optional[List[Tuple[int, int]]]:
+    """先以連通元件、再以垂直投影切出 count 個數字，都失敗時回傳 None"""
+    return component_columns(binary, count) or segment_columns(binary, count)
+
+
+def digit_crops(gray: np.ndarray, columns: List[Tuple[int, int]],
+                padding: int = CROP_PADDING) -> List[np.ndarray]:
+    """
+    依欄位範圍裁切數字
+
+    每個數字保留完整高度，各自以 Otsu 二值化（黑字白底），寬度不足時左右補白成正方形，
+    避免 OCR 模型把細長的單一數字縮放變形
+
+    Returns:
+        由左到右的數字影像
+    """
+    crops = []
+    width = gray.shape[1]
+    for start, end in columns:
+        _, crop = cv2.threshold(gray[:, max(0, start - padding):min(width, end + padding)], 0, 255,
+                                cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        height, crop_width = crop.shape
+        if crop_width < height:
+            left = (height - crop_width) // 2
+            crop = cv2.copyMakeBorder(crop, 0, 0, left, height - crop_width - left,
+                                      cv2.BORDER_CONSTANT, value=255)
+        crops.append(crop)
+    return crops
+
+
+def segment_digits(gray: np.ndarray, count: int = 3) -> Optional[List[np.ndarray]]:
+    """
+    將灰階驗證碼切成 count 個數字影像
+
+    Returns:
+        由左到右的數字影像，無法切出正好 count 個時回傳 None
+    """
+    columns = find_digit_columns(binarize_gray(gray), count)
+    if columns is None:
+        return None
+    return digit_crops(gray, columns)
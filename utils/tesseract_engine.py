@@ -0,0 +1,177 @@
+"""
+程序內的 Tesseract 引擎
+pytesseract 每次呼叫都會啟動一個 tesseract 子程序並寫入暫存檔，每個變體 × PSM 都要付出一次啟動成本。
+安裝了 tesserocr 時改用程序內的 TessBaseAPI：每個執行緒保留一個已初始化、預先設定好數字白名單的
+API，之後只需切換 PSM 與影像。沒有 tesserocr 時仍使用 pytesseract，但執行檔改為依平台自動尋找，
+不再寫死 Windows 的安裝路徑
+"""
+
+import atexit
+import os
+import shutil
+import threading
+from typing import List, Optional
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from config import TESSERACT_CMD, TESSERACT_LANG
+
+try:
+    import tesserocr
+except ImportError:  # pragma: no cover - 選用套件
+    tesserocr = None
+
+DIGIT_WHITELIST = "0123456789"
+# Windows 安裝程式的預設位置
+WINDOWS_DEFAULT_PATHS = (
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+)
+
+
+def find_tesseract(configured: str = TESSERACT_CMD) -> Optional[str]:
+    """
+    尋找 tesseract 執行檔
+
+    依序使用：config.TESSERACT_CMD、環境變數 TESSERACT_CMD、PATH 中的 tesseract、
+    Windows 的預設安裝路徑
+
+    Returns:
+        執行檔路徑，找不到時回傳 None
+    """
+    for candidate in (configured, os.environ.get("TESSERACT_CMD")):
+        if candidate and os.path.isfile(candidate):
+            return candidate
+    found = shutil.which("tesseract")
+    if found:
+        return found
+    if os.name == "nt":
+        for path in WINDOWS_DEFAULT_PATHS:
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def find_tessdata(tesseract_cmd: Optional[str]) -> Optional[str]:
+    """
+    尋找 tessdata 目錄供 tesserocr 使用
+
+    優先使用環境變數 TESSDATA_PREFIX，其次是執行檔旁的 tessdata（Windows 安裝方式），
+    都沒有時回傳 None 由 tesserocr 使用編譯時的預設位置
+    """
+    prefix = os.environ.get("TESSDATA_PREFIX")
+    if prefix and os.path.isdir(prefix):
+        return prefix
+    if tesseract_cmd:
+        candidate = os.path.join(os.path.dirname(tesseract_cmd), "tessdata")
+        if os.path.isdir(candidate):
+            return candidate
+    return None
+
+
+def to_pil(image) -> Image.Image:
+    """將 NumPy（灰階或 BGR）或 PIL 影像轉為 Tesseract 可接受的 PIL 影像（RGB 或 L）"""
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3:
+            return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        return Image.fromarray(image)
+    if image.mode not in ("RGB", "L"):
+        return image.convert("L")
+    return image
+
+
+class TesseractEngine:
+    """只辨識數字的 Tesseract 引擎，可安全地在多個執行緒中同時使用"""
+
+    def __init__(self, lang: str = TESSERACT_LANG, whitelist: str = DIGIT_WHITELIST):
+        """
+        Args:
+            lang: Tesseract 語言資料
+            whitelist: 允許辨識的字元
+        """
+        self.lang = lang
+        self.whitelist = whitelist
+        self.tesseract_cmd = find_tesseract()
+        self.tessdata = find_tessdata(self.tesseract_cmd)
+        self._local = threading.local()
+        self._apis: List = []
+        self._apis_lock = threading.Lock()
+
+        if tesserocr is not None:
+            self.backend = "tesserocr"
+        elif self.tesseract_cmd:
+            self.backend = "pytesseract"
+            pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+        else:
+            self.backend = None
+            print("找不到 Tesseract（可安裝 tesserocr，或設定 TESSERACT_CMD），略過 Tesseract 辨識")
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def _api(self):
+        """取得目前執行緒的 TessBaseAPI，第一次使用時才初始化"""
+        api = getattr(self._local, "api", None)
+        if api is None:
+            kwargs = {"lang": self.lang}
+            if self.tessdata:
+                kwargs["path"] = self.tessdata
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            api.SetVariable("tessedit_char_whitelist", self.whitelist)
+            self._local.api = api
+            with self._apis_lock:
+                self._apis.append(api)
+        return api
+
+    def image_to_string(self, image, psm: int = 7) -> str:
+        """
+        辨識影像中的文字
+
+        Args:
+            image: PIL 影像或 NumPy 影像
+            psm: Tesseract 頁面分割模式
+
+        Returns:
+            去除前後空白的辨識結果
+
+        Raises:
+            RuntimeError: 找不到任何 Tesseract
+        """
+        if self.backend is None:
+            raise RuntimeError("找不到 Tesseract")
+        pil_image = to_pil(image)
+        if self.backend == "tesserocr":
+            api = self._api()
+            api.SetPageSegMode(psm)
+            api.SetImage(pil_image)
+            return api.GetUTF8Text().strip()
+        config = f"--oem 3 --psm {psm} -c tessedit_char_whitelist={self.whitelist}"
+        return pytesseract.image_to_string(pil_image, config=config).strip()
+
+    def close(self):
+        """釋放所有執行緒建立的 TessBaseAPI"""
+        with self._apis_lock:
+            apis, self._apis = self._apis, []
+        for api in apis:
+            try:
+                api.End()
+            except Exception:
+                pass
+
+
+_shared: Optional[TesseractEngine] = None
+_shared_lock = threading.Lock()
+
+
+def get_tesseract() -> TesseractEngine:
+    """取得程序內共用的 Tesseract 引擎"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = TesseractEngine()
+            atexit.register(_shared.close)
+        return _shared
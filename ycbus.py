@@ -18,6 +18,8 @@ from datetime import datetime
 import datetime
 import requests
 from read_google_sheet import ReadGSheet
+from utils.clock_sync import ClockSync, PreciseScheduler
+from utils.driver_pool import require_driver_binary
 
 
 def read_txt_to_dict(file_name):
@@ -160,25 +162,36 @@ def gc_load():
     return user_data
 
 
-def start_count(set_time):
-    status = 1
-    while status == 1:
-        time.sleep(0.33)
-        import datetime
+def next_lock_time(now_time, set_time):
+    """
+    計算下一次到達 set_time（HH:MM）的伺服器時間
 
-        now_time = datetime.datetime.now()
+    目前已在該分鐘內時立即觸發，已經過了則順延到隔天
+    """
+    hour, minute = map(int, str(set_time).split(":"))
+    lock_time = now_time.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if now_time.strftime("%H:%M") == str(set_time):
+        lock_time = now_time
+    elif lock_time < now_time:
+        lock_time += datetime.timedelta(days=1)
+    return lock_time
 
-        lock_time = str(set_time)
-        try:
-            if now_time.strftime("%H:%M") == lock_time:
-                print("時間到: %s" % now_time)
-                status = 0
 
-            else:
-                print("尚未到 %s, 現在時間: [%s]" % (lock_time, now_time))
+def start_count(set_time):
+    # 以伺服器時間為準，先睡眠到接近目標再忙碌等待，取代每 0.33 秒輪詢
+    clock = ClockSync()
+    try:
+        offset = clock.sync_http()
+    except Exception as e:
+        print("伺服器時鐘同步失敗，使用本機時間: %s" % e)
+        offset = 0.0
 
-        except:
-            print("function: start_count something wrong")
+    now_time = clock.server_now()
+    lock_time = next_lock_time(now_time, set_time)
+    print("尚未到 %s, 現在時間: [%s]" % (set_time, now_time))
+
+    PreciseScheduler(offset).fire_at(lock_time, lambda: None)
+    print("時間到: %s" % clock.server_now())
 
     print(
         """
@@ -270,9 +283,10 @@ class AutoReserve:
             # return webdriver.Chrome(options=chrome_options,
             #                                executable_path=ChromeDriverManager().install())  # 启动时添加定制的选项
 
+            # 使用本機已有的 chromedriver，DRIVER_NETWORK_FALLBACK 允許時才由 ChromeDriverManager 下載
             return webdriver.Chrome(
                 service=ChromeService(
-                    ChromeDriverManager(cache_valid_range=28).install()
+                    require_driver_binary("chrome", ChromeDriverManager(cache_valid_range=28).install)
                 ),
                 options=chrome_options,
             )
@@ -298,9 +312,10 @@ class AutoReserve:
             options.add_argument("--disable-extensions")  # 停用擴充功能
             options.add_argument("--no-sandbox")  # 停用沙盒模式
             options.add_argument("--disable-dev-shm-usage")  # 避免記憶體不足問題
+            # 使用本機已有的 geckodriver，DRIVER_NETWORK_FALLBACK 允許時才由 GeckoDriverManager 下載
             return webdriver.Firefox(
                 service=FirefoxService(
-                    GeckoDriverManager().install(),
+                    require_driver_binary("firefox", GeckoDriverManager().install),
                     log_path="geckodriver.log",  # 記錄 driver 日誌
                 ),
                 options=options,
@@ -355,58 +370,34 @@ class AutoReserve:
 
     def loop_now_time(self, set_lock, debug_flag=0):
         """
-        等待並檢查時間
+        等待到伺服器時間 set_lock 後執行預約
+
+        以 HTTP Date 標頭（失敗時改用頁面上的 span#time 跳秒）估算與伺服器的時間差，
+        先睡眠、最後忙碌等待到目標時刻，取代每 0.5 秒以正規表示式讀取頁面時鐘的輪詢
         
         Args:
             set_lock (str): 目標時間（格式：HH:MM）
-            debug_flag (int): 是否為除錯模式
+            debug_flag (int): 是否為除錯模式（1 時不等待）
         """
-        status = 1
-        if debug_flag == 1:
-            status = 0
-            
         print(f"開始等待時間: {set_lock}")
-        
-        while status == 1:
+        if debug_flag != 1:
+            clock = ClockSync()
             try:
-                # 等待時間元素出現
-                time_element = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, self.css["timeClock"]))
-                )
-                time_get = time_element.text.strip()
-                print(f"取得的原始時間字串: {time_get}")
-                
-                # 解析時間的不同格式
-                if '/' in time_get:  # 處理 MM/DD HH:MM 格式
-                    match = re.search(r"\d{2}/\d{2}\s+(\d{2}:\d{2})", time_get)
-                    if match:
-                        current_time = match.group(1)
-                        if current_time == set_lock:
-                            print(f"時間到: {set_lock}")
-                            status = 0
-                            break
-                        print(f"尚未到 {set_lock}, 現在時間: [{time_get}]")
-                else:  # 處理其他格式
-                    match = re.search(r"(\d{2}:\d{2}):(\d{2})", time_get)
-                    if match and match.group(1) == set_lock:
-                        seconds = int(match.group(2))
-                        if seconds > 0:
-                            print(f"時間到: {set_lock}")
-                            status = 0
-                            break
-                        print(f"尚未到 {set_lock}, 現在時間: [{time_get}]")
-                
-                time.sleep(0.5)
-                
-            except TimeoutException:
-                print("等待時間元素超時，重新整理頁面")
-                self.driver.refresh()
-                time.sleep(2)
-                
+                offset = clock.sync_http()
             except Exception as e:
-                print(f"讀取時間時發生錯誤: {str(e)}")
-                time.sleep(1)
-        
+                print(f"HTTP 時鐘同步失敗，改用頁面時鐘: {str(e)}")
+                try:
+                    offset = clock.sync_page_clock(self.driver, selector=self.css["timeClock"])
+                except Exception as e:
+                    print(f"頁面時鐘同步失敗，使用本機時間: {str(e)}")
+                    offset = 0.0
+
+            now_time = clock.server_now()
+            lock_time = next_lock_time(now_time, set_lock)
+            print(f"尚未到 {set_lock}, 現在時間: [{now_time}]")
+            PreciseScheduler(offset).fire_at(lock_time, lambda: None)
+            print(f"時間到: {set_lock}")
+
         # 執行預約流程
         self.reserve()
 
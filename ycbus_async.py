@@ -0,0 +1,268 @@
+"""
+asyncio 預約引擎
+以 Playwright 的 async API 操作瀏覽器，多筆預約與其驗證碼辨識可在同一個事件迴圈中交錯進行，
+每筆預約使用同一個瀏覽器中獨立的 BrowserContext（各自的 cookies），不必一個瀏覽器配一條執行緒
+
+Playwright 為選用套件：
+    pip install playwright && playwright install firefox
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import (BASE_URL, BOOK_BUTTON_SELECTOR, BOOKING_SUBMIT, DEFAULT_TIMEOUT, HTTP_LOGIN_ATTEMPTS,
+                    MULTI_BOOKING_CONCURRENCY)
+from utils.form_filler import BATCH_FILL_SCRIPT, build_address_legs
+from ycbus_http import BOOKING_SUCCESS_MARKERS, LOGIN_SUCCESS_MARKERS
+from ycbus_v2 import BookingData
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:  # pragma: no cover - 選用套件
+    async_playwright = None
+
+CAPTCHA_SELECTOR = "#captchaImage, img[src*='captcha'], img[alt*='captcha']"
+
+# 將 Selenium execute_async_script 風格的批次填寫腳本包成 Promise 供 page.evaluate 使用
+EVALUATE_BATCH_FILL = """
+(args) => new Promise((resolve) => {
+    const script = new Function(%s);
+    script.apply(null, args.concat([resolve]));
+})
+"""
+
+
+_recognizer: Optional[Callable[[bytes], Optional[str]]] = None
+_recognizer_lock = threading.Lock()
+
+
+def get_recognizer() -> Callable[[bytes], Optional[str]]:
+    """
+    取得程序內共用的驗證碼辨識函式（CaptchaHandler.recognize_captcha）
+
+    asyncio 引擎不會回報登入結果，共用的 CaptchaHandler 不開啟資料集，只使用快取查詢
+    """
+    global _recognizer
+    with _recognizer_lock:
+        if _recognizer is None:
+            from utils.captcha_handler import CaptchaHandler
+
+            handler = CaptchaHandler(None)
+            handler.dataset = None
+            _recognizer = handler.recognize_captcha
+        return _recognizer
+
+
+def require_playwright():
+    if async_playwright is None:
+        raise ImportError("使用 asyncio 預約引擎需要安裝 playwright：pip install playwright && playwright install firefox")
+
+
+class AsyncBookingSystem:
+    """在單一 BrowserContext 中以 async 方式完成 登入 → 選擇行程 → 填寫地址 → 存檔"""
+
+    def __init__(self, booking_data: BookingData, context, base_url: str = BASE_URL,
+                 recognizer: Optional[Callable[[bytes], Optional[str]]] = None,
+                 executor: Optional[ThreadPoolExecutor] = None, timeout: float = DEFAULT_TIMEOUT,
+                 submit: bool = BOOKING_SUBMIT):
+        """
+        Args:
+            booking_data: 預約資料物件
+            context: Playwright 的 BrowserContext
+            base_url: 登入頁網址
+            recognizer: 驗證碼辨識函式（同步），會在 executor 中執行而不阻塞事件迴圈，
+                未提供時使用 get_recognizer 的共用函式
+            executor: 執行驗證碼辨識的執行緒池，未提供時使用事件迴圈預設的執行緒池
+            timeout: 等待元素的秒數
+            submit: 是否點擊存檔送出預約，False 時只填寫到存檔前
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.booking_data = booking_data
+        self.context = context
+        self.base_url = base_url
+        self.recognizer = recognizer or get_recognizer()
+        self.executor = executor
+        self.timeout_ms = timeout * 1000
+        self.submit = submit
+        self.page = None
+        self.timings: Dict[str, float] = {}
+
+    def _record(self, step: str, start: float):
+        self.timings[step] = (time.perf_counter() - start) * 1000
+        self.logger.info(f"{self.booking_data.name} {step} 耗時 {self.timings[step]:.1f} ms")
+
+    async def _click_and_wait(self, selector: str):
+        """點擊會送出表單的按鈕，並等待新頁面載入"""
+        async with self.page.expect_navigation(timeout=self.timeout_ms):
+            await self.page.click(selector, timeout=self.timeout_ms)
+
+    async def _recognize(self, image: bytes) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.recognizer, image)
+
+    async def is_logged_in(self) -> bool:
+        if "book.php" in self.page.url and "book_inq.php" not in self.page.url:
+            return True
+        content = await self.page.content()
+        return any(marker in content for marker in LOGIN_SUCCESS_MARKERS)
+
+    async def login(self, max_attempts: int = HTTP_LOGIN_ATTEMPTS) -> bool:
+        """擷取驗證碼、在執行緒池中辨識，並送出登入表單"""
+        start = time.perf_counter()
+        if self.page is None:
+            self.page = await self.context.new_page()
+        for attempt in range(max_attempts):
+            self.logger.info(f"{self.booking_data.name} 第 {attempt + 1} 次登入嘗試")
+            await self.page.goto(self.base_url)
+            captcha = self.page.locator(CAPTCHA_SELECTOR).first
+            try:
+                await captcha.wait_for(timeout=self.timeout_ms)
+                image = await captcha.screenshot()
+            except Exception as e:
+                self.logger.warning(f"擷取驗證碼失敗: {str(e)}")
+                continue
+            captcha_code = await self._recognize(image)
+            if not captcha_code:
+                self.logger.warning("驗證碼辨識失敗，重新取得驗證碼")
+                continue
+
+            await self.page.fill("#cusname", self.booking_data.name)
+            await self.page.fill("#idcode", self.booking_data.num)
+            await self.page.fill("#captcha", captcha_code)
+            try:
+                await self._click_and_wait("#btn101")
+            except Exception as e:
+                self.logger.warning(f"送出登入表單後沒有換頁: {str(e)}")
+            if await self.is_logged_in():
+                self._record("login", start)
+                return True
+            self.logger.warning(f"登入失敗，驗證碼 {captcha_code} 可能錯誤")
+        self._record("login", start)
+        return False
+
+    async def select_journey_details(self) -> bool:
+        """選擇日期、去程與回程時間"""
+        start = time.perf_counter()
+        data = self.booking_data
+        try:
+            await self.page.click(f"input[value*='{data.date}']", timeout=self.timeout_ms)
+            await self.page.click("input#setgom2", timeout=self.timeout_ms)
+            await self.page.click(
+                f"input[type='radio'][onclick*='jump.value'][onclick*='{data.go_time}']", timeout=self.timeout_ms
+            )
+            await self.page.click("input#setgon", timeout=self.timeout_ms)
+            await self.page.click(
+                f"input[type='radio'][onclick*='jump.value'][onclick*='{data.back_time}']", timeout=self.timeout_ms
+            )
+            await self._click_and_wait("input#next5")
+        except Exception as e:
+            self.logger.error(f"選擇行程詳情失敗: {str(e)}")
+            return False
+        self._record("select_journey_details", start)
+        return True
+
+    async def fill_address_details(self) -> bool:
+        """以一次 evaluate 填寫四段地址與留言（與 BusBookingSystem 共用批次填寫腳本）"""
+        start = time.perf_counter()
+        await self.page.wait_for_selector("input[name='areain']", timeout=self.timeout_ms)
+        script = EVALUATE_BATCH_FILL % json.dumps(BATCH_FILL_SCRIPT)
+        report = await self.page.evaluate(
+            script, [build_address_legs(self.booking_data), self.booking_data.Message or "", int(self.timeout_ms)]
+        )
+        for leg, result in (report or {}).items():
+            if not result.get("ok"):
+                self.logger.error(f"填寫 {leg} 失敗: {result.get('error')}")
+                return False
+        self._record("fill_address_details", start)
+        return True
+
+    async def save_booking(self) -> bool:
+        start = time.perf_counter()
+        await self._click_and_wait("#btnSave")
+        content = await self.page.content()
+        self._record("save_booking", start)
+        return any(marker in content for marker in BOOKING_SUCCESS_MARKERS)
+
+    async def book_journey(self) -> Tuple[bool, Optional[str]]:
+        """
+        登入後執行完整預約流程
+
+        Returns:
+            (是否成功, None)；與 BusBookingSystem.book_journey 相同，submit 為 False 時填寫完成即視為成功
+        """
+        start = time.perf_counter()
+        try:
+            await self._click_and_wait(BOOK_BUTTON_SELECTOR)
+            if not await self.select_journey_details():
+                return False, None
+            if not await self.fill_address_details():
+                return False, None
+            if self.submit:
+                success = await self.save_booking()
+            else:
+                self.logger.info(f"{self.booking_data.name} 未啟用送出（submit=False），不點擊存檔")
+                success = True
+            self._record("book_journey", start)
+            return success, None
+        except Exception as e:
+            self.logger.error(f"{self.booking_data.name} 預約失敗: {str(e)}")
+            return False, None
+
+    async def close(self):
+        await self.context.close()
+
+
+async def book_many(riders: List[BookingData], base_url: str = BASE_URL,
+                    max_concurrency: int = MULTI_BOOKING_CONCURRENCY, browser: str = "firefox",
+                    headless: bool = True, recognizer: Optional[Callable[[bytes], Optional[str]]] = None,
+                    ocr_workers: int = 4, submit: bool = BOOKING_SUBMIT) -> List[Tuple[bool, float]]:
+    """
+    在同一個瀏覽器與事件迴圈中平行完成多筆預約
+
+    Args:
+        riders: 每筆預約的資料
+        max_concurrency: 同時進行的預約數量上限
+        browser: firefox 或 chromium
+        recognizer: 共用的驗證碼辨識函式，預設使用 get_recognizer
+        ocr_workers: 驗證碼辨識執行緒數
+        submit: 是否點擊存檔送出預約
+
+    Returns:
+        與 riders 順序相同的 [(是否成功, 耗時秒數)]
+    """
+    require_playwright()
+    recognizer = recognizer or get_recognizer()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    executor = ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="async-ocr")
+
+    async with async_playwright() as playwright:
+        launcher = getattr(playwright, browser)
+        instance = await launcher.launch(headless=headless)
+
+        async def run_one(booking_data: BookingData) -> Tuple[bool, float]:
+            async with semaphore:
+                start = time.perf_counter()
+                context = await instance.new_context(locale="zh-TW")
+                system = AsyncBookingSystem(booking_data, context, base_url=base_url,
+                                            recognizer=recognizer, executor=executor, submit=submit)
+                try:
+                    success = await system.login()
+                    if success:
+                        success, _ = await system.book_journey()
+                except Exception as e:
+                    logging.getLogger("AsyncBookingSystem").error(f"{booking_data.name} 預約失敗: {str(e)}")
+                    success = False
+                finally:
+                    await system.close()
+                return success, time.perf_counter() - start
+
+        try:
+            return list(await asyncio.gather(*(run_one(r) for r in riders)))
+        finally:
+            await instance.close()
+            executor.shutdown(wait=False)
@@ -0,0 +1,397 @@
+"""
+純 HTTP 預約引擎
+以持久化的 requests.Session 直接重送 rayman 的表單，不經過瀏覽器渲染頁面，
+使用與 ycbus_v2.BusBookingSystem 相同的 BookingData
+"""
+
+import logging
+import re
+import time
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+from config import ADDRESS_FIELDS, BASE_URL, BOOKING_SUBMIT, HTTP_TIMEOUT, HTTP_LOGIN_ATTEMPTS
+from utils.captcha_fetcher import with_cache_buster
+from ycbus_v2 import BookingData
+
+# onclick 中的欄位指定，例如 act.value='netbook' 或 gotime.value=jump.value
+ASSIGN_PATTERN = re.compile(r"(\w+)\.value\s*=\s*(?:['\"]([^'\"]*)['\"]|(\w+)\.value)")
+
+# 登入成功後頁面上會出現的按鈕文字
+LOGIN_SUCCESS_MARKERS = ["查看預約趟", "預約訂車", "查詢預約", "取消預約"]
+BOOKING_SUCCESS_MARKERS = ["預約成功", "訂車成功", "已完成預約"]
+
+
+class FormParser(HTMLParser):
+    """解析頁面中的表單欄位、按鈕與圖片"""
+
+    def __init__(self):
+        super().__init__()
+        self.forms: List[Dict] = []
+        self.images: List[Dict[str, str]] = []
+        self._form: Optional[Dict] = None
+        self._select: Optional[Dict] = None
+        self._option: Optional[Dict] = None
+        self._textarea: Optional[Dict] = None
+
+    def _current_form(self) -> Dict:
+        if self._form is None:
+            # 表單外的欄位歸到一個匿名表單
+            self._form = {"attrs": {}, "fields": [], "selects": {}}
+            self.forms.append(self._form)
+        return self._form
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: (v if v is not None else "") for k, v in attrs}
+        if tag == "form":
+            self._form = {"attrs": attrs, "fields": [], "selects": {}}
+            self.forms.append(self._form)
+        elif tag == "input":
+            self._current_form()["fields"].append(attrs)
+        elif tag == "select":
+            self._select = {"name": attrs.get("name", ""), "options": []}
+            self._current_form()["selects"][self._select["name"]] = self._select
+        elif tag == "option" and self._select is not None:
+            self._option = {"value": attrs.get("value"), "text": "", "selected": "selected" in attrs}
+            self._select["options"].append(self._option)
+        elif tag == "textarea":
+            self._textarea = {"name": attrs.get("name", ""), "type": "textarea", "value": ""}
+            self._current_form()["fields"].append(self._textarea)
+        elif tag == "img":
+            self.images.append(attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        elif tag == "select":
+            self._select = None
+        elif tag == "option":
+            self._option = None
+        elif tag == "textarea":
+            self._textarea = None
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option["text"] += data.strip()
+        elif self._textarea is not None:
+            self._textarea["value"] += data
+
+
+class PageForm:
+    """單一表單的狀態，模擬瀏覽器中點擊按鈕時對欄位的修改"""
+
+    def __init__(self, form: Dict, page_url: str):
+        self.form = form
+        self.action = urljoin(page_url, form["attrs"].get("action") or page_url)
+        self.method = (form["attrs"].get("method") or "post").lower()
+        self.values: Dict[str, str] = {}
+        for field in form["fields"]:
+            name = field.get("name")
+            field_type = field.get("type", "text").lower()
+            if not name or field_type in ("button", "submit", "image", "reset"):
+                continue
+            if field_type in ("radio", "checkbox") and "checked" not in field:
+                continue
+            self.values[name] = field.get("value", "")
+        for name, select in form["selects"].items():
+            options = select["options"]
+            chosen = next((o for o in options if o["selected"]), options[0] if options else None)
+            if name and chosen is not None:
+                self.values[name] = chosen["value"] if chosen["value"] is not None else chosen["text"]
+
+    def buttons(self) -> List[Dict[str, str]]:
+        """回傳所有帶有 onclick 的欄位"""
+        return [f for f in self.form["fields"] if f.get("onclick")]
+
+    def find_button(self, predicate: Callable[[Dict[str, str]], bool]) -> Optional[Dict[str, str]]:
+        return next((f for f in self.buttons() if predicate(f)), None)
+
+    def click(self, button: Dict[str, str]):
+        """套用按鈕 onclick 中的欄位指定，並勾選 radio"""
+        if button.get("type", "").lower() == "radio" and button.get("name"):
+            self.values[button["name"]] = button.get("value", "")
+        for name, literal, source in ASSIGN_PATTERN.findall(button.get("onclick", "")):
+            self.values[name] = self.values.get(source, "") if source else literal
+
+    def select_option(self, name: str, value: str = None, text: str = None) -> bool:
+        """選擇下拉選單的選項，找不到時回傳 False"""
+        select = self.form["selects"].get(name)
+        if select is None:
+            return False
+        for option in select["options"]:
+            option_value = option["value"] if option["value"] is not None else option["text"]
+            if (value is not None and option_value == value) or (text is not None and option["text"] == text):
+                self.values[name] = option_value
+                return True
+        return False
+
+
+class HttpBookingSystem:
+    """以 HTTP 表單重送完成預約的引擎"""
+
+    def __init__(self, booking_data: BookingData, base_url: str = BASE_URL,
+                 recognizer: Optional[Callable[[bytes], Optional[str]]] = None,
+                 timeout: float = HTTP_TIMEOUT, submit: bool = BOOKING_SUBMIT):
+        """
+        初始化 HTTP 預約引擎
+
+        Args:
+            booking_data: 預約資料物件
+            base_url: 登入頁網址（book_inq.php）
+            recognizer: 驗證碼辨識函式，輸入圖片 bytes 回傳驗證碼，預設使用 CaptchaHandler
+            timeout: 每個請求的逾時秒數
+            submit: 是否送出最後的存檔請求，False 時只填寫到存檔前
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.booking_data = booking_data
+        self.base_url = base_url
+        self.timeout = timeout
+        self.submit = submit
+        self.session = requests.Session()
+        self.session.headers.update({"Accept-Language": "zh-TW"})
+        if recognizer is None:
+            from utils.captcha_handler import CaptchaHandler
+            recognizer = CaptchaHandler(None).recognize_captcha
+        self.recognizer = recognizer
+        self.timings: Dict[str, float] = {}
+        self.page_url: Optional[str] = None
+        self.page_html = ""
+        self.encoding = "utf-8"
+
+    # ---- HTTP 基礎操作 ----
+
+    def _record(self, step: str, start: float):
+        self.timings[step] = (time.perf_counter() - start) * 1000
+        self.logger.info(f"{step} 耗時 {self.timings[step]:.1f} ms")
+
+    def _load(self, response: requests.Response) -> str:
+        response.raise_for_status()
+        if not response.encoding or response.encoding.lower() == "iso-8859-1":
+            response.encoding = response.apparent_encoding or "utf-8"
+        self.encoding = response.encoding
+        self.page_url = response.url
+        self.page_html = response.text
+        return self.page_html
+
+    def get(self, url: str) -> str:
+        return self._load(self.session.get(url, timeout=self.timeout))
+
+    def submit_form(self, form: PageForm) -> str:
+        """依照表單的 method 與 action 送出目前的欄位值"""
+        data = {k: (v or "").encode(self.encoding, errors="replace") for k, v in form.values.items()}
+        if form.method == "get":
+            response = self.session.get(form.action, params=data, timeout=self.timeout)
+        else:
+            response = self.session.post(form.action, data=data, timeout=self.timeout)
+        return self._load(response)
+
+    def parse(self) -> FormParser:
+        parser = FormParser()
+        parser.feed(self.page_html)
+        return parser
+
+    def main_form(self) -> PageForm:
+        """取得頁面上的主要表單（form1），沒有時取第一個"""
+        parser = self.parse()
+        if not parser.forms:
+            raise ValueError(f"頁面中找不到表單: {self.page_url}")
+        form = next((f for f in parser.forms if f["attrs"].get("id") == "form1"
+                     or f["attrs"].get("name") == "form1"), parser.forms[0])
+        return PageForm(form, self.page_url)
+
+    # ---- 預約流程 ----
+
+    def fetch_captcha(self, refresh: bool = False) -> Optional[bytes]:
+        """
+        在同一個 session 中下載驗證碼圖片
+
+        Args:
+            refresh: 換一張驗證碼（加上新的 random= 參數），不重新載入登入頁
+        """
+        parser = self.parse()
+        image = next((img for img in parser.images
+                      if "captcha" in (img.get("src", "") + img.get("id", "") + img.get("alt", "")).lower()), None)
+        if not image or not image.get("src"):
+            self.logger.error("登入頁中找不到驗證碼圖片")
+            return None
+        url = urljoin(self.page_url, image["src"])
+        if refresh:
+            url = with_cache_buster(url)
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+    def is_logged_in(self) -> bool:
+        if self.page_url and "book.php" in self.page_url and "book_inq.php" not in self.page_url:
+            return True
+        return any(marker in self.page_html for marker in LOGIN_SUCCESS_MARKERS)
+
+    def login(self, max_attempts: int = HTTP_LOGIN_ATTEMPTS) -> bool:
+        """下載驗證碼、辨識並送出登入表單"""
+        start = time.perf_counter()
+        # 辨識失敗時登入頁仍然有效，只需重新下載驗證碼圖片
+        page_loaded = False
+        for attempt in range(max_attempts):
+            self.logger.info(f"HTTP 第 {attempt + 1} 次登入嘗試")
+            refresh = page_loaded
+            if not page_loaded:
+                self.get(self.base_url)
+                page_loaded = True
+            captcha_bytes = self.fetch_captcha(refresh=refresh)
+            if not captcha_bytes:
+                page_loaded = False
+                continue
+            captcha_code = self.recognizer(captcha_bytes)
+            if not captcha_code:
+                self.logger.warning("驗證碼辨識失敗，重新取得驗證碼")
+                continue
+
+            form = self.main_form()
+            form.values.update({
+                "cusname": self.booking_data.name,
+                "idcode": self.booking_data.num,
+                "captcha": captcha_code,
+            })
+            login_button = form.find_button(lambda f: f.get("id") == "btn101")
+            if login_button:
+                form.click(login_button)
+            self.submit_form(form)
+            page_loaded = False
+            if self.is_logged_in():
+                self._record("login", start)
+                return True
+            self.logger.warning(f"登入失敗，驗證碼 {captcha_code} 可能錯誤")
+        self._record("login", start)
+        return False
+
+    def open_booking(self) -> bool:
+        """送出「預約訂車」(act=netbook)，進入日期時間選擇頁"""
+        start = time.perf_counter()
+        form = self.main_form()
+        button = form.find_button(lambda f: f.get("value") == "預約訂車")
+        if button:
+            form.click(button)
+        else:
+            form.values["act"] = "netbook"
+        self.submit_form(form)
+        self._record("open_booking", start)
+        return True
+
+    def _time_button(self, form: PageForm, time_value: str, used: Optional[Dict] = None):
+        """尋找 onclick 中含有指定時間的 radio 按鈕，回程優先選擇與去程不同組的按鈕"""
+        def matches(f):
+            return (f.get("type", "").lower() == "radio"
+                    and "jump.value" in f.get("onclick", "")
+                    and time_value in f.get("onclick", ""))
+
+        if used is not None:
+            button = form.find_button(lambda f: matches(f) and f.get("name") != used.get("name"))
+            if button:
+                return button
+        return form.find_button(matches)
+
+    def select_journey_details(self) -> bool:
+        """依序套用日期、去程、回程按鈕後送出（對應瀏覽器中的 #next5）"""
+        start = time.perf_counter()
+        form = self.main_form()
+        date_button = form.find_button(lambda f: self.booking_data.date in f.get("value", ""))
+        if not date_button:
+            self.logger.error(f"找不到日期按鈕: {self.booking_data.date}")
+            return False
+        form.click(date_button)
+
+        go_mode = form.find_button(lambda f: f.get("id") == "setgom2")
+        if go_mode:
+            form.click(go_mode)
+        go_button = self._time_button(form, self.booking_data.go_time)
+        if not go_button:
+            self.logger.error(f"找不到去程時間按鈕: {self.booking_data.go_time}")
+            return False
+        form.click(go_button)
+
+        back_mode = form.find_button(lambda f: f.get("id") == "setgon")
+        if back_mode:
+            form.click(back_mode)
+        back_button = self._time_button(form, self.booking_data.back_time, used=go_button)
+        if not back_button:
+            self.logger.error(f"找不到回程時間按鈕: {self.booking_data.back_time}")
+            return False
+        form.click(back_button)
+
+        send_button = form.find_button(lambda f: f.get("id") == "next5")
+        if send_button:
+            form.click(send_button)
+        self.submit_form(form)
+        self._record("select_journey_details", start)
+        return True
+
+    @staticmethod
+    def split_area(value: str) -> Tuple[str, str]:
+        """將「城市_地區」格式拆開，格式不符時預設為新北市"""
+        if "_" in value:
+            city, area = value.split("_", 1)
+            return city, area
+        return "a", value
+
+    def fill_address_details(self) -> PageForm:
+        """填入四段地址與留言，回傳準備送出的表單"""
+        form = self.main_form()
+        data = self.booking_data
+        legs = {
+            "goto_pickup": (data.goto_pickup_area, data.goto_pickup_address),
+            "goto_dropoff": (data.goto_dropoff_area, data.goto_dropoff_address),
+            "return_pickup": (data.return_pickup_area, data.return_pickup_address),
+            "return_dropoff": (data.return_dropoff_area, data.return_dropoff_address),
+        }
+        for leg, (area_value, address) in legs.items():
+            area_input, city_select, area_select, address_input = ADDRESS_FIELDS[leg]
+            city, area = self.split_area(area_value)
+            form.values[area_input] = area
+            if not form.select_option(city_select, value=city):
+                form.values[city_select] = city
+            # 地區選單在瀏覽器中由 JavaScript 動態產生，這裡直接指定值
+            if not form.select_option(area_select, text=area):
+                form.values[area_select] = area
+            form.values[address_input] = address
+        if data.Message:
+            form.values["pmark"] = data.Message
+        return form
+
+    def save_booking(self, form: PageForm) -> bool:
+        """送出存檔（對應 #btnSave）"""
+        start = time.perf_counter()
+        save_button = form.find_button(lambda f: f.get("id") == "btnSave")
+        if save_button:
+            form.click(save_button)
+        if not self.submit:
+            self.logger.info("未啟用送出（submit=False），不送出存檔")
+            return True
+        self.submit_form(form)
+        self._record("save_booking", start)
+        return any(marker in self.page_html for marker in BOOKING_SUCCESS_MARKERS)
+
+    def book_journey(self) -> Tuple[bool, Optional[str]]:
+        """
+        登入後執行完整預約流程
+
+        Returns:
+            (是否成功, None)；與 BusBookingSystem.book_journey 相同，submit 為 False 時填寫完成即視為成功
+        """
+        start = time.perf_counter()
+        try:
+            self.open_booking()
+            if not self.select_journey_details():
+                return False, None
+            form = self.fill_address_details()
+            success = self.save_booking(form)
+            self._record("book_journey", start)
+            return success, None
+        except Exception as e:
+            self.logger.error(f"HTTP 預約失敗: {str(e)}")
+            return False, None
+
+    def close(self):
+        self.session.close()
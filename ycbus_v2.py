@@ -6,7 +6,7 @@ from dataclasses import dataclass
 from config import *
 from retrying import retry
 
-import time
+import threading
 
 from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
@@ -26,6 +26,11 @@ from datetime import datetime
 import datetime
 import requests
 from read_google_sheet import ReadGSheet
+from utils.clock_sync import ClockSync, PreciseScheduler
+from utils.locator import LocatorEngine
+from utils.form_filler import BatchFormFiller, build_address_legs
+from utils.page_ready import PageReady
+from utils.driver_pool import build_options, create_driver
 from selenium.webdriver.remote.webelement import WebElement
 
 logging.basicConfig(
@@ -52,134 +57,84 @@ class BookingData:
     Message: str
 
 class BusBookingSystem:
-    def __init__(self, booking_data, browser_type="firefox", options=None):
+    def __init__(self, booking_data, browser_type="firefox", options=None, base_url=BASE_URL, driver=None,
+                 submit=BOOKING_SUBMIT):
         """初始化預約系統
         
         Args:
             booking_data: 預約資料物件
             browser_type: 瀏覽器類型，預設為Firefox
             options: 瀏覽器選項設定
+            base_url: 登入頁網址，預設為 BASE_URL（本機測試時可指向 mock_rayman）
+            driver: 已啟動的 WebDriver（例如從 DriverPool 取出），提供時不再另外啟動瀏覽器
+            submit: 是否實際點擊存檔送出預約，False 時只填寫到存檔前
         """
         self.logger = logging.getLogger(self.__class__.__name__)
         self.booking_data = booking_data
         self.browser_type = browser_type
         self.options = options
-        self.driver = self._initialize_driver()
+        self.base_url = base_url
+        self.submit = submit
+        # 預先登入待命模式的狀態
+        self.book_button = None
+        self.session_expired = False
+        self.clock_offset = 0.0
+        self._keep_alive_stop = threading.Event()
+        self._keep_alive_thread = None
+        self.driver = driver or self._initialize_driver()
         self.wait = WebDriverWait(
             self.driver, 
             DEFAULT_TIMEOUT, 
             poll_frequency=DEFAULT_POLL_FREQUENCY
         )
-        # 導航到登入頁面
-        self.navigate_to_login_page()
+        self.locator = LocatorEngine(self.driver)
+        self.form_filler = BatchFormFiller(self.driver)
+        self.ready = PageReady(self.driver)
+        # 導航到登入頁面（從瀏覽器池取出的瀏覽器已停在登入頁時略過）
+        if driver is None or self.driver.current_url != self.base_url:
+            self.navigate_to_login_page()
 
     def _initialize_driver(self):
-        """初始化並返回WebDriver實例"""
-        if self.browser_type.lower() == "firefox":
-            if self.options:
-                return webdriver.Firefox(options=self.options)
-            else:
-                return webdriver.Firefox()
-        elif self.browser_type.lower() == "chrome":
-            return webdriver.Chrome()
-        else:
-            raise ValueError(f"不支援的瀏覽器類型: {self.browser_type}")
+        """初始化並返回WebDriver實例
 
-    def wait_for_element(self, selector: str, timeout: int = DEFAULT_TIMEOUT) -> Optional[WebElement]:
-        """等待元素出現並返回"""
-        try:
-            # 檢查是否是直接的 CSS 選擇器
-            if selector.startswith('#') or selector.startswith('.') or selector.startswith('[') or selector.find(' ') > 0 or selector.find('>') > 0:
-                # 先檢查元素是否存在
-                element = self.wait.until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                )
-                
-                # 然後確保元素可見且可點擊
-                try:
-                    self.wait.until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                    )
-                    # 如果元素存在但不可見，則嘗試使用JavaScript使其可見
-                    if not element.is_displayed():
-                        self.logger.warning(f"元素存在但不可見，嘗試使用JavaScript使其可見: {selector}")
-                        self.driver.execute_script("arguments[0].style.display = 'block';", element)
-                except:
-                    self.logger.warning(f"元素不可點擊，可能會影響操作: {selector}")
-                
-                return element
-            else:
-                # 嘗試從 CSS_SELECTORS 字典中查找
-                try:
-                    from config import CSS_SELECTORS
-                    css_selector = CSS_SELECTORS.get(selector)
-                    if css_selector:
-                        # 先檢查元素是否存在
-                        element = self.wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, css_selector))
-                        )
-                        
-                        # 然後確保元素可見且可點擊
-                        try:
-                            self.wait.until(
-                                EC.element_to_be_clickable((By.CSS_SELECTOR, css_selector))
-                            )
-                            # 如果元素存在但不可見，則嘗試使用JavaScript使其可見
-                            if not element.is_displayed():
-                                self.logger.warning(f"元素存在但不可見，嘗試使用JavaScript使其可見: {css_selector}")
-                                self.driver.execute_script("arguments[0].style.display = 'block';", element)
-                        except:
-                            self.logger.warning(f"元素不可點擊，可能會影響操作: {css_selector}")
-                        
-                        return element
-                    else:
-                        # 如果在字典中找不到，則直接使用提供的選擇器
-                        self.logger.warning(f"在 CSS_SELECTORS 中找不到 {selector}，嘗試直接使用")
-                        
-                        # 先檢查元素是否存在
-                        element = self.wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                        )
-                        
-                        # 然後確保元素可見且可點擊
-                        try:
-                            self.wait.until(
-                                EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                            )
-                            # 如果元素存在但不可見，則嘗試使用JavaScript使其可見
-                            if not element.is_displayed():
-                                self.logger.warning(f"元素存在但不可見，嘗試使用JavaScript使其可見: {selector}")
-                                self.driver.execute_script("arguments[0].style.display = 'block';", element)
-                        except:
-                            self.logger.warning(f"元素不可點擊，可能會影響操作: {selector}")
-                        
-                        return element
-                except ImportError:
-                    # 如果無法導入 CSS_SELECTORS，則直接使用提供的選擇器
-                    self.logger.warning("無法導入 CSS_SELECTORS，直接使用提供的選擇器")
-                    
-                    # 先檢查元素是否存在
-                    element = self.wait.until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    
-                    # 然後確保元素可見且可點擊
-                    try:
-                        self.wait.until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                        )
-                        # 如果元素存在但不可見，則嘗試使用JavaScript使其可見
-                        if not element.is_displayed():
-                            self.logger.warning(f"元素存在但不可見，嘗試使用JavaScript使其可見: {selector}")
-                            self.driver.execute_script("arguments[0].style.display = 'block';", element)
-                    except:
-                        self.logger.warning(f"元素不可點擊，可能會影響操作: {selector}")
-                    
-                    return element
-        except TimeoutException:
+        driver 執行檔只從本機解析，找不到時報錯（DRIVER_NETWORK_FALLBACK 為 True 時才會從網路下載）；
+        未提供 options 時與原本相同，開啟有畫面的瀏覽器
+        """
+        options = self.options
+        if options is None:
+            options = build_options(self.browser_type.lower(), headless=False)
+        return create_driver(self.browser_type, options)
+
+    def wait_for_element(self, selector: str, timeout: int = DEFAULT_TIMEOUT,
+                         clickable: bool = True) -> Optional[WebElement]:
+        """等待元素出現並返回
+        
+        Args:
+            selector: LOCATOR_STRATEGIES / CSS_SELECTORS 中的邏輯名稱，或直接使用的 CSS / XPath 選擇器
+            timeout: 等待秒數
+            clickable: 元素出現後是否在剩餘時間內繼續等待到可見且可點擊；只需確認元素存在時設為 False
+        """
+        match = self.locator.resolve(selector, timeout)
+        if not match:
             self.logger.warning(f"等待元素超時: {selector}")
             return None
 
+        if clickable and not (match.visible and match.enabled):
+            element = match.element
+            remaining = max(0.0, timeout - match.elapsed_ms / 1000)
+            if self.ready.until(f"clickable:{selector}",
+                                lambda d: element.is_displayed() and element.is_enabled(), remaining):
+                match.visible = match.enabled = True
+
+        # 如果元素存在但不可見，則嘗試使用JavaScript使其可見
+        if not match.visible:
+            self.logger.warning(f"元素存在但不可見，嘗試使用JavaScript使其可見: {selector}")
+            self.driver.execute_script("arguments[0].style.display = 'block';", match.element)
+        elif not match.enabled:
+            self.logger.warning(f"元素不可點擊，可能會影響操作: {selector}")
+        self.logger.debug(f"定位 {selector} 使用 {match.strategy}，耗時 {match.elapsed_ms:.1f} ms")
+        return match.element
+
     @retry(stop_max_attempt_number=MAX_RETRIES)
     def login(self, captcha_code: str) -> bool:
         """
@@ -222,7 +177,7 @@ class BusBookingSystem:
             self.logger.info("已點擊登入按鈕")
             
             # 等待並檢查是否登入成功（修改判斷邏輯）
-            time.sleep(1)  # 等待頁面反應
+            self.ready.navigation(login_button, "login_response")
             
             # 檢查是否存在錯誤訊息
             try:
@@ -254,8 +209,14 @@ class BusBookingSystem:
             self.logger.error(f"登入過程發生錯誤: {str(e)}")
             return False
 
-    def book_journey(self) -> bool:
-        """執行完整預約流程"""
+    def book_journey(self, book_button: Optional[WebElement] = None) -> bool:
+        """執行完整預約流程
+        
+        Args:
+            book_button: 已預先定位的「預約訂車」按鈕（待命模式使用），未提供時重新尋找
+        Returns:
+            (是否成功, 存檔前的表單截圖路徑)；submit 為 False 時填寫完成即視為成功，不會送出預約
+        """
         try:
             # 登入已經在 main.py 中的 handle_login_process 函數中處理
             # 直接進行預約流程
@@ -264,14 +225,15 @@ class BusBookingSystem:
             # 點擊"預約訂車"按鈕
             try:
                 self.logger.info("點擊預約訂車按鈕...")
-                book_button = self.wait_for_element("input[value='預約訂車'][onclick*='act.value=\\'netbook\\';snt()']")
+                if book_button is None:
+                    book_button = self.wait_for_element(BOOK_BUTTON_SELECTOR)
                 if not book_button:
                     self.logger.error("找不到預約訂車按鈕")
                     return False, None
                 book_button.click()
                 self.logger.info("已點擊預約訂車按鈕")
                 # 等待頁面加載
-                time.sleep(2)
+                self.ready.navigation(book_button, "book_page")
             except Exception as e:
                 self.logger.error(f"點擊預約訂車按鈕失敗: {str(e)}")
                 return False, None
@@ -284,10 +246,6 @@ class BusBookingSystem:
                 self.logger.error("填寫地址詳情失敗")
                 return False, None
             
-            self.logger.info("保存預約...")
-            # self.save_booking()
-            self.logger.info("預約成功！")
-            
             # 在點擊存檔按鈕前截圖
             screenshot_path = None
             try:
@@ -300,8 +258,8 @@ class BusBookingSystem:
                 height = self.driver.execute_script("return document.body.parentNode.scrollHeight")
                 self.driver.set_window_size(width, height)
                 
-                # 等待頁面加載
-                time.sleep(2)
+                # 等待版面依新的視窗大小排版完成
+                self.ready.layout_stable("form_screenshot")
                 
                 # 生成時間戳記檔名
                 now_time = datetime.datetime.now()
@@ -333,8 +291,11 @@ class BusBookingSystem:
                     self.logger.warning("存檔按鈕不可見，嘗試使其可見")
                     self.driver.execute_script("arguments[0].style.display = 'block';", save_button)
                 
+                if not self.submit:
+                    self.logger.info("未啟用送出（submit=False），不點擊存檔按鈕")
+                    return True, screenshot_path
                 try:
-                    # save_button.click()
+                    save_button.click()
                     self.logger.info("已點擊存檔按鈕")
                 except Exception as click_error:
                     self.logger.error(f"點擊存檔按鈕失敗: {str(click_error)}")
@@ -345,11 +306,15 @@ class BusBookingSystem:
                     except Exception as js_error:
                         self.logger.error(f"使用JavaScript點擊存檔按鈕失敗: {str(js_error)}")
                         return False, None
+                self.ready.navigation(save_button, "save_response")
+                self.logger.info("預約已送出")
             except Exception as e:
                 self.logger.error(f"點擊存檔按鈕過程中出錯: {str(e)}")
                 return False, None
             
             self.logger.info("地址詳情填寫完成")
+            waits = ", ".join(f"{label} {ms:.0f} ms" for label, ms in self.ready.summary().items())
+            self.logger.info(f"頁面就緒等待耗時: {waits}")
             return True, screenshot_path
         except Exception as e:
             self.logger.error(f"預約失敗: {str(e)}")
@@ -487,13 +452,39 @@ class BusBookingSystem:
             return False
 
     def fill_address_details(self) -> bool:
-        """填寫地址細節"""
+        """填寫地址細節：預設以單次注入腳本批次填寫，失敗時改用逐欄填寫"""
+        if ADDRESS_BATCH_FILL:
+            try:
+                if self.fill_address_details_batch():
+                    return True
+                self.logger.warning("批次填寫地址未完成，改用逐欄填寫")
+            except Exception as e:
+                self.logger.warning(f"批次填寫地址失敗，改用逐欄填寫: {str(e)}")
+        return self.fill_address_details_sequential()
+
+    def fill_address_details_batch(self) -> bool:
+        """以一次 JavaScript 呼叫填寫四段地址與留言，等待地區選單實際產生選項而非固定等待"""
+        self.logger.info("批次填寫地址詳情...")
+        if not self.wait_for_element("goto_pickup_area", clickable=False):
+            self.logger.error("找不到去程上車地區按鈕")
+            return False
+
+        report = self.form_filler.fill(build_address_legs(self.booking_data), self.booking_data.Message)
+        for leg, result in report.items():
+            if not result.get("ok"):
+                self.logger.error(f"批次填寫 {leg} 失敗: {result.get('error')}")
+                return False
+        self.logger.info(f"地址詳情批次填寫完成，耗時 {self.form_filler.last_elapsed_ms:.1f} ms")
+        return True
+
+    def fill_address_details_sequential(self) -> bool:
+        """逐欄填寫地址細節"""
         try:
             self.logger.info("填寫地址詳情...")
             
             # 先確保頁面已完全加載完成
             self.logger.info("等待頁面完全加載...")
-            time.sleep(2)  # 短暫等待以確保頁面渲染完成
+            self.ready.document_ready("address_page")
             
             # 去程上車地點
             self.logger.info("填寫去程上車地點...")
@@ -501,40 +492,12 @@ class BusBookingSystem:
             # 確保去程上車區域輸入框可用
             go_on_area = None
             try:
-                # 多次嘗試不同的定位方式
-                locators = [
-                    "input[name='areain']",
-                    "#areain",
-                    "input#areain",
-                    "//input[@name='areain']"
-                ]
-                
-                for loc in locators:
-                    self.logger.info(f"嘗試定位去程上車區域: {loc}")
-                    if loc.startswith("//"):
-                        # 如果是 XPath
-                        try:
-                            go_on_area = self.wait.until(
-                                EC.presence_of_element_located((By.XPATH, loc))
-                            )
-                            if go_on_area and go_on_area.is_displayed():
-                                self.logger.info(f"成功找到去程上車區域: {loc}")
-                                break
-                        except:
-                            continue
-                    else:
-                        # 如果是 CSS 選擇器
-                        go_on_area = self.wait_for_element(loc)
-                        if go_on_area:
-                            self.logger.info(f"成功找到去程上車區域: {loc}")
-                            break
-                
+                # 所有定位策略在一次瀏覽器往返中嘗試
+                go_on_area = self.wait_for_element("goto_pickup_area")
                 if not go_on_area:
-                    self.logger.error("無法找到去程上車區域輸入框，嘗試使用JavaScript定位")
-                    go_on_area = self.driver.execute_script("return document.querySelector('input[name=\"areain\"]')")
-                    if not go_on_area:
-                        self.logger.error("找不到去程上車地區按鈕")
-                        return False
+                    self.logger.error("找不到去程上車地區按鈕")
+                    return False
+                self.logger.info("成功找到去程上車區域")
             except Exception as e:
                 self.logger.error(f"定位去程上車區域時發生錯誤: {str(e)}")
                 return False
@@ -599,7 +562,7 @@ class BusBookingSystem:
                 go_on_city_select.select_by_value(goto_pickup_city)
                 
                 # 等待加載地區選擇框
-                time.sleep(1)
+                self.ready.options_populated("areain_u", goto_pickup_area)
                 
                 # 選擇地區
                 self.logger.info(f"選擇地區: {goto_pickup_area}")
@@ -669,40 +632,12 @@ class BusBookingSystem:
             # 確保去程下車區域輸入框可用
             go_off_area = None
             try:
-                # 多次嘗試不同的定位方式
-                locators = [
-                    "input[name='areaoff']",
-                    "#areaoff",
-                    "input#areaoff",
-                    "//input[@name='areaoff']"
-                ]
-                
-                for loc in locators:
-                    self.logger.info(f"嘗試定位去程下車區域: {loc}")
-                    if loc.startswith("//"):
-                        # 如果是 XPath
-                        try:
-                            go_off_area = self.wait.until(
-                                EC.presence_of_element_located((By.XPATH, loc))
-                            )
-                            if go_off_area and go_off_area.is_displayed():
-                                self.logger.info(f"成功找到去程下車區域: {loc}")
-                                break
-                        except:
-                            continue
-                    else:
-                        # 如果是 CSS 選擇器
-                        go_off_area = self.wait_for_element(loc)
-                        if go_off_area:
-                            self.logger.info(f"成功找到去程下車區域: {loc}")
-                            break
-                
+                # 所有定位策略在一次瀏覽器往返中嘗試
+                go_off_area = self.wait_for_element("goto_dropoff_area")
                 if not go_off_area:
-                    self.logger.error("無法找到去程下車區域輸入框，嘗試使用JavaScript定位")
-                    go_off_area = self.driver.execute_script("return document.querySelector('input[name=\"areaoff\"]')")
-                    if not go_off_area:
-                        self.logger.error("找不到去程下車地區按鈕")
-                        return False
+                    self.logger.error("找不到去程下車地區按鈕")
+                    return False
+                self.logger.info("成功找到去程下車區域")
             except Exception as e:
                 self.logger.error(f"定位去程下車區域時發生錯誤: {str(e)}")
                 return False
@@ -767,7 +702,7 @@ class BusBookingSystem:
                 go_off_city_select.select_by_value(goto_dropoff_city)
                 
                 # 等待加載地區選擇框
-                time.sleep(1)
+                self.ready.options_populated("areaoff_u", goto_dropoff_area)
                 
                 # 選擇地區
                 self.logger.info(f"選擇去程下車地區: {goto_dropoff_area}")
@@ -847,40 +782,12 @@ class BusBookingSystem:
             # 確保回程上車區域輸入框可用
             back_on_area = None
             try:
-                # 多次嘗試不同的定位方式
-                locators = [
-                    "input[name='areain2']",
-                    "#areain2",
-                    "input#areain2",
-                    "//input[@name='areain2']"
-                ]
-                
-                for loc in locators:
-                    self.logger.info(f"嘗試定位回程上車區域: {loc}")
-                    if loc.startswith("//"):
-                        # 如果是 XPath
-                        try:
-                            back_on_area = self.wait.until(
-                                EC.presence_of_element_located((By.XPATH, loc))
-                            )
-                            if back_on_area and back_on_area.is_displayed():
-                                self.logger.info(f"成功找到回程上車區域: {loc}")
-                                break
-                        except:
-                            continue
-                    else:
-                        # 如果是 CSS 選擇器
-                        back_on_area = self.wait_for_element(loc)
-                        if back_on_area:
-                            self.logger.info(f"成功找到回程上車區域: {loc}")
-                            break
-                
+                # 所有定位策略在一次瀏覽器往返中嘗試
+                back_on_area = self.wait_for_element("return_pickup_area")
                 if not back_on_area:
-                    self.logger.error("無法找到回程上車區域輸入框，嘗試使用JavaScript定位")
-                    back_on_area = self.driver.execute_script("return document.querySelector('input[name=\"areain2\"]')")
-                    if not back_on_area:
-                        self.logger.error("找不到回程上車地區按鈕")
-                        return False
+                    self.logger.error("找不到回程上車地區按鈕")
+                    return False
+                self.logger.info("成功找到回程上車區域")
             except Exception as e:
                 self.logger.error(f"定位回程上車區域時發生錯誤: {str(e)}")
                 return False
@@ -945,7 +852,7 @@ class BusBookingSystem:
                 back_on_city_select.select_by_value(return_pickup_city)
                 
                 # 等待加載地區選擇框
-                time.sleep(1)
+                self.ready.options_populated("areain2_u", return_pickup_area)
                 
                 # 選擇地區
                 self.logger.info(f"選擇回程上車地區: {return_pickup_area}")
@@ -1013,40 +920,12 @@ class BusBookingSystem:
             # 確保回程下車區域輸入框可用
             back_off_area = None
             try:
-                # 多次嘗試不同的定位方式
-                locators = [
-                    "input[name='areaoff2']",
-                    "#areaoff2",
-                    "input#areaoff2",
-                    "//input[@name='areaoff2']"
-                ]
-                
-                for loc in locators:
-                    self.logger.info(f"嘗試定位回程下車區域: {loc}")
-                    if loc.startswith("//"):
-                        # 如果是 XPath
-                        try:
-                            back_off_area = self.wait.until(
-                                EC.presence_of_element_located((By.XPATH, loc))
-                            )
-                            if back_off_area and back_off_area.is_displayed():
-                                self.logger.info(f"成功找到回程下車區域: {loc}")
-                                break
-                        except:
-                            continue
-                    else:
-                        # 如果是 CSS 選擇器
-                        back_off_area = self.wait_for_element(loc)
-                        if back_off_area:
-                            self.logger.info(f"成功找到回程下車區域: {loc}")
-                            break
-                
+                # 所有定位策略在一次瀏覽器往返中嘗試
+                back_off_area = self.wait_for_element("return_dropoff_area")
                 if not back_off_area:
-                    self.logger.error("無法找到回程下車區域輸入框，嘗試使用JavaScript定位")
-                    back_off_area = self.driver.execute_script("return document.querySelector('input[name=\"areaoff2\"]')")
-                    if not back_off_area:
-                        self.logger.error("找不到回程下車地區按鈕")
-                        return False
+                    self.logger.error("找不到回程下車地區按鈕")
+                    return False
+                self.logger.info("成功找到回程下車區域")
             except Exception as e:
                 self.logger.error(f"定位回程下車區域時發生錯誤: {str(e)}")
                 return False
@@ -1111,7 +990,7 @@ class BusBookingSystem:
                 back_off_city_select.select_by_value(return_dropoff_city)
                 
                 # 等待加載地區選擇框
-                time.sleep(1)
+                self.ready.options_populated("areaoffb_u", return_dropoff_area)
                 
                 # 選擇地區
                 self.logger.info(f"選擇回程下車地區: {return_dropoff_area}")
@@ -1175,7 +1054,7 @@ class BusBookingSystem:
                 return False
             
             self.logger.info("地址詳情填寫完成")
-            return True, screenshot_path
+            return True
         except Exception as e:
             self.logger.error(f"填寫地址詳情失敗: {str(e)}")
             return False, None
@@ -1204,6 +1083,7 @@ class BusBookingSystem:
             main_page_button = self.wait_for_element("input[name='btn1']")
             if main_page_button:
                 main_page_button.click()
+                self.ready.navigation(main_page_button, "main_menu")
             
             # 點擊查看預約按鈕
             view_button = self.wait_for_element(".btn_grey[name='btn19']")
@@ -1211,6 +1091,7 @@ class BusBookingSystem:
                 self.logger.error("找不到查看預約按鈕")
                 return ""
             view_button.click()
+            self.ready.navigation(view_button, "view_page")
             
             self.logger.info("截取確認畫面...")
             # 獲取視窗大小
@@ -1221,8 +1102,8 @@ class BusBookingSystem:
             height = self.driver.execute_script("return document.body.parentNode.scrollHeight")
             self.driver.set_window_size(width, height)
             
-            # 等待頁面加載
-            time.sleep(3)
+            # 等待版面依新的視窗大小排版完成
+            self.ready.layout_stable("confirmation_screenshot")
             
             # 生成時間戳記檔名
             now_time = datetime.datetime.now()
@@ -1248,7 +1129,7 @@ class BusBookingSystem:
             if not hasattr(self, 'driver'):
                 raise ValueError("瀏覽器驅動未初始化")
                 
-            self.logger.info(f"正在導航到登入頁面: {BASE_URL}")
+            self.logger.info(f"正在導航到登入頁面: {self.base_url}")
             
             # 先嘗試處理可能存在的警告對話框
             try:
@@ -1259,7 +1140,7 @@ class BusBookingSystem:
                 pass
                 
             # 導航到登入頁面
-            self.driver.get(BASE_URL)
+            self.driver.get(self.base_url)
             
             # 等待頁面加載完成
             self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
@@ -1277,3 +1158,129 @@ class BusBookingSystem:
         except Exception as e:
             self.logger.error(f"導航到登入頁面失敗: {str(e)}")
             return False
+
+    def arm(self, keep_alive_interval: float = KEEP_ALIVE_INTERVAL) -> bool:
+        """進入待命狀態（需已登入）：預先定位「預約訂車」按鈕並開始保持登入
+        
+        Args:
+            keep_alive_interval: 保持登入狀態的請求間隔（秒）
+        Returns:
+            bool: 是否成功進入待命狀態
+        """
+        self.logger.info("進入預約待命狀態...")
+        self.book_button = self.wait_for_element(BOOK_BUTTON_SELECTOR)
+        if not self.book_button:
+            self.logger.error("待命失敗 - 找不到預約訂車按鈕")
+            return False
+        self.session_expired = False
+        self.start_keep_alive(keep_alive_interval)
+        self.logger.info("已預先定位預約訂車按鈕，等待開放時間")
+        return True
+
+    def start_keep_alive(self, interval: float = KEEP_ALIVE_INTERVAL):
+        """在背景以 requests 共用瀏覽器的 cookies 定期讀取目前頁面，避免登入逾時
+        
+        保持連線不經過 WebDriver，因此不會與主執行緒的瀏覽器操作互相干擾
+        """
+        self.stop_keep_alive()
+        url = self.driver.current_url
+        session = requests.Session()
+        for cookie in self.driver.get_cookies():
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"))
+        session.headers["User-Agent"] = self.driver.execute_script("return navigator.userAgent;")
+
+        def keep_alive_loop():
+            while not self._keep_alive_stop.wait(interval):
+                try:
+                    response = session.get(url, timeout=5)
+                    if "book_inq.php" in response.url:
+                        self.logger.warning("保持連線時發現登入已失效")
+                        self.session_expired = True
+                        return
+                    self.logger.debug(f"保持連線成功: {response.status_code}")
+                except Exception as e:
+                    self.logger.warning(f"保持連線請求失敗: {str(e)}")
+
+        self._keep_alive_stop.clear()
+        self._keep_alive_thread = threading.Thread(target=keep_alive_loop, name="keep-alive", daemon=True)
+        self._keep_alive_thread.start()
+
+    def stop_keep_alive(self):
+        """停止背景保持連線"""
+        if self._keep_alive_thread:
+            self._keep_alive_stop.set()
+            self._keep_alive_thread.join(timeout=1)
+            self._keep_alive_thread = None
+
+    def sync_clock(self) -> float:
+        """估算伺服器與本機的時間差，HTTP Date 標頭失敗時改用頁面上的伺服器時鐘
+        
+        兩種方式合計最多約花費 CLOCK_SYNC_MAX_SECONDS 秒
+
+        Returns:
+            float: 伺服器時間減本機時間（秒），無法估算時為 0
+        """
+        deadline = datetime.datetime.now() + datetime.timedelta(seconds=CLOCK_SYNC_MAX_SECONDS)
+        clock = ClockSync(self.base_url, max_seconds=CLOCK_SYNC_MAX_SECONDS)
+        try:
+            self.clock_offset = clock.sync_http()
+        except Exception as e:
+            self.logger.warning(f"HTTP 時鐘同步失敗，改用頁面時鐘: {str(e)}")
+            try:
+                # 頁面時鐘至少要等一次秒數跳動
+                self.clock_offset = clock.sync_page_clock(self.driver,
+                                                          timeout=min(3.0, max(1.1, (deadline - datetime.datetime.now()).total_seconds())))
+            except Exception as e:
+                self.logger.warning(f"頁面時鐘同步失敗，使用本機時間: {str(e)}")
+                self.clock_offset = 0.0
+        return self.clock_offset
+
+    def server_now(self) -> "datetime.datetime":
+        """依照最近一次同步的時間差，回傳估計的伺服器時間"""
+        return datetime.datetime.now() + datetime.timedelta(seconds=self.clock_offset)
+
+    def wait_until(self, target: "datetime.datetime"):
+        """等待到指定的伺服器時間（先睡眠，最後一小段忙碌等待）"""
+        PreciseScheduler(self.clock_offset).sleep_until(target.timestamp())
+
+    def fire_at(self, open_time: str = OPEN_TIME, relogin=None):
+        """在伺服器時間的開放時刻準時點擊「預約訂車」並完成預約
+        
+        Args:
+            open_time: 開放預約的時間（HH:MM:SS，伺服器時間）
+            relogin: 登入失效時呼叫的重新登入函式，回傳 bool
+        Returns:
+            與 book_journey 相同的 (是否成功, 截圖路徑)
+        """
+        self.sync_clock()
+        hour, minute, second = map(int, open_time.split(":"))
+        now = self.server_now()
+        target = now.replace(hour=hour, minute=minute, second=second, microsecond=0)
+        if (now - target).total_seconds() > OPEN_TIME_GRACE:
+            # 已過今天的開放時間（例如午夜前就開始待命），改為等待隔天
+            target += datetime.timedelta(days=1)
+            self.logger.info(f"今天的開放時間 {open_time} 已過，改為等待隔天")
+        self.logger.info(f"待命中，預計於伺服器時間 {target.strftime('%m/%d %H:%M:%S')} 送出預約")
+
+        # 距離開放時間較久時分段等待，期間若登入失效則重新登入並重新待命
+        resynced = False
+        while (target - self.server_now()).total_seconds() > 5:
+            if self.session_expired:
+                self.stop_keep_alive()
+                if not relogin or not relogin() or not self.arm():
+                    self.logger.error("登入失效且無法重新登入")
+                    return False, None
+            # 開放前再同步一次，修正長時間待命累積的時鐘漂移；剩餘時間不夠完成同步時略過
+            remaining = (target - self.server_now()).total_seconds()
+            if not resynced and remaining <= CLOCK_RESYNC_BEFORE:
+                resynced = True
+                if remaining > CLOCK_SYNC_MAX_SECONDS + 5:
+                    self.sync_clock()
+                    continue
+                self.logger.info(f"距離開放時間只剩 {remaining:.1f} 秒，略過重新同步時鐘")
+            self.wait_until(min(target - datetime.timedelta(seconds=5),
+                                self.server_now() + datetime.timedelta(seconds=1)))
+
+        self.stop_keep_alive()
+        scheduler = PreciseScheduler(self.clock_offset)
+        return scheduler.fire_at(target, self.book_journey, book_button=self.book_button)